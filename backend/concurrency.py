@@ -0,0 +1,317 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:  # host pressure is simply not taken into account
+    psutil = None
+
+
+class AdaptiveLimiter:
+    """Async semaphore whose limit can be changed while tasks are waiting"""
+
+    def __init__(self, limit: int, name: str = ''):
+        self.name = name
+        self._limit = max(1, int(limit))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+        # Observations since the last controller adjustment
+        self._samples: List[Tuple[float, bool]] = []
+        self._saturated = False
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def set_limit(self, limit: int):
+        self._limit = max(1, int(limit))
+        self._wake()
+
+    async def acquire(self):
+        while self._in_flight >= self._limit:
+            self._saturated = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # We were woken but will not take the slot: pass it on
+                    self._wake()
+                raise
+        self._in_flight += 1
+        if self._in_flight >= self._limit:
+            self._saturated = True
+
+    def release(self):
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self._limit - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def record(self, latency: float, success: bool):
+        """Record the outcome of one operation run under this limiter"""
+        self._samples.append((latency, success))
+
+    def take_window(self) -> Tuple[List[Tuple[float, bool]], bool]:
+        """Return and reset the observations collected since the last call"""
+        samples, saturated = self._samples, self._saturated or self.waiting > 0
+        self._samples = []
+        self._saturated = False
+        return samples, saturated
+
+
+class FairShareLimiter(AdaptiveLimiter):
+    """AdaptiveLimiter shared by several courses, handing out slots by weighted fair queueing
+
+    Every share (course) has its own queue of waiters. A freed slot goes to the
+    waiting share with the lowest virtual time, which advances by 1/weight per
+    slot granted, so while courses compete each gets slots in proportion to its
+    weight, and a course that is alone gets the whole pool. A share that was idle
+    restarts at the current virtual time instead of spending banked credit.
+    """
+
+    def __init__(self, limit: int, name: str = ''):
+        super().__init__(limit, name)
+        self._shares: Dict[str, Dict[str, Any]] = {}
+        self._clock = 0.0
+
+    def add_share(self, share: str, weight: float = 1.0) -> 'LimiterShare':
+        self._shares[share] = {'weight': float(weight), 'vtime': self._clock, 'in_flight': 0,
+                               'granted': 0, 'queue': collections.deque()}
+        return LimiterShare(self, share)
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(state['queue']) for state in self._shares.values())
+
+    async def acquire(self, share: str):
+        state = self._shares[share]
+        if not state['queue']:
+            state['vtime'] = max(state['vtime'], self._clock)
+        if self._in_flight < self._limit and not self.waiting:
+            self._grant(share)
+            return
+
+        self._saturated = True
+        waiter = asyncio.get_running_loop().create_future()
+        state['queue'].append(waiter)
+        try:
+            await waiter  # the slot is already ours when this returns
+        except asyncio.CancelledError:
+            if waiter in state['queue']:
+                state['queue'].remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                self.release(share)
+            raise
+
+    def _grant(self, share: str):
+        state = self._shares[share]
+        self._clock = state['vtime']
+        state['vtime'] += 1.0 / state['weight']
+        state['in_flight'] += 1
+        state['granted'] += 1
+        self._in_flight += 1
+        if self._in_flight >= self._limit:
+            self._saturated = True
+
+    def release(self, share: str):
+        self._shares[share]['in_flight'] -= 1
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._in_flight < self._limit:
+            backlogged = [s for s, state in self._shares.items() if state['queue']]
+            if not backlogged:
+                return
+            share = min(backlogged, key=lambda s: self._shares[s]['vtime'])
+            waiter = self._shares[share]['queue'].popleft()
+            if not waiter.done():
+                self._grant(share)
+                waiter.set_result(None)
+
+    def shares_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {share: {'weight': state['weight'], 'in_flight': state['in_flight'],
+                        'waiting': len(state['queue']), 'granted': state['granted']}
+                for share, state in self._shares.items()}
+
+
+class LimiterShare:
+    """One course's handle on a FairShareLimiter, used like an AdaptiveLimiter"""
+
+    def __init__(self, limiter: FairShareLimiter, share: str):
+        self.limiter = limiter
+        self.share = share
+
+    async def __aenter__(self):
+        await self.limiter.acquire(self.share)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.limiter.release(self.share)
+
+    def record(self, latency: float, success: bool):
+        self.limiter.record(latency, success)
+
+
+class ConcurrencyController:
+    """Tunes pull and grade concurrency from observed latency, errors and host pressure
+
+    Uses additive increase / multiplicative decrease per limiter: a limit grows by
+    one when the limiter was saturated and healthy during the last window, and is
+    cut when latency, error rate or host CPU/memory pressure exceed their thresholds.
+    """
+
+    DEFAULTS = {
+        'adaptive': True,
+        'adjust_interval': 10,
+        'decrease_factor': 0.7,
+        'max_error_rate': 0.2,
+        'cpu_high_percent': 85,
+        'memory_high_percent': 90,
+        'pull': {'min': 1, 'max': 20, 'target_latency': 10.0},
+        'grade': {'min': 1, 'max': 8, 'target_latency': 20.0},
+    }
+
+    def __init__(self, config: Dict[str, Any], pull_limiter: AdaptiveLimiter,
+                 grade_limiter: AdaptiveLimiter):
+        self.logger = logging.getLogger(__name__)
+        self.config = self._merge_config(config.get('concurrency') or {})
+        self.limiters = {'pull': pull_limiter, 'grade': grade_limiter}
+        self.last_window: Dict[str, Dict[str, Any]] = {}
+        self.host: Dict[str, Optional[float]] = {'cpu_percent': None, 'memory_percent': None}
+
+        for kind, limiter in self.limiters.items():
+            bounds = self.config[kind]
+            limiter.set_limit(min(max(limiter.limit, bounds['min']), bounds['max']))
+
+        if psutil:
+            psutil.cpu_percent(None)  # prime the CPU counter
+
+    def _merge_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        merged = dict(self.DEFAULTS)
+        for key, value in config.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = dict(merged[key], **value)
+            else:
+                merged[key] = value
+        return merged
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['adaptive'])
+
+    async def run(self):
+        """Periodically adjust the limits until cancelled"""
+        if not self.enabled:
+            self.logger.info("Adaptive concurrency disabled, using fixed limits")
+            return
+        while True:
+            await asyncio.sleep(self.config['adjust_interval'])
+            try:
+                self.adjust()
+            except Exception as e:
+                self.logger.error(f"Concurrency adjustment failed: {e}")
+
+    def _sample_host(self):
+        if not psutil:
+            return
+        self.host = {
+            'cpu_percent': psutil.cpu_percent(None),
+            'memory_percent': psutil.virtual_memory().percent,
+        }
+
+    def adjust(self):
+        self._sample_host()
+        cpu = self.host['cpu_percent'] or 0.0
+        memory = self.host['memory_percent'] or 0.0
+        memory_pressure = memory >= self.config['memory_high_percent']
+        cpu_pressure = cpu >= self.config['cpu_high_percent']
+
+        for kind, limiter in self.limiters.items():
+            bounds = self.config[kind]
+            samples, saturated = limiter.take_window()
+            latencies = sorted(latency for latency, _ in samples)
+            errors = sum(1 for _, success in samples if not success)
+            error_rate = errors / len(samples) if samples else 0.0
+            p90 = latencies[int(0.9 * (len(latencies) - 1))] if latencies else 0.0
+
+            reasons = []
+            if error_rate > self.config['max_error_rate']:
+                reasons.append(f"error rate {error_rate:.0%}")
+            if p90 > bounds['target_latency']:
+                reasons.append(f"p90 {p90:.2f}s")
+            if memory_pressure:
+                reasons.append(f"memory {memory:.0f}%")
+            # Grading is CPU bound; pulls mostly wait on the network
+            if kind == 'grade' and cpu_pressure:
+                reasons.append(f"cpu {cpu:.0f}%")
+
+            old = limiter.limit
+            if reasons:
+                new = max(bounds['min'], int(old * self.config['decrease_factor']))
+            elif saturated and samples:
+                new = min(bounds['max'], old + 1)
+            else:
+                new = old
+
+            self.last_window[kind] = {
+                'operations': len(samples),
+                'errors': errors,
+                'p90_latency': round(p90, 3),
+                'saturated': saturated,
+            }
+
+            if new != old:
+                limiter.set_limit(new)
+                why = ', '.join(reasons) if reasons else f"saturated, p90 {p90:.2f}s"
+                self.logger.info(f"{kind.capitalize()} concurrency {old} -> {new} ({why})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current limits and last observations, for logs and the metrics API"""
+        limits = {}
+        for kind, limiter in self.limiters.items():
+            limits[kind] = {
+                'limit': limiter.limit,
+                'min': self.config[kind]['min'],
+                'max': self.config[kind]['max'],
+                'in_flight': limiter.in_flight,
+                'waiting': limiter.waiting,
+                'last_window': self.last_window.get(kind, {}),
+            }
+            if isinstance(limiter, FairShareLimiter):
+                limits[kind]['shares'] = limiter.shares_snapshot()
+        return {
+            'adaptive': self.enabled,
+            'limits': limits,
+            'host': self.host,
+            'timestamp': time.time(),
+        }
@@ -0,0 +1,77 @@
+"""
+Courses hosted by one scheduler / frontend process.
+
+Each course is a directory laid out like this repository (``students/``,
+``class_info/process_list.csv``, ``grading_store/``, ``backend/config.backend.yaml``
+...), so an existing per-course copy of the tree can be listed as it is. The
+host's ``backend/config.backend.yaml`` lists them:
+
+courses:
+  - id: os2026
+    root: /srv/practicum/os2026
+    weight: 2
+  - id: net2026
+    root: /srv/practicum/net2026
+
+Without a ``courses`` list the current directory is the only course
+(``default``), which is how a single-course checkout behaves. Weights set each
+course's share of the pull and grading pools while courses compete for them.
+"""
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+CONFIG_FILE = Path('backend/config.backend.yaml')
+DEFAULT_COURSE = 'default'
+COURSE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class Course:
+    def __init__(self, course_id: str, root: Path = Path('.'), weight: float = 1.0, title: str = ''):
+        self.id = course_id
+        self.root = Path(root)
+        self.weight = weight
+        self.title = title or course_id
+
+    @property
+    def config_path(self) -> Path:
+        return self.root / CONFIG_FILE
+
+    def describe(self) -> Dict[str, Any]:
+        return {'id': self.id, 'title': self.title, 'root': str(self.root), 'weight': self.weight}
+
+
+def load_courses(config: Dict[str, Any]) -> List[Course]:
+    """Courses from the host config's ``courses`` list (the current directory if there is none)"""
+    entries = (config or {}).get('courses') or []
+    if not entries:
+        return [Course(DEFAULT_COURSE)]
+
+    courses = []
+    for entry in entries:
+        course_id = str(entry.get('id', ''))
+        if not COURSE_ID.match(course_id):
+            raise ValueError(f"Invalid course id: {course_id!r}")
+        if any(course.id == course_id for course in courses):
+            raise ValueError(f"Duplicate course id: {course_id}")
+        weight = float(entry.get('weight', 1))
+        if weight <= 0:
+            raise ValueError(f"Course {course_id} needs a positive weight, got {weight}")
+        courses.append(Course(course_id, Path(entry.get('root', course_id)), weight, entry.get('title', '')))
+    return courses
+
+
+def read_host_config(path: Path = CONFIG_FILE) -> Dict[str, Any]:
+    """The host config file, empty if it cannot be read"""
+    try:
+        with open(path, 'r') as file:
+            return yaml.safe_load(file) or {}
+    except OSError:
+        return {}
+
+
+def read_courses(path: Path = CONFIG_FILE) -> List[Course]:
+    """Courses listed in the host config file (for processes that do not load the whole config)"""
+    return load_courses(read_host_config(path))
@@ -0,0 +1,304 @@
+"""
+Deadline snapshot grading.
+
+Grades every student's submission for one week as it stood at a cutoff time:
+for each clone it resolves the last commit before the cutoff, checks it out
+in a temporary detached worktree (sharing the clone's object store, so nothing
+is copied or fetched) and grades that checkout on a small thread pool. The
+live clones, results, history and dashboard are left alone; the results are
+written once to ``state/deadline/<week>-<cutoff>.json`` and not overwritten.
+
+The cutoff is compared with the clone's reflog, not with commit times: a
+student controls the dates written into their commits, but the reflog records
+when the scheduler's pull brought each commit into the clone. The graded commit
+is the one HEAD pointed to at the cutoff; a clone with no reflog entry before
+the cutoff (cloned later, or reflog expired) counts as no submission. Run it
+while the scheduler is pulling, so that pushes before the deadline are received.
+
+A push just before the cutoff is only received at the next pull, so commits
+received up to ``--grace`` seconds after the cutoff (default: the scheduler's
+pull interval) still count if their commit date is not after the cutoff. Commit
+dates can be forged, but only within that window.
+
+python -m backend.deadline --week week03 --cutoff 2026-10-19T23:59
+python -m backend.deadline --week week03 --cutoff 2026-10-19T23:59 --students S20237132,S20237133
+python -m backend.deadline --week week03 --cutoff 2026-10-19T23:59 --grace 300
+python -m backend.deadline --list
+python -m backend.deadline --show week03-20261019-235900
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .grader import Grader
+from .grading_store import VERSION_MARKER, read_result_version
+from .git_manager import resolve_repo_path
+
+DEADLINE_DIR = Path('state/deadline')
+# Grading files that live next to a clone are the instructor's; only results are left behind
+RESULT_FILES = shutil.ignore_patterns('pass*', 'fail*', '.grading*', VERSION_MARKER, '__pycache__')
+SCRIPT_FILES = ('grade.py', 'driver.py')
+
+
+def parse_cutoff(text: str) -> float:
+    """Epoch seconds from an epoch number or an ISO 8601 time (local time if it has no offset)"""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def snapshot_id(week: str, cutoff: float) -> str:
+    return f"{week}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(cutoff))}"
+
+
+def snapshot_path(snapshot: str, root: Path = Path('.')) -> Path:
+    return root / DEADLINE_DIR / f"{snapshot}.json"
+
+
+def load_deadline_snapshot(snapshot: str, root: Path = Path('.')) -> Optional[Dict[str, Any]]:
+    try:
+        with open(snapshot_path(snapshot, root), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def list_snapshots(root: Path = Path('.')) -> List[Dict[str, Any]]:
+    """Id, week, cutoff and summary of every deadline snapshot"""
+    snapshots = []
+    if (root / DEADLINE_DIR).exists():
+        for path in sorted((root / DEADLINE_DIR).glob('*.json')):
+            data = load_deadline_snapshot(path.stem, root)
+            if data:
+                snapshots.append({key: data.get(key) for key in ('id', 'week', 'cutoff', 'created', 'summary')})
+    return snapshots
+
+
+class DeadlineGrading:
+    def __init__(self, week: str, cutoff: float, students: Optional[List[str]] = None,
+                 parallel: int = 4, root: Path = Path('.'), workdir: Optional[Path] = None,
+                 grace: Optional[float] = None):
+        self.week = week
+        self.cutoff = cutoff
+        self.students = students
+        self.parallel = max(1, parallel)
+        self.root = Path(root)
+        self.workdir = Path(workdir) if workdir else None
+        self.grader = Grader(self.root)
+        self.git_timeout = (self.grader.config.get('git') or {}).get('timeout', 30)
+        if grace is None:
+            grace = (self.grader.config.get('scheduler') or {}).get('pull_interval', 60)
+        self.grace = max(0.0, float(grace))
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def id(self) -> str:
+        return snapshot_id(self.week, self.cutoff)
+
+    def discover(self) -> Dict[str, Path]:
+        """Student id -> clone for every student (or only ``students``) with a repository"""
+        repos = {}
+        if not self.grader.students_dir.exists():
+            return repos
+        for student_dir in sorted(self.grader.students_dir.iterdir()):
+            if not student_dir.is_dir() or (self.students and student_dir.name not in self.students):
+                continue
+            repo_path = resolve_repo_path(student_dir)
+            if repo_path is None:
+                self.logger.warning(f"No git repository found for {student_dir.name}")
+                continue
+            repos[student_dir.name] = repo_path
+        return repos
+
+    def _git(self, args: List[str], repo_path: Path) -> str:
+        result = subprocess.run(['git'] + args, cwd=repo_path, capture_output=True, text=True,
+                                timeout=self.git_timeout)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"git {args[0]} failed")
+        return result.stdout.strip()
+
+    def resolve_commit(self, repo_path: Path) -> Optional[Tuple[str, float]]:
+        """Commit the clone's HEAD pointed to at the cutoff and when it got there, from the reflog
+
+        Within the grace period after the cutoff, HEAD moves to commits dated before the cutoff count too.
+        """
+        # Newest first, one "<commit> HEAD@{<epoch>} <commit epoch>" line per HEAD move
+        log = self._git(['reflog', 'show', '--format=%H %gd %ct', '--date=unix', 'HEAD'], repo_path)
+        for line in log.splitlines():
+            commit, selector, committed_at = line.split()
+            received_at = float(selector[selector.index('{') + 1:-1])
+            if received_at <= self.cutoff:
+                return commit, received_at
+            if received_at <= self.cutoff + self.grace and float(committed_at) <= self.cutoff:
+                return commit, received_at
+        return None
+
+    def _checkout(self, workdir: Path, student_id: str, repo_path: Path, commit: str) -> Path:
+        """Student directory laid out like the live one, with the clone at ``commit`` as a worktree"""
+        student_dir = self.grader.students_dir / student_id
+        checkout_dir = workdir / student_id
+        worktree = checkout_dir / repo_path.relative_to(student_dir)
+        self._git(['worktree', 'add', '--detach', str(worktree.resolve()), commit], repo_path)
+
+        live_week = student_dir / self.week
+        week_dir = checkout_dir / self.week
+        if worktree != checkout_dir:
+            # The week directory sits next to the clone, so it holds the grading files
+            if live_week.is_dir():
+                shutil.copytree(live_week, week_dir, ignore=RESULT_FILES)
+            scripts = [(student_dir / name, checkout_dir / name) for name in SCRIPT_FILES]
+        else:
+            # The clone is the student directory: take only grading scripts the submission lacks
+            scripts = [(live_week / name, week_dir / name) for name in SCRIPT_FILES]
+        for source, target in scripts:
+            if source.is_file() and not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source, target)
+        return worktree
+
+    def _remove_checkout(self, workdir: Path, student_id: str, repo_path: Path, worktree: Path):
+        try:
+            self._git(['worktree', 'remove', '--force', str(worktree.resolve())], repo_path)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            self.logger.warning(f"Failed to remove worktree for {student_id}: {e}")
+        shutil.rmtree(workdir / student_id, ignore_errors=True)
+        try:
+            self._git(['worktree', 'prune'], repo_path)
+        except (RuntimeError, subprocess.TimeoutExpired):
+            pass
+
+    def _grade(self, workdir: Path, student_id: str, repo_path: Path) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {'commit': None, 'received_at': None}
+        worktree = None
+        try:
+            resolved = self.resolve_commit(repo_path)
+            if resolved is None:
+                entry.update(status='no_submission', problems=self.grader.default_fail_results())
+                return entry
+            entry['commit'], entry['received_at'] = resolved
+
+            worktree = self._checkout(workdir, student_id, repo_path, entry['commit'])
+            usage: Dict[str, Any] = {}
+            problems = self.grader.grade_checkout(workdir / student_id, student_id, self.week, usage)
+            entry.update(
+                status='pass' if problems and all(problems.values()) else 'fail',
+                problems=problems,
+                grader_version=read_result_version(workdir / student_id / self.week),
+                usage=usage,
+            )
+        except Exception as e:
+            self.logger.error(f"Deadline grading of {student_id}/{self.week} failed: {e}",
+                              extra={'student': student_id, 'week': self.week})
+            entry.update(status='error', error=str(e), problems=self.grader.default_fail_results())
+        finally:
+            if worktree is not None:
+                self._remove_checkout(workdir, student_id, repo_path, worktree)
+        return entry
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        path = snapshot_path(self.id, self.root)
+        if path.exists() and not force:
+            raise FileExistsError(f"Deadline snapshot {self.id} already exists")
+
+        repos = self.discover()
+        cutoff_text = datetime.fromtimestamp(self.cutoff).isoformat()
+        self.logger.info(f"Deadline grading {self.week} at {cutoff_text}: "
+                         f"{len(repos)} students, parallel={self.parallel}")
+        started = time.time()
+        if self.workdir:
+            self.workdir.mkdir(parents=True, exist_ok=True)
+        workdir = Path(tempfile.mkdtemp(prefix='txed-deadline-', dir=self.workdir))
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix='deadline') as executor:
+                futures = {student_id: executor.submit(self._grade, workdir, student_id, repo_path)
+                           for student_id, repo_path in repos.items()}
+                students = {student_id: future.result() for student_id, future in futures.items()}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        summary = {'total': len(students)}
+        for status in ('pass', 'fail', 'no_submission', 'error'):
+            summary[status] = sum(1 for entry in students.values() if entry['status'] == status)
+        snapshot = {
+            'id': self.id,
+            'week': self.week,
+            'cutoff': self.cutoff,
+            'cutoff_text': cutoff_text,
+            'grace': self.grace,
+            'created': started,
+            'duration': round(time.time() - started, 1),
+            'summary': summary,
+            'students': students,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(snapshot), encoding='utf-8')
+        os.replace(tmp, path)
+        self.logger.info(f"Deadline snapshot {self.id}: {summary['pass']} pass, {summary['fail']} fail, "
+                         f"{summary['no_submission']} without a commit, {summary['error']} errors "
+                         f"in {snapshot['duration']}s")
+        return snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grade a week as it stood at the deadline')
+    parser.add_argument('--week', help='Week to grade')
+    parser.add_argument('--cutoff', help='Deadline as ISO 8601 (e.g. 2026-10-19T23:59, local time '
+                                         'without an offset) or epoch seconds')
+    parser.add_argument('--students', help='Comma separated student ids (default: all students)')
+    parser.add_argument('--parallel', type=int, default=4, help='Concurrent grading jobs')
+    parser.add_argument('--grace', type=float,
+                        help='Seconds after the cutoff in which received commits dated before it still count '
+                             '(default: scheduler.pull_interval)')
+    parser.add_argument('--workdir', type=Path, help='Directory for the temporary worktrees (default: system temp)')
+    parser.add_argument('--force', action='store_true', help='Replace an existing snapshot for this week and cutoff')
+    parser.add_argument('--list', action='store_true', help='List deadline snapshots and exit')
+    parser.add_argument('--show', metavar='SNAPSHOT_ID', help='Print a deadline snapshot and exit')
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory (default: current directory)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.list:
+        for snapshot in list_snapshots(args.root):
+            print(json.dumps(snapshot))
+        return 0
+    if args.show:
+        snapshot = load_deadline_snapshot(args.show, args.root)
+        if snapshot is None:
+            logging.error(f"No deadline snapshot {args.show}")
+            return 1
+        print(json.dumps(snapshot, indent=2))
+        return 0
+
+    if not args.week or not args.cutoff:
+        parser.error('--week and --cutoff are required')
+    try:
+        cutoff = parse_cutoff(args.cutoff)
+    except ValueError:
+        parser.error(f"Invalid --cutoff: {args.cutoff}")
+
+    students = [s.strip() for s in args.students.split(',')] if args.students else None
+    grading = DeadlineGrading(args.week, cutoff, students, args.parallel, args.root, args.workdir, args.grace)
+    try:
+        grading.run(force=args.force)
+    except FileExistsError as e:
+        logging.error(f"{e}; use --force to replace it")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Git backends used by GitManager to update student clones.
+
+``SubprocessGitBackend`` runs ``git pull`` for every repository (the original
+behaviour, and the fallback). ``GitPythonBackend`` first compares the local
+branch with the remote branch in-process, reading refs directly when the remote
+is a path on this machine or a shared filesystem (bare repositories next to
+the clones, as bootstrap and the benchmark fleet set them up), so an unchanged
+repository costs no process at all. Only when the remote moved (or cannot be
+read directly) does it fetch, and then it fast-forwards the branch with
+``merge --ff-only``, the same outcome as ``git pull``. Repositories it does not
+handle (detached HEAD, no upstream branch) go to the subprocess backend.
+
+Select one with ``git.backend: auto | gitpython | subprocess``.
+"""
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import git
+except ImportError:  # gitpython is optional; the subprocess backend needs only the git binary
+    git = None
+
+SCP_LIKE_URL = re.compile(r'^[\w.-]+@[\w.-]+:')
+
+
+def read_ref(git_dir: Path, ref: str) -> Optional[str]:
+    """SHA of ``ref`` (e.g. refs/heads/main) from a loose ref file or packed-refs"""
+    try:
+        ref_file = git_dir / ref
+        if ref_file.exists():
+            return ref_file.read_text().strip()
+        packed = git_dir / 'packed-refs'
+        if packed.exists():
+            for line in packed.read_text().splitlines():
+                if line.endswith(' ' + ref):
+                    return line.split(' ', 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+def command_error(error) -> str:
+    """git's own message from a GitCommandError (as the subprocess backend reports it)"""
+    message = (error.stderr or str(error)).strip()
+    if message.startswith("stderr: '") and message.endswith("'"):
+        message = message[len("stderr: '"):-1].strip()
+    return 'Timeout' if message.startswith('Timeout:') else message
+
+
+def local_git_dir(url: str, repo_path: Path) -> Optional[Path]:
+    """Git directory of a remote that is reachable as a path, or None for network remotes"""
+    if url.startswith('file://'):
+        path = Path(url[len('file://'):])
+    elif '://' in url or SCP_LIKE_URL.match(url):
+        return None
+    else:
+        path = Path(url) if Path(url).is_absolute() else repo_path / url
+    if (path / '.git').is_dir():
+        return path / '.git'
+    if (path / 'HEAD').is_file() and (path / 'objects').is_dir():
+        return path  # bare repository
+    return None
+
+
+class SubprocessGitBackend:
+    """One ``git pull`` process per repository"""
+
+    name = 'subprocess'
+
+    def __init__(self):
+        self.counts = {'pulls': 0}
+
+    async def pull(self, repo_path: Path, timeout: float) -> Dict[str, Any]:
+        self.counts['pulls'] += 1
+        process = await asyncio.create_subprocess_exec(
+            'git', 'pull',
+            cwd=repo_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            return {'success': False, 'error': 'Timeout'}
+
+        if process.returncode == 0:
+            return {'success': True, 'message': stdout.decode().strip()}
+        return {'success': False, 'error': stderr.decode().strip()}
+
+    @staticmethod
+    async def _kill(process):
+        """Terminate and reap a git process that exceeded its timeout"""
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.counts, backend=self.name)
+
+
+class GitPythonBackend(SubprocessGitBackend):
+    """In-process ref checks and fast-forward updates through GitPython"""
+
+    name = 'gitpython'
+
+    def __init__(self, max_workers: int = 20):
+        super().__init__()
+        self.counts.update(up_to_date_in_process=0, fetched=0, fast_forwarded=0, fallback=0)
+        self.logger = logging.getLogger(__name__)
+        # GitPython blocks, so it runs on its own threads; the pull limiter bounds how many are busy
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='git')
+
+    async def pull(self, repo_path: Path, timeout: float) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, self._pull, repo_path, timeout)
+        except Exception as e:
+            self.logger.debug(f"GitPython pull of {repo_path} failed, using git pull: {e}")
+            result = None
+        if result is None:
+            self.counts['fallback'] += 1
+            return await super().pull(repo_path, timeout)
+        self.counts['pulls'] += 1
+        return result
+
+    def _pull(self, repo_path: Path, timeout: float) -> Optional[Dict[str, Any]]:
+        """Fast-forward the checked out branch to its upstream; None if this repository needs git pull"""
+        # GitDB reads objects in-process instead of keeping a cat-file process per repository
+        repo = git.Repo(repo_path, odbt=git.GitDB)
+        try:
+            if repo.head.is_detached:
+                return None
+            branch = repo.active_branch
+            tracking = branch.tracking_branch()
+            if tracking is None:
+                return None
+            git_dir = Path(repo.git_dir)
+            local = read_ref(git_dir, branch.path)
+
+            remote = repo.remote(tracking.remote_name)
+            remote_dir = local_git_dir(remote.url, Path(repo_path))
+            if remote_dir is not None and local is not None:
+                if read_ref(remote_dir, f'refs/heads/{tracking.remote_head}') == local:
+                    self.counts['up_to_date_in_process'] += 1
+                    return {'success': True, 'message': 'Already up to date.', 'commit': local}
+
+            try:
+                remote.fetch(kill_after_timeout=timeout)
+                self.counts['fetched'] += 1
+                upstream = read_ref(git_dir, tracking.path)
+                if upstream is None or upstream == local:
+                    return {'success': True, 'message': 'Already up to date.', 'commit': local}
+                repo.git.merge('--ff-only', '-q', upstream, kill_after_timeout=timeout)
+            except git.GitCommandError as e:
+                return {'success': False, 'error': command_error(e)}
+            merged = read_ref(git_dir, branch.path)
+            if merged != upstream:
+                # Local branch ahead of upstream: the merge had nothing to do
+                return {'success': True, 'message': 'Already up to date.', 'commit': merged}
+            self.counts['fast_forwarded'] += 1
+            return {'success': True, 'message': f"Updating {(local or '')[:7]}..{upstream[:7]}\nFast-forward",
+                    'commit': upstream}
+        finally:
+            repo.close()
+
+
+def create_backend(config: Dict[str, Any]):
+    """Backend named by ``git.backend`` (auto: GitPython when it is installed)"""
+    choice = (config.get('git') or {}).get('backend', 'auto')
+    if choice == 'subprocess':
+        return SubprocessGitBackend()
+    if git is None:
+        if choice == 'gitpython':
+            logging.getLogger(__name__).warning("git.backend is gitpython but GitPython is not installed; "
+                                                "using git subprocesses")
+        return SubprocessGitBackend()
+    max_workers = ((config.get('concurrency') or {}).get('pull') or {}).get('max', 20)
+    return GitPythonBackend(max_workers=max_workers)
@@ -1,119 +1,240 @@
 import asyncio
+import collections
 import subprocess
+import time
 from pathlib import Path
 import logging
 import yaml
-from typing import Dict, Any
+from typing import Deque, Dict, Any, Optional, Tuple
+
+from .concurrency import AdaptiveLimiter
+from .git_backend import create_backend, read_ref
+from .remote_guard import RemoteGuard
+
+# Recent successful pull latencies kept per repository (see maintenance.py)
+PULL_SAMPLES = 10
+
+
+def resolve_repo_path(student_dir: Path) -> Optional[Path]:
+    """Clone location for a student: ``<dir>/repo`` or, as bootstrap creates it, ``<dir>`` itself"""
+    for candidate in (student_dir / 'repo', student_dir):
+        if (candidate / '.git').exists():
+            return candidate
+    return None
+
+
+def student_id_of(repo_path: Path) -> str:
+    return repo_path.parent.name if repo_path.name == 'repo' else repo_path.name
+
+
+def read_head_commit(repo_path: Path) -> Optional[str]:
+    """Resolve HEAD to a commit SHA by reading .git directly (no subprocess)"""
+    git_dir = repo_path / '.git'
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+    except OSError:
+        return None
+    if not head.startswith('ref: '):
+        return head
+    return read_ref(git_dir, head[5:])
 
 
 class GitManager:
-    def __init__(self, max_concurrent=5):
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+    def __init__(self, max_concurrent=5, root: Path = Path('.'), limiter=None, remote_guard=None):
+        # Limit can be retuned at runtime by ConcurrencyController; courses hosted
+        # together pass their share of one pull limiter and one remote guard instead
+        self.semaphore = limiter if limiter is not None else AdaptiveLimiter(max_concurrent, name='pull')
+        self.root = Path(root)
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config()
+        self.remote_guard = remote_guard if remote_guard is not None else RemoteGuard(self.config)
+        self.backend = create_backend(self.config)
+        # repo path -> (time, seconds) of its latest successful pulls
+        self.pull_latency: Dict[str, Deque[Tuple[float, float]]] = {}
 
     def _load_config(self) -> Dict[str, Any]:
         try:
-            with open('backend/config.backend.yaml', 'r') as file:
+            with open(self.root / 'backend/config.backend.yaml', 'r') as file:
                 return yaml.safe_load(file)
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
             return {'git': {'timeout': 30, 'clone_timeout': 30}}
 
     async def pull_repository(self, repo_path: Path) -> Dict[str, Any]:
-        async with self.semaphore:
-            try:
-                self.logger.info(f"Pulling repository: {repo_path}")
-
-                process = await asyncio.create_subprocess_exec(
-                    'git', 'pull',
-                    cwd=repo_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=self.config['git']['timeout']
-                )
-
-                if process.returncode == 0:
-                    message = stdout.decode().strip()
-                    self.logger.info(f"Successfully pulled {repo_path}: {message}")
-                    return {'success': True, 'message': message}
-                else:
-                    error = stderr.decode().strip()
-                    self.logger.warning(f"Git pull failed for {repo_path}: {error}")
-                    return {'success': False, 'error': error}
-
-            except asyncio.TimeoutError:
-                self.logger.error(f"Timeout pulling {repo_path}")
-                return {'success': False, 'error': 'Timeout'}
-            except Exception as e:
-                self.logger.error(f"Error pulling {repo_path}: {e}")
-                return {'success': False, 'error': str(e)}
-
-    async def update_all_repositories(self) -> Dict[str, Dict[str, Any]]:
-        students_dir = Path('students')
-        if not students_dir.exists():
-            self.logger.warning("Students directory does not exist")
-            return {}
+        key = str(repo_path)
+        blocked = self.remote_guard.check(key)
+        if blocked:
+            self.logger.debug(f"Skipping pull of {repo_path}: {blocked}")
+            return {'success': False, 'skipped': True, 'error': blocked}
 
+        try:
+            async with self.semaphore:
+                await self.remote_guard.throttle()
+                started = time.monotonic()
+                result = await self._pull(repo_path)
+                latency = time.monotonic() - started
+                self.semaphore.record(latency, result['success'])
+        except asyncio.CancelledError:
+            # No outcome to record; if this was the half-open probe, let the next pull probe
+            self.remote_guard.release_probe()
+            raise
+
+        if result['success']:
+            self.remote_guard.record_success(key)
+            self.pull_latency.setdefault(key, collections.deque(maxlen=PULL_SAMPLES)).append((time.time(), latency))
+        else:
+            self.remote_guard.record_failure(key, result.get('error', ''))
+        return result
+
+    async def _pull(self, repo_path: Path) -> Dict[str, Any]:
+        fields = {'student': student_id_of(repo_path)}
+        try:
+            self.logger.debug(f"Pulling repository: {repo_path}", extra=fields)
+            result = await self.backend.pull(repo_path, self.config['git']['timeout'])
+        except Exception as e:
+            self.logger.error(f"Error pulling {repo_path}: {e}", extra=fields)
+            return {'success': False, 'error': str(e)}
+
+        if result['success']:
+            result.setdefault('commit', read_head_commit(repo_path))
+            self.logger.debug(f"Successfully pulled {repo_path}: {result['message']}",
+                              extra=dict(fields, commit=result['commit']))
+        elif result['error'] == 'Timeout':
+            self.logger.error(f"Timeout pulling {repo_path}", extra=fields)
+        else:
+            self.logger.warning(f"Git pull failed for {repo_path}: {result['error']}", extra=fields)
+        return result
+
+    async def update_all_repositories(self, repos: Optional[Dict[str, Path]] = None) -> Dict[str, Dict[str, Any]]:
+        """Pull every repository in ``repos`` (student id -> path), or every one under <root>/students/"""
         tasks = []
-        for student_dir in students_dir.iterdir():
-            if student_dir.is_dir():
-                repo_path = student_dir / 'repo'
-                if repo_path.exists() and (repo_path / '.git').exists():
-                    task = self.pull_repository(repo_path)
-                    tasks.append((student_dir.name, task))
-                else:
-                    self.logger.warning(f"No git repository found for {student_dir.name}")
+        if repos is not None:
+            for student_id, repo_path in sorted(repos.items()):
+                tasks.append((student_id, self.pull_repository(repo_path)))
+        else:
+            students_dir = self.root / 'students'
+            if not students_dir.exists():
+                self.logger.warning("Students directory does not exist")
+                return {}
+
+            for student_dir in students_dir.iterdir():
+                if student_dir.is_dir():
+                    repo_path = resolve_repo_path(student_dir)
+                    if repo_path is not None:
+                        task = self.pull_repository(repo_path)
+                        tasks.append((student_dir.name, task))
+                    else:
+                        self.logger.warning(f"No git repository found for {student_dir.name}")
 
         if not tasks:
             self.logger.info("No repositories to update")
             return {}
 
+        # Run the pulls concurrently; the limiter bounds how many are in flight
+        outcomes = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
         results = {}
-        for student_id, task in tasks:
-            try:
-                result = await task
-                results[student_id] = result
-            except Exception as e:
-                self.logger.error(f"Failed to update {student_id}: {e}")
-                results[student_id] = {'success': False, 'error': str(e)}
+        for (student_id, _), result in zip(tasks, outcomes):
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to update {student_id}: {result}")
+                result = {'success': False, 'error': str(result)}
+            results[student_id] = result
 
         success_count = sum(1 for r in results.values() if r['success'])
-        self.logger.info(f"Updated {success_count}/{len(results)} repositories successfully")
+        skipped_count = sum(1 for r in results.values() if r.get('skipped'))
+        self.logger.debug(f"Updated {success_count}/{len(results)} repositories successfully"
+                         f" ({skipped_count} skipped by backoff/circuit breaker)")
 
         return results
 
     async def clone_repository(self, repo_url: str, target_path: Path) -> Dict[str, Any]:
-        async with self.semaphore:
-            try:
-                self.logger.info(f"Cloning {repo_url} to {target_path}")
+        blocked = self.remote_guard.check(repo_url)
+        if blocked:
+            return {'success': False, 'skipped': True, 'error': blocked}
 
+        try:
+            async with self.semaphore:
+                await self.remote_guard.throttle()
+                started = time.monotonic()
+                result = await self._clone(repo_url, target_path)
+                self.semaphore.record(time.monotonic() - started, result['success'])
+        except asyncio.CancelledError:
+            self.remote_guard.release_probe()
+            raise
+
+        if result['success']:
+            self.remote_guard.record_success(repo_url)
+        else:
+            self.remote_guard.record_failure(repo_url, result.get('error', ''))
+        return result
+
+    async def _clone(self, repo_url: str, target_path: Path) -> Dict[str, Any]:
+        try:
+            self.logger.info(f"Cloning {repo_url} to {target_path}")
+
+            process = await asyncio.create_subprocess_exec(
+                'git', 'clone', repo_url, str(target_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout=self.config['git'].get('timeout', 30)
+            )
+
+            if process.returncode == 0:
+                self.logger.info(f"Successfully cloned {repo_url}")
+                return {'success': True, 'message': 'Cloned successfully'}
+            else:
+                error = stderr.decode().strip()
+                self.logger.error(f"Failed to clone {repo_url}: {error}")
+                return {'success': False, 'error': error}
+
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            self.logger.error(f"Timeout cloning {repo_url}")
+            return {'success': False, 'error': 'Clone timeout'}
+        except Exception as e:
+            self.logger.error(f"Error cloning {repo_url}: {e}")
+            return {'success': False, 'error': str(e)}
+
+    async def repoint_repository(self, repo_path: Path, repo_url: str) -> Dict[str, Any]:
+        """Switch a clone to a new remote URL and reset it to that remote's HEAD"""
+        async with self.semaphore:
+            await self.remote_guard.throttle()
+            for args in (['remote', 'set-url', 'origin', repo_url],
+                         ['fetch', 'origin', 'HEAD'],
+                         ['reset', '--hard', 'FETCH_HEAD']):
                 process = await asyncio.create_subprocess_exec(
-                    'git', 'clone', repo_url, str(target_path),
+                    'git', *args,
+                    cwd=repo_path,
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE
                 )
-
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=self.config['git'].get('timeout', 30)
-                )
-
-                if process.returncode == 0:
-                    self.logger.info(f"Successfully cloned {repo_url}")
-                    return {'success': True, 'message': 'Cloned successfully'}
-                else:
+                try:
+                    _, stderr = await asyncio.wait_for(process.communicate(),
+                                                       timeout=self.config['git'].get('timeout', 30))
+                except asyncio.TimeoutError:
+                    await self._kill(process)
+                    return {'success': False, 'error': 'Timeout'}
+                if process.returncode != 0:
                     error = stderr.decode().strip()
-                    self.logger.error(f"Failed to clone {repo_url}: {error}")
+                    self.logger.error(f"Failed to re-point {repo_path} to {repo_url}: {error}")
                     return {'success': False, 'error': error}
 
-            except asyncio.TimeoutError:
-                self.logger.error(f"Timeout cloning {repo_url}")
-                return {'success': False, 'error': 'Clone timeout'}
-            except Exception as e:
-                self.logger.error(f"Error cloning {repo_url}: {e}")
-                return {'success': False, 'error': str(e)}
\ No newline at end of file
+        self.logger.info(f"Re-pointed {repo_path} to {repo_url}")
+        return {'success': True, 'commit': read_head_commit(repo_path)}
+
+    @staticmethod
+    async def _kill(process):
+        """Terminate and reap a git process that exceeded its timeout"""
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+    def get_remote_state(self, repo_path: Path) -> Dict[str, Any]:
+        """Backoff / circuit state for one repository"""
+        return self.remote_guard.repo_state(str(repo_path))
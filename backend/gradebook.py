@@ -0,0 +1,176 @@
+"""
+Gradebook export.
+
+Streams one row per student × week × problem, either the latest result
+(from the pass/fail markers, with the commit that was graded) or, with
+``history``, every recorded grading run. Rows are generated lazily from the
+students/ tree, so memory use does not grow with the class or the semester.
+
+python -m backend.gradebook --format csv -o gradebook.csv
+python -m backend.gradebook --format jsonl --history --week week03
+python -m backend.gradebook --root /srv/practicum/os2026 -o os2026.csv
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .grader import HISTORY_FILE, Grader
+from .grading_store import read_result_version
+
+FIELDS = ['student_id', 'week', 'problem', 'result', 'commit', 'graded_at', 'grader_version']
+FORMATS = ('csv', 'jsonl')
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).isoformat(timespec='seconds')
+
+
+def _result(value: Optional[bool]) -> str:
+    return {True: 'pass', False: 'fail'}.get(value, 'unknown')
+
+
+def _sorted_dirs(path: Path, prefix: str = '') -> List[str]:
+    try:
+        with os.scandir(path) as entries:
+            return sorted(e.name for e in entries if e.is_dir() and e.name.startswith(prefix))
+    except OSError:
+        return []
+
+
+def read_history(week_dir: Path) -> Iterator[Dict[str, Any]]:
+    """Grading runs recorded for one student/week, oldest first"""
+    try:
+        with open(week_dir / HISTORY_FILE, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn line from a crash
+    except OSError:
+        return
+
+
+def last_history_entry(week_dir: Path, window: int = 8192) -> Optional[Dict[str, Any]]:
+    """Most recent grading run, reading only the end of the history file"""
+    try:
+        with open(week_dir / HISTORY_FILE, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - window))
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+    return None
+
+
+def iter_rows(weeks: Optional[List[str]] = None, students: Optional[List[str]] = None,
+              history: bool = False, num_problems: Optional[int] = None,
+              students_dir: Path = Path('students')) -> Iterator[Dict[str, Any]]:
+    if num_problems is None:
+        num_problems = Grader().config['grading']['num_of_problems']
+    problem_ids = [f"{i:02d}" for i in range(1, num_problems + 1)]
+
+    for student_id in _sorted_dirs(students_dir):
+        if students and student_id not in students:
+            continue
+        for week in _sorted_dirs(students_dir / student_id, 'week'):
+            if weeks and week not in weeks:
+                continue
+            week_dir = students_dir / student_id / week
+            if history:
+                for run in read_history(week_dir):
+                    for problem in problem_ids:
+                        yield {
+                            'student_id': student_id, 'week': week, 'problem': problem,
+                            'result': _result(run.get('problems', {}).get(problem)),
+                            'commit': run.get('commit'), 'graded_at': _timestamp(run.get('graded_at')),
+                            'grader_version': run.get('grader_version'),
+                        }
+            else:
+                yield from _latest_rows(student_id, week, week_dir, problem_ids)
+
+
+def _latest_rows(student_id: str, week: str, week_dir: Path, problem_ids: List[str]) -> Iterator[Dict[str, Any]]:
+    last_run = last_history_entry(week_dir) or {}
+    version = read_result_version(week_dir)
+    for problem in problem_ids:
+        result, graded_at = None, None
+        for value, marker in ((True, f'pass{problem}'), (False, f'fail{problem}')):
+            try:
+                graded_at = (week_dir / marker).stat().st_mtime
+                result = value
+                break
+            except OSError:
+                continue
+        yield {
+            'student_id': student_id, 'week': week, 'problem': problem, 'result': _result(result),
+            'commit': last_run.get('commit'), 'graded_at': _timestamp(graded_at), 'grader_version': version,
+        }
+
+
+def iter_export(rows: Iterator[Dict[str, Any]], fmt: str = 'csv', chunk_size: int = 65536) -> Iterator[str]:
+    """Encode rows as CSV or JSON Lines, yielding chunks of about ``chunk_size`` characters"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator='\n')
+        writer.writeheader()
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row) + '\n')
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the gradebook as CSV or JSON Lines')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--week', action='append', dest='weeks', help='Week to export (repeatable, default: all)')
+    parser.add_argument('--students', help='Comma separated student ids (default: all students)')
+    parser.add_argument('--history', action='store_true', help='Every grading run instead of the latest result')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory (default: current directory)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    students = [s.strip() for s in args.students.split(',')] if args.students else None
+    num_problems = Grader(args.root).config['grading']['num_of_problems']
+    rows = iter_rows(args.weeks, students, args.history, num_problems, args.root / 'students')
+    chunks = iter_export(rows, args.format)
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    except BrokenPipeError:
+        return 1  # e.g. piped into head
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
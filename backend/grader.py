@@ -1,21 +1,54 @@
 import subprocess
-import resource
+import json
 import os
 import time
 import logging
 import yaml
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from .git_manager import read_head_commit, resolve_repo_path
+from .grading_store import GradingScriptStore, VERSION_MARKER, read_result_version
+from .output_store import GradingOutputStore, run_captured
+from .sandbox import Sandbox
+from .similarity import DEFAULTS as SIMILARITY_DEFAULTS, FINGERPRINT_DIR, Fingerprinter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# One JSON line per grading run, read by the gradebook export
+HISTORY_FILE = '.grading_history.jsonl'
+
 
 class Grader:
-    def __init__(self):
+    def __init__(self, root: Path = Path('.')):
+        # Course directory; everything below is relative to it (see courses.py)
+        self.root = Path(root)
+        self.students_dir = self.root / 'students'
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config()
+        self.script_store = GradingScriptStore(self.root / self.config['grading'].get('script_store', 'grading_store'))
+        output_config = self.config['grading'].get('output', {}) or {}
+        self.max_capture_bytes = int(output_config.get('max_capture_kb', 256) * 1024)
+        self.output_store = None
+        if output_config.get('enabled', True):
+            self.output_store = GradingOutputStore(
+                self.root / output_config.get('path', 'grading_output'),
+                keep_per_week=output_config.get('keep_per_week', 5),
+                max_total_mb=output_config.get('max_total_mb', 200)
+            )
+        similarity_config = dict(SIMILARITY_DEFAULTS, **(self.config.get('similarity') or {}))
+        self.fingerprinter = None
+        if similarity_config['enabled']:
+            self.fingerprinter = Fingerprinter(similarity_config, self.root / FINGERPRINT_DIR, self.students_dir)
+        self.sandbox = Sandbox(self.config['grading'], max_memory_mb=self._max_memory_mb())
 
     def _load_config(self) -> Dict[str, Any]:
         try:
-            with open('backend/config.backend.yaml', 'r') as file:
+            with open(self.root / 'backend/config.backend.yaml', 'r') as file:
                 return yaml.safe_load(file)
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
@@ -27,89 +60,210 @@ class Grader:
                 }
             }
 
-    def limit_resources(self):
-        """Resource limits for subprocess execution"""
+    def _max_memory_mb(self) -> int:
+        """grading.max_memory_mb from the backend config, else from config.yaml"""
+        if self.config['grading'].get('max_memory_mb'):
+            return int(self.config['grading']['max_memory_mb'])
         try:
-            # CPU time limit
-            cpu_limit = self.config['grading']['timeout']
-            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+            with open(self.root / 'config.yaml', 'r') as file:
+                return int((yaml.safe_load(file).get('grading') or {}).get('max_memory_mb', 512))
+        except Exception:
+            return 512
 
-            # Memory limit (512MB in bytes)
-            memory_limit = 512 * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
-        except (AttributeError, OSError) as e:
-            # Windows doesn't support resource limits
-            self.logger.warning(f"Resource limits not available: {e}")
+    def grade_student(self, student_id: str, week: str = 'week01',
+                      usage: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+        """Grade a single student's submission for a specific week
 
-    def grade_student(self, student_id: str, week: str = 'week01') -> Dict[str, bool]:
-        """Grade a single student's submission for a specific week"""
-        student_dir = Path(f'students/{student_id}')
+        If ``usage`` is given it is filled with the job's resource usage
+        (wall/CPU seconds, peak RSS, limit mode).
+        """
+        student_dir = self.students_dir / student_id
 
         if not student_dir.exists():
             self.logger.error(f"Student directory not found: {student_id}")
-            return self._create_default_fail_results()
+            return self.default_fail_results()
+
+        return self._grade(student_dir, student_id, week, usage, live=True)
+
+    def grade_checkout(self, student_dir: Path, student_id: str, week: str = 'week01',
+                       usage: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+        """Grade a copy of a student directory laid out like ``students/<id>`` (e.g. a deadline worktree)
 
-        # Look for grading script in student's week directory
+        Results are left in ``student_dir``; live results, grading history, stored
+        output and similarity fingerprints are not touched.
+        """
+        return self._grade(Path(student_dir), student_id, week, usage, live=False)
+
+    def _grade(self, student_dir: Path, student_id: str, week: str,
+               usage: Optional[Dict[str, Any]], live: bool) -> Dict[str, bool]:
         week_dir = student_dir / week
-        grade_script = week_dir / 'grade.py'
+        fields = {'student': student_id, 'week': week}
+
+        # Prefer the published grader version; fall back to a per-student copy
+        grader_version = self.script_store.current_version(week)
+        script_dir = self.script_store.script_dir(week, grader_version)
+        if script_dir is not None:
+            grade_script = script_dir / 'grade.py'
+            week_dir.mkdir(exist_ok=True)
+        else:
+            grader_version = None
+            grade_script = week_dir / 'grade.py'
 
         if not grade_script.exists():
-            self.logger.warning(f"Grade script not found for {student_id}/{week}")
+            self.logger.warning(f"Grade script not found for {student_id}/{week}", extra=fields)
             # Try alternative locations
             for alt_location in [student_dir / 'grade.py', student_dir / 'driver.py']:
                 if alt_location.exists():
                     grade_script = alt_location
                     break
             else:
-                self.logger.error(f"No grading script found for {student_id}")
-                return self._create_default_fail_results()
+                self.logger.error(f"No grading script found for {student_id}", extra=fields)
+                return self.default_fail_results()
 
         try:
-            # Clean up previous results in the week directory
-            self._cleanup_results(week_dir)
-
-            # Execute grading
-            self.logger.info(f"Grading student: {student_id}/{week}")
+            # Live grading and bulk regrades may target the same week directory
+            with self._week_lock(week_dir):
+                if script_dir is not None:
+                    # The grader runs from the week directory with its data files beside it, as before
+                    grade_script = self.script_store.materialize(week, grader_version, week_dir)
+
+                # Clean up previous results in the week directory
+                self._cleanup_results(week_dir)
+
+                # Execute grading
+                self.logger.debug(f"Grading student: {student_id}/{week}", extra=fields)
+
+                # Use different execution method based on OS
+                started = time.time()
+                job = self.sandbox.job()
+                try:
+                    try:
+                        if os.name == 'nt':  # Windows
+                            result = self._grade_windows(grade_script, week_dir)
+                        else:  # Unix-like
+                            result = self._grade_unix(grade_script, week_dir, job)
+                    except subprocess.TimeoutExpired as e:
+                        job_usage = self._record_usage(job, getattr(e, 'rusage', None), started, usage, fields)
+                        if live:
+                            self._store_output(student_id, week, e.output or '', e.stderr or '',
+                                               returncode=None, timed_out=True, duration=time.time() - started,
+                                               grader_version=grader_version, usage=job_usage,
+                                               truncated=getattr(e, 'truncated', None))
+                        raise
+                    job_usage = self._record_usage(job, getattr(result, 'rusage', None), started, usage, fields)
+                finally:
+                    job.cleanup()
+
+                if live:
+                    self._store_output(student_id, week, result.stdout, result.stderr,
+                                       returncode=result.returncode, timed_out=False,
+                                       duration=time.time() - started, grader_version=grader_version,
+                                       usage=job_usage, truncated=getattr(result, 'truncated', None))
+                self._write_version_marker(week_dir, grader_version)
+
+                # Check results for individual problems
+                results = self._check_problem_results(week_dir, student_id, week)
+                if live:
+                    self._append_history(student_dir, week_dir, results, grader_version, job_usage)
+                    self._update_fingerprint(student_id, week)
+                return results
 
-            # Use different execution method based on OS
-            if os.name == 'nt':  # Windows
-                result = self._grade_windows(grade_script, week_dir)
-            else:  # Unix-like
-                result = self._grade_unix(grade_script, week_dir)
-
-            # Check results for individual problems
-            return self._check_problem_results(week_dir, student_id, week)
+        except Exception as e:
+            self.logger.error(f"Grading error for {student_id}/{week}: {e}", extra=fields)
+            return self.default_fail_results()
 
+    def _store_output(self, student_id: str, week: str, stdout: str, stderr: str, **meta):
+        """Keep the grader's output for diagnostics (see output_store.py)"""
+        if self.output_store is None:
+            return
+        try:
+            self.output_store.record(student_id, week, stdout, stderr, **meta)
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def _record_usage(self, job, rusage, started: float, usage: Optional[Dict[str, Any]],
+                      fields: Dict[str, Any]) -> Dict[str, Any]:
+        job_usage = job.usage(rusage, time.time() - started)
+        if job_usage.get('oom_killed'):
+            self.logger.warning(f"Grading {fields['student']}/{fields['week']} hit the memory limit",
+                                extra=dict(fields, usage=job_usage))
+        if usage is not None:
+            usage.update(job_usage)
+        return job_usage
+
+    def _append_history(self, student_dir: Path, week_dir: Path, results: Dict[str, bool],
+                        version: Optional[str], usage: Optional[Dict[str, Any]] = None):
+        repo_path = resolve_repo_path(student_dir)
+        entry = {
+            'graded_at': time.time(),
+            'commit': read_head_commit(repo_path) if repo_path else None,
+            'grader_version': version,
+            'problems': results,
+            'usage': usage,
+        }
+        try:
+            with open(week_dir / HISTORY_FILE, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            self.logger.warning(f"Failed to append grading history in {week_dir}: {e}")
+
+    def _update_fingerprint(self, student_id: str, week: str):
+        """Refresh the similarity fingerprint (no-op if the submission is unchanged)"""
+        if self.fingerprinter is None:
+            return
+        try:
+            self.fingerprinter.update(student_id, week)
         except Exception as e:
-            self.logger.error(f"Grading error for {student_id}/{week}: {e}")
-            return self._create_default_fail_results()
+            self.logger.warning(f"Failed to fingerprint {student_id}/{week}: {e}",
+                                extra={'student': student_id, 'week': week})
 
-    def _create_default_fail_results(self) -> Dict[str, bool]:
-        """Create default fail results for all problems"""
+    def _write_version_marker(self, week_dir: Path, version: Optional[str]):
+        """Record which grader version produced the results in ``week_dir``"""
+        marker = week_dir / VERSION_MARKER
+        try:
+            if version:
+                marker.write_text(version)
+            elif marker.exists():
+                marker.unlink()
+        except OSError as e:
+            self.logger.warning(f"Failed to record grader version in {week_dir}: {e}")
+
+    @contextmanager
+    def _week_lock(self, week_dir: Path):
+        """Exclusive per-week lock across processes (no-op where fcntl is unavailable)"""
+        if fcntl is None or not week_dir.exists():
+            yield
+            return
+        with open(week_dir / '.grading.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def default_fail_results(self) -> Dict[str, bool]:
+        """Fail results for all problems (no submission, or grading failed)"""
         num_problems = self.config['grading']['num_of_problems']
         return {f"{i:02d}": False for i in range(1, num_problems + 1)}
 
     def _grade_windows(self, script_path: Path, working_dir: Path) -> subprocess.CompletedProcess:
         """Grade on Windows (no resource limits)"""
-        return subprocess.run([
-            'python', str(script_path)
+        return run_captured([
+            'python', str(script_path.resolve())
         ],
         cwd=working_dir,
         timeout=self.config['grading']['timeout'],
-        capture_output=True,
-        text=True
+        max_bytes=self.max_capture_bytes
         )
 
-    def _grade_unix(self, script_path: Path, working_dir: Path) -> subprocess.CompletedProcess:
-        """Grade on Unix-like systems (with resource limits)"""
-        return subprocess.run([
-            'python3', str(script_path)
-        ],
+    def _grade_unix(self, script_path: Path, working_dir: Path, job) -> subprocess.CompletedProcess:
+        """Grade on Unix-like systems (with the job's resource limits)"""
+        return run_captured(job.command([
+            'python3', str(script_path.resolve())
+        ]),
         cwd=working_dir,
         timeout=self.config['grading']['timeout'],
-        capture_output=True,
-        text=True,
-        preexec_fn=self.limit_resources
+        max_bytes=self.max_capture_bytes
         )
 
     def _cleanup_results(self, working_dir: Path):
@@ -130,6 +284,7 @@ class Grader:
         """Check grading results for individual problems"""
         results = {}
         num_problems = self.config['grading']['num_of_problems']
+        fields = {'student': student_id, 'week': week}
 
         for problem_num in range(1, num_problems + 1):
             problem_id = f"{problem_num:02d}"
@@ -138,21 +293,21 @@ class Grader:
 
             if pass_file.exists():
                 results[problem_id] = True
-                self.logger.info(f"Student {student_id}/{week} problem {problem_id}: PASS")
+                self.logger.debug(f"Student {student_id}/{week} problem {problem_id}: PASS", extra=fields)
             elif fail_file.exists():
                 results[problem_id] = False
-                self.logger.info(f"Student {student_id}/{week} problem {problem_id}: FAIL")
+                self.logger.debug(f"Student {student_id}/{week} problem {problem_id}: FAIL", extra=fields)
             else:
                 # No result file - treat as failure
                 results[problem_id] = False
-                self.logger.warning(f"No result file for {student_id}/{week} problem {problem_id}")
+                self.logger.warning(f"No result file for {student_id}/{week} problem {problem_id}",
+                                    extra=fields)
 
         return results
 
     def get_student_status(self, student_id: str, week: str = 'week01') -> Optional[Dict[str, Any]]:
         """Get current grading status for a student"""
-        student_dir = Path(f'students/{student_id}')
-        week_dir = student_dir / week
+        week_dir = self.students_dir / student_id / week
 
         if not week_dir.exists():
             return None
@@ -187,20 +342,21 @@ class Grader:
         return {
             'status': overall_status,
             'problems': problem_results,
-            'last_update': last_update_time
+            'last_update': last_update_time,
+            'grader_version': read_result_version(week_dir)
         }
 
-    def get_all_student_statuses(self, week: str = 'week01') -> Dict[str, Dict[str, Any]]:
-        """Get grading status for all students"""
-        students_dir = Path('students')
-        if not students_dir.exists():
-            return {}
+    def get_all_student_statuses(self, week: str = 'week01', student_ids=None) -> Dict[str, Dict[str, Any]]:
+        """Get grading status for all students (or only ``student_ids``)"""
+        if student_ids is None:
+            if not self.students_dir.exists():
+                return {}
+            student_ids = [d.name for d in self.students_dir.iterdir() if d.is_dir()]
 
         statuses = {}
-        for student_dir in students_dir.iterdir():
-            if student_dir.is_dir():
-                status = self.get_student_status(student_dir.name, week)
-                if status:
-                    statuses[student_dir.name] = status
+        for student_id in student_ids:
+            status = self.get_student_status(student_id, week)
+            if status:
+                statuses[student_id] = status
 
         return statuses
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Shared, content-versioned grading scripts.
+
+Each week's grading directory is stored once under
+``grading_store/<week>/<version>/`` where ``version`` is a hash of its
+contents; ``grading_store/current.json`` maps each week to the version that
+is live. Publishing a new version is atomic (the mapping file is replaced in
+one rename) and regrades only results produced by another version.
+
+Before a run the live version's files are copied into the student's week
+directory (once per version, listed in ``.grader_files.json``), and grade.py
+runs from there, so graders keep opening their data files next to
+themselves or relative to the working directory.
+
+python -m backend.grading_store publish week03 grading/week03
+python -m backend.grading_store --root /srv/practicum/os2026 publish week03 grading/week03
+python -m backend.grading_store list
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+VERSION_MARKER = '.grader_version'
+# Files of the grader version copied into a week directory
+MANIFEST = '.grader_files.json'
+
+
+def content_version(source: Path) -> str:
+    """Hash of every file's relative path and bytes, independent of mtimes"""
+    digest = hashlib.sha256()
+    for path in sorted(p for p in source.rglob('*') if p.is_file()):
+        relative = path.relative_to(source).as_posix()
+        if '__pycache__' in relative:
+            continue
+        digest.update(relative.encode() + b'\0')
+        digest.update(path.read_bytes() + b'\0')
+    return digest.hexdigest()[:16]
+
+
+class GradingScriptStore:
+    def __init__(self, root: Path = Path('grading_store')):
+        self.root = Path(root)
+        self.logger = logging.getLogger(__name__)
+        self._current: Dict[str, str] = {}
+        self._current_mtime: Optional[float] = None
+
+    @property
+    def current_file(self) -> Path:
+        return self.root / 'current.json'
+
+    def current_versions(self) -> Dict[str, str]:
+        """week -> live version (re-read only when current.json changes)"""
+        try:
+            mtime = self.current_file.stat().st_mtime
+        except OSError:
+            return {}
+        if mtime != self._current_mtime:
+            try:
+                self._current = json.loads(self.current_file.read_text(encoding='utf-8'))
+                self._current_mtime = mtime
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Failed to read {self.current_file}: {e}")
+        return dict(self._current)
+
+    def current_version(self, week: str) -> Optional[str]:
+        return self.current_versions().get(week)
+
+    def script_dir(self, week: str, version: Optional[str] = None) -> Optional[Path]:
+        version = version or self.current_version(week)
+        if not version:
+            return None
+        path = self.root / week / version
+        return path if path.is_dir() else None
+
+    def materialize(self, week: str, version: str, target: Path) -> Path:
+        """Copy a stored version's files into ``target`` unless already there; returns its grade.py
+
+        Files of the previously copied version that the new one lacks are removed.
+        """
+        source = self.root / week / version
+        previous = read_manifest(target)
+        if previous.get('version') != version or not (target / 'grade.py').exists():
+            files = sorted(path.relative_to(source).as_posix() for path in source.rglob('*')
+                           if path.is_file() and '__pycache__' not in path.parts)
+            for name in set(previous.get('files', [])) - set(files):
+                try:
+                    (target / name).unlink()
+                except OSError:
+                    pass
+            for name in files:
+                (target / name).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source / name, target / name)
+            tmp = target / f'{MANIFEST}.tmp'
+            tmp.write_text(json.dumps({'version': version, 'files': files}), encoding='utf-8')
+            os.replace(tmp, target / MANIFEST)
+        return target / 'grade.py'
+
+    def publish(self, week: str, source: Path) -> Tuple[str, Optional[str]]:
+        """Store ``source`` as a version of ``week`` and make it live; returns (new, previous)"""
+        source = Path(source)
+        if not (source / 'grade.py').exists():
+            raise FileNotFoundError(f"{source} has no grade.py")
+
+        version = content_version(source)
+        target = self.root / week / version
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            staging = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=target.parent))
+            shutil.copytree(source, staging, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns('__pycache__', 'pass*', 'fail*'))
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Someone published the same content concurrently
+                shutil.rmtree(staging, ignore_errors=True)
+
+        current = self.current_versions()
+        previous = current.get(week)
+        if previous != version:
+            current[week] = version
+            self._write_current(current)
+            self.logger.info(f"Published grader {week}@{version} (was {previous or 'none'})")
+        return version, previous
+
+    def _write_current(self, current: Dict[str, str]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.current-', dir=self.root)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+        os.replace(tmp, self.current_file)
+
+    def publish_all(self, grading_dir: Path) -> Dict[str, str]:
+        """Publish every week directory found in ``grading_dir``"""
+        published = {}
+        if Path(grading_dir).exists():
+            for week_dir in sorted(Path(grading_dir).iterdir()):
+                if week_dir.is_dir() and (week_dir / 'grade.py').exists():
+                    published[week_dir.name], _ = self.publish(week_dir.name, week_dir)
+        return published
+
+    def versions(self, week: str) -> List[str]:
+        week_dir = self.root / week
+        if not week_dir.exists():
+            return []
+        return sorted(p.name for p in week_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+
+def read_manifest(week_dir: Path) -> Dict[str, Any]:
+    """Version and files of the grader copied into ``week_dir`` (empty if none)"""
+    try:
+        return json.loads((week_dir / MANIFEST).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def read_result_version(week_dir: Path) -> Optional[str]:
+    try:
+        return (week_dir / VERSION_MARKER).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def stale_students(week: str, version: str, root: Path = Path('.')) -> List[str]:
+    """Students of the course at ``root`` whose result for ``week`` was produced by another grader version"""
+    students_dir = root / 'students'
+    stale = []
+    if students_dir.exists():
+        for student_dir in sorted(students_dir.iterdir()):
+            week_dir = student_dir / week
+            if week_dir.is_dir() and read_result_version(week_dir) != version:
+                stale.append(student_dir.name)
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage shared grading script versions')
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory (default: current directory)')
+    parser.add_argument('--store', type=Path, help='Store directory (default: grading_store in the course directory)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    publish = sub.add_parser('publish', help='Publish a new grader version for a week')
+    publish.add_argument('week')
+    publish.add_argument('source', help='Directory containing grade.py')
+    publish.add_argument('--no-regrade', action='store_true',
+                         help='Do not regrade results produced by the previous version')
+    publish.add_argument('--parallel', type=int, default=2)
+    sub.add_parser('list', help='Show live and stored versions')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = GradingScriptStore(args.store or args.root / 'grading_store')
+
+    if args.command == 'list':
+        current = store.current_versions()
+        weeks = sorted(set(current) | {p.name for p in store.root.glob('week*') if p.is_dir()})
+        for week in weeks:
+            print(json.dumps({'week': week, 'current': current.get(week), 'versions': store.versions(week)}))
+        return 0
+
+    try:
+        version, previous = store.publish(args.week, Path(args.source))
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        return 1
+    if version == previous:
+        logging.info(f"{args.week}@{version} is already live")
+    if args.no_regrade:
+        return 0
+
+    students = stale_students(args.week, version, args.root)
+    if not students:
+        logging.info(f"No results from older {args.week} graders to regrade")
+        return 0
+
+    from .regrade import BulkRegrade
+    logging.info(f"Regrading {len(students)} students graded by an older {args.week} grader")
+    result = BulkRegrade.create([args.week], students, root=args.root, parallel=args.parallel).run()
+    return 0 if result['state'] == 'completed' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import collections
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.managers import BaseManager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    def __init__(self, job_id: str, payload: Dict[str, Any], max_attempts: int):
+        self.job_id = job_id
+        self.payload = payload
+        self.max_attempts = max_attempts
+        self.state = PENDING
+        self.attempts = 0
+        self.worker: Optional[str] = None
+        self.lease_expires = 0.0
+        self.submitted = time.time()
+        self.future: Future = Future()
+
+
+class LocalJobQueue:
+    """In-memory grading job queue with worker leases
+
+    A leased job must be heartbeated before ``lease_seconds`` runs out; if the
+    worker dies the lease expires and the job is handed to another worker, up to
+    ``max_attempts`` times. The scheduler waits on the Future returned by
+    ``submit``; workers in other processes or on other nodes reach the queue
+    through ``serve_job_queue``.
+    """
+
+    def __init__(self, lease_seconds: float = 60, max_attempts: int = 3):
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = max(1, int(max_attempts))
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._pending: Deque[str] = collections.deque()
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self.completed = 0
+        self.redispatched = 0
+
+    def submit(self, payload: Dict[str, Any]) -> Tuple[str, Future]:
+        """Queue a job; the Future resolves to the worker's result dict"""
+        with self._lock:
+            job_id = f"job-{next(self._ids)}"
+            job = Job(job_id, payload, self.max_attempts)
+            self._jobs[job_id] = job
+            self._pending.append(job_id)
+        return job_id, job.future
+
+    def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Hand the next pending job to ``worker_id`` (None if the queue is empty)"""
+        with self._lock:
+            self._touch_worker(worker_id, None)
+            self._expire_leases()
+            while self._pending:
+                job = self._jobs.get(self._pending.popleft())
+                if job is None or job.state != PENDING:
+                    continue
+                job.state = LEASED
+                job.worker = worker_id
+                job.attempts += 1
+                job.lease_expires = time.monotonic() + self.lease_seconds
+                self._touch_worker(worker_id, job.job_id)
+                return {'job_id': job.job_id, 'payload': job.payload,
+                        'attempt': job.attempts, 'lease_seconds': self.lease_seconds}
+            return None
+
+    def heartbeat(self, worker_id: str, job_id: Optional[str] = None) -> bool:
+        """Extend the lease on ``job_id``; False if the worker no longer holds it"""
+        with self._lock:
+            self._touch_worker(worker_id, job_id)
+            if job_id is None:
+                return True
+            job = self._jobs.get(job_id)
+            if job is None or job.state != LEASED or job.worker != worker_id:
+                return False
+            job.lease_expires = time.monotonic() + self.lease_seconds
+            return True
+
+    def complete(self, worker_id: str, job_id: str, result: Dict[str, Any]) -> bool:
+        """Store a result; the first result for a job wins"""
+        with self._lock:
+            self._touch_worker(worker_id, None)
+            job = self._jobs.get(job_id)
+            if job is None or job.state in (DONE, FAILED):
+                return False
+            if job.worker != worker_id:
+                self.logger.info(f"Accepting late result for {job_id} from {worker_id}")
+            job.state = DONE
+            self.completed += 1
+            self._workers[worker_id]['completed'] += 1
+            del self._jobs[job_id]
+            job.future.set_result(dict(result, job_id=job_id, worker=worker_id, attempts=job.attempts))
+        return True
+
+    def fail(self, worker_id: str, job_id: str, error: str) -> bool:
+        """Report a job the worker could not run; it is retried until max_attempts"""
+        with self._lock:
+            self._touch_worker(worker_id, None)
+            job = self._jobs.get(job_id)
+            if job is None or job.state != LEASED or job.worker != worker_id:
+                return False
+            if self._retry_or_fail(job, error):
+                self._resolve_failed(job, error)
+        return True
+
+    def expire_leases(self):
+        """Re-dispatch jobs whose worker stopped heartbeating"""
+        with self._lock:
+            self._expire_leases()
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for job in list(self._jobs.values()):
+            if job.state == LEASED and job.lease_expires < now:
+                self.logger.warning(f"Lease on {job.job_id} held by {job.worker} expired")
+                self.redispatched += 1
+                if job.worker in self._workers:
+                    self._workers[job.worker]['job'] = None
+                if self._retry_or_fail(job, f"lease expired on {job.worker}"):
+                    self._resolve_failed(job, 'lease expired')
+
+    def _retry_or_fail(self, job: Job, error: str) -> bool:
+        """Requeue ``job`` or mark it failed; returns True if it failed for good"""
+        job.worker = None
+        if job.attempts >= job.max_attempts:
+            job.state = FAILED
+            del self._jobs[job.job_id]
+            self.logger.error(f"{job.job_id} failed after {job.attempts} attempts: {error}")
+            return True
+        job.state = PENDING
+        self._pending.appendleft(job.job_id)
+        return False
+
+    def _resolve_failed(self, job: Job, error: str):
+        job.future.set_result({'job_id': job.job_id, 'error': error, 'attempts': job.attempts})
+
+    def live_workers(self) -> int:
+        """Workers (one per slot) that leased or heartbeated within the lease time"""
+        with self._lock:
+            now = time.time()
+            return sum(1 for info in self._workers.values() if now - info['last_seen'] < self.lease_seconds)
+
+    def _touch_worker(self, worker_id: str, job_id: Optional[str]):
+        worker = self._workers.setdefault(worker_id, {'completed': 0, 'job': None})
+        worker['last_seen'] = time.time()
+        worker['job'] = job_id
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            return {
+                'pending': sum(1 for j in self._jobs.values() if j.state == PENDING),
+                'leased': sum(1 for j in self._jobs.values() if j.state == LEASED),
+                'completed': self.completed,
+                'redispatched': self.redispatched,
+                'workers': {
+                    worker_id: {
+                        'job': info['job'],
+                        'completed': info['completed'],
+                        'last_seen_ago': round(now - info['last_seen'], 1),
+                    }
+                    for worker_id, info in self._workers.items()
+                    # Forget workers that have been silent for a while
+                    if now - info['last_seen'] < 10 * self.lease_seconds
+                },
+            }
+
+
+# Methods reachable by remote workers; submit/snapshot stay scheduler-only
+WORKER_METHODS = ('lease', 'heartbeat', 'complete', 'fail')
+# The manager exchanges pickles, so whoever knows the key can run code on the other end
+WEAK_AUTHKEYS = (b'', b'change-me')
+
+
+def check_authkey(authkey: bytes):
+    if authkey.strip() in WEAK_AUTHKEYS:
+        raise ValueError("Refusing to use an empty or default job queue authkey: set distributed.authkey "
+                         "or GRADING_AUTHKEY to a random secret "
+                         "(python -c 'import secrets; print(secrets.token_hex(32))')")
+
+
+def serve_job_queue(job_queue: LocalJobQueue, address: Tuple[str, int], authkey: bytes) -> threading.Thread:
+    """Expose ``job_queue`` to worker processes over TCP (stdlib multiprocessing)"""
+    check_authkey(authkey)
+
+    class QueueServer(BaseManager):
+        pass
+
+    QueueServer.register('get_queue', callable=lambda: job_queue, exposed=WORKER_METHODS)
+    server = QueueServer(address=address, authkey=authkey).get_server()
+    thread = threading.Thread(target=server.serve_forever, name='job-queue-server', daemon=True)
+    thread.start()
+    return thread
+
+
+def connect_job_queue(address: Tuple[str, int], authkey: bytes):
+    """Connect to a queue served by serve_job_queue; returns a proxy"""
+    check_authkey(authkey)
+
+    class QueueClient(BaseManager):
+        pass
+
+    QueueClient.register('get_queue')
+    manager = QueueClient(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_queue()
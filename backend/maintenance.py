@@ -0,0 +1,287 @@
+"""
+Background maintenance of the student clones.
+
+Every pull leaves loose objects and small packs behind, and over a semester
+they slow pulls down. The scheduler runs ``git gc`` (repack + prune) on clones
+that need it: more than ``loose_objects`` loose objects or ``packs`` packs, no
+pull brought changes for ``idle_seconds``, not maintained within
+``min_interval`` and no grading owed. It maintains one clone at a time, only
+while no pull or grading job is running or waiting and the host load is below
+``max_load`` per core, at the lowest CPU priority; the monitor loop skips the
+clone being maintained.
+
+Each clone's disk usage, loose object and pack counts before and after, and
+its median pull latency before and after (from the scheduler's own pulls), are
+kept in ``state/maintenance.json``.
+
+python -m backend.maintenance              # print the report
+python -m backend.maintenance --run        # maintain the clones that need it now
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .git_manager import resolve_repo_path
+
+DEFAULTS = {
+    'enabled': True,
+    'interval': 600,
+    'idle_seconds': 1800,
+    'min_interval': 86400,
+    'loose_objects': 200,
+    'packs': 10,
+    'max_load': 0.5,
+    'nice': 19,
+    'timeout': 600,
+    'prune': '2.weeks.ago',
+    'path': 'state/maintenance.json',
+}
+
+
+def object_counts(git_dir: Path) -> Optional[Dict[str, int]]:
+    """Loose objects and packs in a repository, counted without running git"""
+    objects = git_dir / 'objects'
+    if not objects.is_dir():
+        return None
+    loose = 0
+    with os.scandir(objects) as entries:
+        for entry in entries:
+            if len(entry.name) == 2 and entry.is_dir():
+                loose += len(os.listdir(entry.path))
+    return {'loose_objects': loose, 'packs': sum(1 for _ in (objects / 'pack').glob('*.pack'))}
+
+
+def disk_usage(git_dir: Path) -> int:
+    total = 0
+    for directory, _, files in os.walk(git_dir):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def last_activity(repo_path: Path) -> float:
+    """When a pull last brought changes into the clone
+
+    logs/HEAD is appended to only when HEAD moves, so pulls that find nothing new
+    leave it alone (unlike FETCH_HEAD, which every fetch rewrites). A clone without
+    a reflog falls back to HEAD itself.
+    """
+    git_dir = repo_path / '.git'
+    for path in (git_dir / 'logs' / 'HEAD', git_dir / 'HEAD'):
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            pass
+    return 0.0
+
+
+def load_report(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _median(samples: List[float]) -> Optional[float]:
+    return round(statistics.median(samples), 3) if samples else None
+
+
+class RepoMaintenance:
+    """Maintenance state and report of one course's clones"""
+
+    def __init__(self, config: Dict[str, Any], root: Path = Path('.'), git_manager=None):
+        self.config = dict(DEFAULTS, **(config.get('maintenance') or {}))
+        self.path = Path(root) / self.config['path']
+        self.git_manager = git_manager
+        self.logger = logging.getLogger(__name__)
+        self.repos: Dict[str, Dict[str, Any]] = (load_report(self.path) or {}).get('repos', {})
+        self.in_progress: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['enabled'])
+
+    def is_idle(self, student_id: str, repo_path: Path, busy, now: float) -> bool:
+        last = self.repos.get(student_id, {}).get('maintained_at', 0)
+        return (student_id not in busy
+                and now - last >= self.config['min_interval']
+                and now - last_activity(repo_path) >= self.config['idle_seconds'])
+
+    def due(self, repos: Dict[str, Path], busy=(), now: Optional[float] = None) -> List[Tuple[str, Path]]:
+        """Idle clones past the loose object or pack threshold, most fragmented first"""
+        now = now or time.time()
+        due = []
+        for student_id, repo_path in repos.items():
+            if not self.is_idle(student_id, repo_path, busy, now):
+                continue
+            counts = object_counts(repo_path / '.git')
+            if counts is None:
+                continue
+            score = max(counts['loose_objects'] / self.config['loose_objects'],
+                        counts['packs'] / self.config['packs'])
+            if score >= 1:
+                due.append((score, student_id, repo_path))
+        return [(student_id, repo_path) for _, student_id, repo_path in sorted(due, key=lambda d: -d[0])]
+
+    def _latencies(self, repo_path: Path, after: float = 0.0, before: float = float('inf')) -> List[float]:
+        if self.git_manager is None:
+            return []
+        samples = self.git_manager.pull_latency.get(str(repo_path), ())
+        return [latency for at, latency in samples if after < at < before]
+
+    def _priority_prefix(self) -> List[str]:
+        """nice/ionice command prefix for git gc (no preexec_fn: the scheduler runs threads)"""
+        prefix = []
+        if self.config['nice'] and shutil.which('nice'):
+            prefix += ['nice', '-n', str(self.config['nice'])]
+        if shutil.which('ionice'):
+            prefix += ['ionice', '-c', '2', '-n', '7']  # lowest best-effort I/O priority
+        return prefix
+
+    async def _gc(self, repo_path: Path) -> Optional[str]:
+        """Run git gc in the clone; the error message, or None on success"""
+        process = await asyncio.create_subprocess_exec(
+            *self._priority_prefix(), 'git', 'gc', '--quiet', f"--prune={self.config['prune']}",
+            cwd=repo_path,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self.config['timeout'])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return 'Timeout'
+        return None if process.returncode == 0 else stderr.decode().strip()
+
+    async def maintain(self, student_id: str, repo_path: Path) -> Dict[str, Any]:
+        """Repack and prune one clone and record its report entry"""
+        git_dir = repo_path / '.git'
+        self.in_progress = student_id
+        try:
+            before = await asyncio.to_thread(self._stats, git_dir)
+            started = time.time()
+            error = await self._gc(repo_path)
+            after = await asyncio.to_thread(self._stats, git_dir)
+        finally:
+            self.in_progress = None
+
+        entry = {
+            'maintained_at': time.time(),
+            'duration': round(time.time() - started, 2),
+            'success': error is None,
+            'error': error,
+            'before': before,
+            'after': after,
+            'pull_latency_before': _median(self._latencies(repo_path, before=started)),
+            'pull_latency_after': None,
+        }
+        self.repos[student_id] = entry
+        self.save()
+
+        fields = {'student': student_id}
+        if error:
+            self.logger.warning(f"Maintenance of {repo_path} failed: {error}", extra=fields)
+        else:
+            self.logger.info(
+                f"Maintained {repo_path} in {entry['duration']}s: "
+                f"{before['disk_bytes'] / 1e6:.1f} -> {after['disk_bytes'] / 1e6:.1f} MB, "
+                f"{before['loose_objects']} -> {after['loose_objects']} loose objects, "
+                f"{before['packs']} -> {after['packs']} packs", extra=fields)
+        return entry
+
+    @staticmethod
+    def _stats(git_dir: Path) -> Dict[str, int]:
+        return dict(object_counts(git_dir) or {'loose_objects': 0, 'packs': 0}, disk_bytes=disk_usage(git_dir))
+
+    def report(self, repos: Optional[Dict[str, Path]] = None) -> Dict[str, Any]:
+        """Per-clone report and totals; pull latency after maintenance comes from pulls made since"""
+        for student_id, repo_path in (repos or {}).items():
+            entry = self.repos.get(student_id)
+            if entry is not None:
+                latency = _median(self._latencies(repo_path, after=entry['maintained_at']))
+                if latency is not None:
+                    entry['pull_latency_after'] = latency
+        return {'summary': self.summary(), 'repos': self.repos}
+
+    def summary(self) -> Dict[str, Any]:
+        maintained = [entry for entry in self.repos.values() if entry['success']]
+        compared = [entry for entry in maintained
+                    if entry['pull_latency_before'] is not None and entry['pull_latency_after'] is not None]
+        return {
+            'enabled': self.enabled,
+            'in_progress': self.in_progress,
+            'maintained': len(maintained),
+            'failed': len(self.repos) - len(maintained),
+            'disk_mb_before': round(sum(e['before']['disk_bytes'] for e in maintained) / 1e6, 1),
+            'disk_mb_after': round(sum(e['after']['disk_bytes'] for e in maintained) / 1e6, 1),
+            'pull_latency_before': _median([e['pull_latency_before'] for e in compared]),
+            'pull_latency_after': _median([e['pull_latency_after'] for e in compared]),
+        }
+
+    def save(self, repos: Optional[Dict[str, Path]] = None):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(dict(self.report(repos), updated=time.time())), encoding='utf-8')
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.logger.error(f"Failed to save maintenance report {self.path}: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report on or run maintenance of the student clones')
+    parser.add_argument('--run', action='store_true', help='Maintain the clones that need it now')
+    parser.add_argument('--force', action='store_true',
+                        help='With --run, ignore the idle time and thresholds and maintain every clone')
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory (default: current directory)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        with open(args.root / 'backend/config.backend.yaml', 'r') as file:
+            config = yaml.safe_load(file) or {}
+    except OSError:
+        config = {}
+    maintenance = RepoMaintenance(config, args.root)
+
+    if args.run:
+        students_dir = args.root / 'students'
+        repos = {}
+        if students_dir.exists():
+            for student_dir in sorted(students_dir.iterdir()):
+                repo_path = resolve_repo_path(student_dir) if student_dir.is_dir() else None
+                if repo_path is not None:
+                    repos[student_dir.name] = repo_path
+        targets = list(repos.items()) if args.force else maintenance.due(repos)
+        logging.info(f"Maintaining {len(targets)} of {len(repos)} clones")
+        for student_id, repo_path in targets:
+            asyncio.run(maintenance.maintain(student_id, repo_path))
+
+    print(json.dumps(maintenance.report()['summary'] if args.run else maintenance.report(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Bounded store of grading output.
+
+``run_captured`` runs a grading script and keeps at most ``max_bytes`` of each
+stream while it is read (the first half and the last half, so a print loop
+cannot exhaust memory but the final traceback survives). ``GradingOutputStore``
+keeps the last ``keep_per_week`` outputs of every student/week as gzip files
+under ``grading_output/<student>/<week>/`` and evicts the oldest outputs once
+the whole store exceeds ``max_total_mb``.
+
+Each file is a JSON metadata line followed by the captured stdout and stderr.
+"""
+import collections
+import gzip
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .sandbox import wait_with_rusage
+
+# A leading letter or digit rules out '.' and '..', which would leave the store
+SAFE_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+SUFFIX = '.log.gz'
+
+
+class BoundedCapture:
+    """Drain a pipe on a thread, keeping only its head and tail"""
+
+    def __init__(self, pipe, max_bytes: int):
+        self.pipe = pipe
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail: Deque[bytes] = collections.deque()
+        self.tail_size = 0
+        self.total = 0
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        try:
+            for chunk in iter(lambda: self.pipe.read1(65536), b''):
+                self.total += len(chunk)
+                room = self.head_limit - len(self.head)
+                if room > 0:
+                    self.head += chunk[:room]
+                    chunk = chunk[room:]
+                if chunk:
+                    self.tail.append(chunk)
+                    self.tail_size += len(chunk)
+                    while self.tail_size - len(self.tail[0]) >= self.tail_limit:
+                        self.tail_size -= len(self.tail.popleft())
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.pipe.close()
+
+    def join(self, timeout: float = 5.0):
+        self.thread.join(timeout)
+
+    @property
+    def truncated(self) -> int:
+        """Bytes dropped from the middle of the stream"""
+        return max(0, self.total - len(self.head) - min(self.tail_size, self.tail_limit))
+
+    def text(self) -> str:
+        tail = b''.join(self.tail)[-self.tail_limit:] if self.tail_limit else b''
+        if self.truncated:
+            marker = f"\n... [{self.truncated} bytes truncated] ...\n".encode()
+            data = bytes(self.head) + marker + tail
+        else:
+            data = bytes(self.head) + tail
+        return data.decode('utf-8', errors='replace')
+
+
+def run_captured(args: List[str], cwd: Path, timeout: float, max_bytes: int) -> subprocess.CompletedProcess:
+    """subprocess.run(capture_output=True, text=True) with bounded capture
+
+    The result has extra ``truncated`` (bytes dropped per stream) and ``rusage``
+    (of the reaped child, or None) attributes. On timeout the process is killed
+    and TimeoutExpired carries what was captured.
+    """
+    process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout = BoundedCapture(process.stdout, max_bytes)
+    stderr = BoundedCapture(process.stderr, max_bytes)
+    try:
+        returncode, rusage = wait_with_rusage(process, timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        _, rusage = wait_with_rusage(process, None)
+        stdout.join()
+        stderr.join()
+        error = subprocess.TimeoutExpired(args, timeout, output=stdout.text(), stderr=stderr.text())
+        error.truncated = {'stdout': stdout.truncated, 'stderr': stderr.truncated}
+        error.rusage = rusage
+        raise error
+
+    stdout.join()
+    stderr.join()
+    result = subprocess.CompletedProcess(args, returncode, stdout.text(), stderr.text())
+    result.truncated = {'stdout': stdout.truncated, 'stderr': stderr.truncated}
+    result.rusage = rusage
+    return result
+
+
+class GradingOutputStore:
+    def __init__(self, root: Path = Path('grading_output'), keep_per_week: int = 5,
+                 max_total_mb: float = 200, rescan_interval: float = 600):
+        self.root = Path(root)
+        self.keep_per_week = max(1, int(keep_per_week))
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.rescan_interval = rescan_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Oldest first; other processes (regrade, workers) also write, so rescan now and then
+        self._index: 'collections.OrderedDict[Path, int]' = collections.OrderedDict()
+        self._total = 0
+        self._scanned = None
+
+    def week_dir(self, student_id: str, week: str) -> Path:
+        if not SAFE_NAME.match(student_id) or not SAFE_NAME.match(week):
+            raise ValueError(f"Invalid student/week: {student_id}/{week}")
+        return self.root / student_id / week
+
+    def _scan(self):
+        entries = []
+        if self.root.exists():
+            for path in self.root.glob(f'*/*/*{SUFFIX}'):
+                try:
+                    entries.append((path.name, path, path.stat().st_size))
+                except OSError:
+                    continue
+        entries.sort()  # names start with a millisecond timestamp
+        self._index = collections.OrderedDict((path, size) for _, path, size in entries)
+        self._total = sum(self._index.values())
+        self._scanned = time.monotonic()
+
+    def record(self, student_id: str, week: str, stdout: str, stderr: str, **meta) -> Optional[Path]:
+        """Store one grading run's output; returns its path"""
+        week_dir = self.week_dir(student_id, week)
+        created = time.time()
+        meta = dict(meta, student=student_id, week=week, created=created,
+                    stdout_chars=len(stdout), stderr_chars=len(stderr))
+        path = week_dir / f"{int(created * 1000)}-{os.getpid()}-{threading.get_ident() % 10000}{SUFFIX}"
+
+        try:
+            week_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as file:
+                file.write(json.dumps(meta) + '\n')
+                file.write('==== stdout ====\n')
+                file.write(stdout)
+                file.write('\n==== stderr ====\n')
+                file.write(stderr)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except OSError as e:
+            self.logger.warning(f"Failed to store grading output for {student_id}/{week}: {e}",
+                                extra={'student': student_id, 'week': week})
+            return None
+
+        with self._lock:
+            if self._scanned is None or time.monotonic() - self._scanned > self.rescan_interval:
+                self._scan()
+            else:
+                self._index[path] = size
+                self._total += size
+            self._trim_week(week_dir)
+            self._evict()
+        return path
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Failed to remove {path}: {e}")
+            return
+        self._total -= self._index.pop(path, 0)
+
+    def _trim_week(self, week_dir: Path):
+        outputs = sorted(week_dir.glob(f'*{SUFFIX}'), key=lambda p: p.name)
+        for path in outputs[:-self.keep_per_week]:
+            self._remove(path)
+
+    def _evict(self):
+        evicted = 0
+        while self._total > self.max_total_bytes and len(self._index) > 1:
+            self._remove(next(iter(self._index)))
+            evicted += 1
+        if evicted:
+            self.logger.info(f"Evicted {evicted} old grading outputs (store {self._total / 1e6:.1f} MB)")
+
+    def list(self, student_id: str, week: str) -> List[Dict[str, Any]]:
+        """Metadata of stored outputs, newest first"""
+        week_dir = self.week_dir(student_id, week)
+        if not week_dir.exists():
+            return []
+        outputs = []
+        for path in sorted(week_dir.glob(f'*{SUFFIX}'), key=lambda p: p.name, reverse=True):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as file:
+                    meta = json.loads(file.readline())
+                meta.update(id=path.name[:-len(SUFFIX)], compressed_bytes=path.stat().st_size)
+                outputs.append(meta)
+            except (OSError, ValueError, EOFError):
+                continue  # evicted or being written
+        return outputs
+
+    def path(self, student_id: str, week: str, output_id: str) -> Optional[Path]:
+        if not SAFE_NAME.match(output_id):
+            return None
+        path = self.week_dir(student_id, week) / f"{output_id}{SUFFIX}"
+        return path if path.exists() else None
+
+    def iter_text(self, path: Path, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Decompressed content in chunks, for streaming responses"""
+        with gzip.open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                yield chunk
@@ -0,0 +1,328 @@
+"""
+Bulk regrade.
+
+Regrades every (student, week) pair of a class, optionally limited to some
+weeks or students, on a small thread pool. Progress is checkpointed to
+``state/regrade/<run_id>.json`` so an interrupted run can be resumed, and the
+run lowers its CPU priority and pauses while the host is loaded so live
+grading in the scheduler is not starved.
+
+Only students on the roster (``roster.process_list``) are regraded, like the
+scheduler's registry; retired students keep their results. The scheduler
+runs in another process, so the regrade cannot take its grading slots
+directly: it reads the grade limit the scheduler publishes in
+``state/metrics.json`` and keeps at most the slots the scheduler leaves free
+(capped by ``--parallel``) in flight. Jobs are graded locally even with
+``grading.executor: distributed``.
+
+python -m backend.regrade --week week03
+python -m backend.regrade --students S20237132,S20237133
+python -m backend.regrade --resume 20261019-101500-3f2a
+python -m backend.regrade --root /srv/practicum/os2026 --week week03
+"""
+import argparse
+import json
+import logging
+import os
+import secrets
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .grader import Grader
+from .roster import read_roster
+from .snapshot import METRICS_FILE, SnapshotReader
+
+CHECKPOINT_DIR = Path('state/regrade')
+
+
+def checkpoint_path(run_id: str, root: Path = Path('.')) -> Path:
+    return root / CHECKPOINT_DIR / f"{run_id}.json"
+
+
+def new_run_id() -> str:
+    """Timestamp plus a random suffix, so runs started in the same second get different ids"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+
+
+def load_checkpoint(run_id: str, root: Path = Path('.')) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path(run_id, root), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def list_checkpoints(root: Path = Path('.')) -> List[Dict[str, Any]]:
+    runs = []
+    if (root / CHECKPOINT_DIR).exists():
+        for path in sorted((root / CHECKPOINT_DIR).glob('*.json')):
+            checkpoint = load_checkpoint(path.stem, root)
+            if checkpoint:
+                runs.append(progress(checkpoint))
+    return runs
+
+
+def progress(checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a checkpoint: counts, rate and ETA"""
+    total = len(checkpoint['jobs'])
+    done = len(checkpoint['done'])
+    elapsed = checkpoint.get('active_seconds', 0.0)
+    graded_this_run = checkpoint.get('graded_in_session', 0)
+    session_seconds = checkpoint.get('session_seconds', 0.0)
+    rate = graded_this_run / session_seconds if session_seconds > 0 else 0.0
+    remaining = total - done
+    return {
+        'run_id': checkpoint['run_id'],
+        'state': checkpoint['state'],
+        'total': total,
+        'done': done,
+        'failed': sum(1 for status in checkpoint['done'].values() if status == 'error'),
+        'percent': round(100.0 * done / total, 1) if total else 100.0,
+        'rate_per_sec': round(rate, 3),
+        'eta_seconds': round(remaining / rate) if rate > 0 and remaining else (0 if not remaining else None),
+        'active_seconds': round(elapsed, 1),
+        'updated': checkpoint.get('updated'),
+    }
+
+
+def roster_students(config: Dict[str, Any], root: Path = Path('.')) -> Optional[List[str]]:
+    """Students on the roster file, or None if there is none (then every checked out student counts)"""
+    roster_path = root / (config.get('roster') or {}).get('process_list', 'class_info/process_list.csv')
+    if not roster_path.exists():
+        return None
+    return sorted(read_roster(roster_path))
+
+
+def discover_jobs(weeks: Optional[List[str]], students: Optional[List[str]],
+                  root: Path = Path('.'), roster: Optional[List[str]] = None) -> List[str]:
+    """All 'student/week' keys to regrade, in a stable order"""
+    students_dir = root / 'students'
+    if not students_dir.exists():
+        return []
+    jobs = []
+    for student_dir in sorted(students_dir.iterdir()):
+        if not student_dir.is_dir() or (students and student_dir.name not in students):
+            continue
+        if roster is not None and student_dir.name not in roster:
+            continue  # retired from the roster
+        for week_dir in sorted(student_dir.glob('week*')):
+            if week_dir.is_dir() and (not weeks or week_dir.name in weeks):
+                jobs.append(f"{student_dir.name}/{week_dir.name}")
+    return jobs
+
+
+class BulkRegrade:
+    def __init__(self, checkpoint: Dict[str, Any], parallel: int = 2, max_load: float = 0.8,
+                 checkpoint_interval: float = 5.0, root: Path = Path('.')):
+        self.checkpoint = checkpoint
+        self.root = Path(root)
+        self.parallel = max(1, parallel)
+        self.max_load = max_load
+        self.checkpoint_interval = checkpoint_interval
+        self.grader = Grader(self.root)
+        metrics_config = self.grader.config.get('metrics') or {}
+        self.metrics_reader = SnapshotReader(self.root / metrics_config.get('path', METRICS_FILE),
+                                             max_age=max(30, 3 * metrics_config.get('interval', 10)))
+        self.logger = logging.getLogger(__name__)
+        self.stop_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    @classmethod
+    def create(cls, weeks: Optional[List[str]] = None, students: Optional[List[str]] = None,
+               run_id: Optional[str] = None, root: Path = Path('.'), **kwargs) -> 'BulkRegrade':
+        run_id = run_id or new_run_id()
+        checkpoint = {
+            'run_id': run_id,
+            'state': 'pending',
+            'weeks': weeks,
+            'students': students,
+            'jobs': [],
+            'done': {},
+            'created': time.time(),
+            'updated': time.time(),
+            'active_seconds': 0.0,
+        }
+        regrade = cls(checkpoint, root=root, **kwargs)
+        checkpoint['jobs'] = discover_jobs(weeks, students, regrade.root,
+                                           roster=roster_students(regrade.grader.config, regrade.root))
+        path = checkpoint_path(run_id, root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Exclusive create claims the id: a second run with the same id fails instead of sharing it
+            with open(path, 'x', encoding='utf-8') as file:
+                json.dump(checkpoint, file)
+        except FileExistsError:
+            raise FileExistsError(f"Regrade run {run_id} already exists")
+        return regrade
+
+    @classmethod
+    def resume(cls, run_id: str, root: Path = Path('.'), **kwargs) -> 'BulkRegrade':
+        checkpoint = load_checkpoint(run_id, root)
+        if checkpoint is None:
+            raise FileNotFoundError(f"No regrade checkpoint for run {run_id}")
+        return cls(checkpoint, root=root, **kwargs)
+
+    def save(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_save < self.checkpoint_interval:
+            return
+        self._last_save = now
+        with self._lock:
+            self.checkpoint['updated'] = time.time()
+            data = json.dumps(self.checkpoint)
+        path = checkpoint_path(self.checkpoint['run_id'], self.root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(data, encoding='utf-8')
+        os.replace(tmp, path)  # atomic, so a crash never leaves a torn checkpoint
+
+    def _wait_for_capacity(self):
+        """Pause while the host is busy so live grading keeps priority"""
+        if self.max_load <= 0 or not hasattr(os, 'getloadavg'):
+            return
+        cores = os.cpu_count() or 1
+        while not self.stop_requested.is_set() and os.getloadavg()[0] / cores > self.max_load:
+            self.stop_requested.wait(2.0)
+
+    def _grade_slots(self) -> int:
+        """Jobs this run may have in flight: the scheduler's free grading slots, at most --parallel"""
+        metrics = self.metrics_reader.read()
+        grade = ((metrics or {}).get('concurrency') or {}).get('limits', {}).get('grade')
+        if not grade:
+            return self.parallel  # scheduler not running (or not publishing)
+        return max(0, min(self.parallel, grade['limit'] - grade['in_flight']))
+
+    def _grade(self, key: str) -> str:
+        student_id, week = key.split('/', 1)
+        try:
+            results = self.grader.grade_student(student_id, week)
+            return 'pass' if results and all(results.values()) else 'fail'
+        except Exception as e:
+            self.logger.error(f"Regrade of {key} failed: {e}")
+            return 'error'
+
+    def run(self, on_progress=None) -> Dict[str, Any]:
+        # Students retired since the run was created are skipped on resume
+        roster = roster_students(self.grader.config, self.root)
+        for key in self.checkpoint['jobs']:
+            if roster is not None and key.split('/', 1)[0] not in roster:
+                self.checkpoint['done'].setdefault(key, 'retired')
+        todo = [key for key in self.checkpoint['jobs'] if key not in self.checkpoint['done']]
+        self.checkpoint['state'] = 'running'
+        self.checkpoint['graded_in_session'] = 0
+        self.checkpoint['session_seconds'] = 0.0
+        self.save(force=True)
+        self.logger.info(f"Regrade {self.checkpoint['run_id']}: {len(todo)} of "
+                         f"{len(self.checkpoint['jobs'])} jobs remaining, parallel={self.parallel}")
+
+        session_start = time.monotonic()
+        base_active = self.checkpoint.get('active_seconds', 0.0)
+        pending = iter(todo)
+        in_flight = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix='regrade') as executor:
+            while True:
+                slots = self._grade_slots()
+                while len(in_flight) < slots and not exhausted and not self.stop_requested.is_set():
+                    self._wait_for_capacity()
+                    if self.stop_requested.is_set():
+                        break  # not taken yet, so a resumed run picks it up
+                    key = next(pending, None)
+                    if key is None:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(self._grade, key)] = key
+                if not in_flight:
+                    if exhausted or self.stop_requested.is_set():
+                        break
+                    self.stop_requested.wait(2.0)  # the scheduler is using every grading slot
+                    continue
+                finished, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                with self._lock:
+                    for future in finished:
+                        self.checkpoint['done'][in_flight.pop(future)] = future.result()
+                        self.checkpoint['graded_in_session'] += 1
+                    self.checkpoint['session_seconds'] = time.monotonic() - session_start
+                    self.checkpoint['active_seconds'] = base_active + self.checkpoint['session_seconds']
+                if finished:
+                    self.save()
+                    if on_progress:
+                        on_progress(progress(self.checkpoint))
+
+        complete = len(self.checkpoint['done']) == len(self.checkpoint['jobs'])
+        self.checkpoint['state'] = 'completed' if complete else 'interrupted'
+        self.save(force=True)
+        return progress(self.checkpoint)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Regrade a whole class with checkpointing')
+    parser.add_argument('--week', action='append', dest='weeks',
+                        help='Week to regrade (repeatable, default: all weeks)')
+    parser.add_argument('--students', help='Comma separated student ids (default: all students)')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Resume an interrupted run')
+    parser.add_argument('--run-id', help='Id for a new run (default: current timestamp)')
+    parser.add_argument('--parallel', type=int, default=2, help='Concurrent grading jobs')
+    parser.add_argument('--max-load', type=float, default=0.8,
+                        help='Pause while 1-minute load per core exceeds this (0 disables)')
+    parser.add_argument('--nice', type=int, default=10, help='CPU niceness increment for this run')
+    parser.add_argument('--list', action='store_true', help='List regrade runs and exit')
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory to regrade (default: current directory)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.list:
+        for run in list_checkpoints(args.root):
+            print(json.dumps(run))
+        return 0
+
+    if args.nice and hasattr(os, 'nice'):
+        os.nice(args.nice)  # grading subprocesses inherit the lower priority
+
+    options = {'parallel': args.parallel, 'max_load': args.max_load, 'root': args.root}
+    try:
+        if args.resume:
+            regrade = BulkRegrade.resume(args.resume, **options)
+        else:
+            students = [s.strip() for s in args.students.split(',')] if args.students else None
+            regrade = BulkRegrade.create(args.weeks, students, args.run_id, **options)
+    except (FileNotFoundError, FileExistsError) as e:
+        logging.error(str(e))
+        return 1
+
+    # SIGTERM (e.g. from the admin API) stops after the jobs in flight
+    signal.signal(signal.SIGTERM, lambda signum, frame: regrade.stop_requested.set())
+
+    last_report = [0.0]
+
+    def report(state):
+        if time.monotonic() - last_report[0] >= 5 or state['done'] == state['total']:
+            last_report[0] = time.monotonic()
+            eta = f"{state['eta_seconds']}s" if state['eta_seconds'] is not None else '?'
+            logging.info(f"Regrade {state['run_id']}: {state['done']}/{state['total']} "
+                         f"({state['percent']}%), {state['rate_per_sec']}/s, ETA {eta}")
+
+    try:
+        result = regrade.run(on_progress=report)
+    except KeyboardInterrupt:
+        regrade.stop_requested.set()
+        regrade.checkpoint['state'] = 'interrupted'
+        regrade.save(force=True)
+        logging.info(f"Interrupted; resume with --resume {regrade.checkpoint['run_id']}")
+        return 130
+
+    logging.info(f"Regrade {result['run_id']} {result['state']}: {result['done']}/{result['total']} "
+                 f"graded, {result['failed']} errors")
+    return 0 if result['state'] == 'completed' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+
+# stderr fragments that indicate the remote (not the local clone) is the problem
+REMOTE_ERROR_MARKERS = (
+    'could not resolve host',
+    'unable to access',
+    'could not read from remote',
+    'connection timed out',
+    'connection refused',
+    'connection reset',
+    'operation timed out',
+    'early eof',
+    'rate limit',
+    'the requested url returned error: 429',
+    'the requested url returned error: 5',
+    'remote end hung up',
+)
+
+
+def is_remote_failure(error: str) -> bool:
+    """Whether a failed git operation should count against the remote"""
+    error = (error or '').lower()
+    return error == 'timeout' or 'timeout' in error or any(m in error for m in REMOTE_ERROR_MARKERS)
+
+
+class TokenBucket:
+    """Global rate limit for remote operations"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Waiters queue on the lock so tokens are handed out in order
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refill()
+        return {'rate': self.rate, 'burst': self.burst, 'tokens': round(self.tokens, 2)}
+
+
+class CircuitBreaker:
+    """Pauses all remote access after repeated remote failures, then probes recovery"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.logger = logging.getLogger(__name__)
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.logger.info("Git remote circuit half-open, probing recovery")
+        # Half-open: let exactly one probe through
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            self.logger.info("Git remote circuit closed, remote access resumed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self, remote: bool):
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+            if remote:
+                self._open()
+            return
+        if not remote:
+            return
+        self.consecutive_failures += 1
+        if self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.logger.warning(
+            f"Git remote circuit opened after {self.consecutive_failures} consecutive remote failures, "
+            f"pausing remote access for {self.reset_timeout:.0f}s"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in': round(retry_in, 1),
+        }
+
+
+class RepoBackoff:
+    """Exponential backoff with jitter for a single repository"""
+
+    def __init__(self):
+        self.failures = 0
+        self.next_attempt = 0.0  # wall clock, so it can be shown in the API
+        self.last_error: Optional[str] = None
+        self.last_success: Optional[float] = None
+
+
+class RemoteGuard:
+    """Backoff, rate limiting and circuit breaking for git remote operations"""
+
+    def __init__(self, config: Dict[str, Any]):
+        git_config = config.get('git', {})
+        retry = git_config.get('retry', {})
+        rate_limit = git_config.get('rate_limit', {})
+        breaker = git_config.get('circuit_breaker', {})
+
+        self.base_delay = float(retry.get('base_delay', 30))
+        self.max_delay = float(retry.get('max_delay', 900))
+        self.jitter = min(1.0, max(0.0, float(retry.get('jitter', 0.5))))
+        self.bucket = TokenBucket(rate_limit.get('rate', 10), rate_limit.get('burst', 20))
+        self.breaker = CircuitBreaker(breaker.get('failure_threshold', 10),
+                                      breaker.get('reset_timeout', 60))
+        self.repos: Dict[str, RepoBackoff] = {}
+        self.random = random.Random()
+
+    def _repo(self, key: str) -> RepoBackoff:
+        if key not in self.repos:
+            self.repos[key] = RepoBackoff()
+        return self.repos[key]
+
+    def check(self, key: str) -> Optional[str]:
+        """Return why ``key`` may not contact the remote now, or None if it may"""
+        repo = self.repos.get(key)
+        if repo and time.time() < repo.next_attempt:
+            return f"Backing off until {time.strftime('%H:%M:%S', time.localtime(repo.next_attempt))}"
+        if not self.breaker.allow():
+            return 'Circuit open: remote access paused'
+        return None
+
+    async def throttle(self):
+        await self.bucket.acquire()
+
+    def record_success(self, key: str):
+        repo = self._repo(key)
+        repo.failures = 0
+        repo.next_attempt = 0.0
+        repo.last_error = None
+        repo.last_success = time.time()
+        self.breaker.record_success()
+
+    def record_failure(self, key: str, error: str):
+        repo = self._repo(key)
+        repo.failures += 1
+        repo.last_error = error
+        delay = min(self.max_delay, self.base_delay * (2 ** (repo.failures - 1)))
+        delay *= 1.0 - self.jitter * self.random.random()
+        repo.next_attempt = time.time() + delay
+        self.breaker.record_failure(is_remote_failure(error))
+
+    def release_probe(self):
+        """Give back the half-open probe slot of an operation that ended without an outcome (cancelled)"""
+        if self.breaker.state == CircuitBreaker.HALF_OPEN:
+            self.breaker.probe_in_flight = False
+
+    def repo_state(self, key: str) -> Dict[str, Any]:
+        repo = self.repos.get(key) or RepoBackoff()
+        return {
+            'failures': repo.failures,
+            'next_attempt': repo.next_attempt or None,
+            'backing_off': time.time() < repo.next_attempt,
+            'last_error': repo.last_error,
+            'last_success': repo.last_success,
+            'circuit': self.breaker.state,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'circuit': self.breaker.snapshot(),
+            'rate_limit': self.bucket.snapshot(),
+            'repos_backing_off': sum(1 for r in self.repos.values() if time.time() < r.next_attempt),
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import csv
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .git_manager import resolve_repo_path
+
+ACTIVE = 'active'
+PENDING_CLONE = 'pending_clone'
+RETIRED = 'retired'
+
+
+def read_roster(csv_path: Path) -> Dict[str, str]:
+    """student id -> repository URL from a process_list.csv"""
+    students = {}
+    with open(csv_path, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            student_id = (row.get('id') or '').strip()
+            repository_url = (row.get('repository_url') or '').strip()
+            if student_id and repository_url:
+                students[student_id] = repository_url
+    return students
+
+
+class StudentRegistry:
+    """In-memory list of students to poll, reconciled against the roster file
+
+    The scheduler polls only ``ACTIVE`` entries. When the roster changes on
+    disk, new students are cloned, removed ones are retired (their files are
+    kept) and students whose repository URL changed are re-pointed, without a
+    restart or a rescan of ``students/``.
+    """
+
+    def __init__(self, roster_path: Path, students_dir: Path = Path('students')):
+        self.roster_path = Path(roster_path)
+        self.students_dir = Path(students_dir)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.logger = logging.getLogger(__name__)
+        self._roster_mtime: Optional[float] = None
+        self._retry = False
+
+    def load_from_directory(self):
+        """Fallback when there is no roster file: poll whatever is checked out"""
+        if not self.students_dir.exists():
+            return
+        for student_dir in self.students_dir.iterdir():
+            repo_path = resolve_repo_path(student_dir) if student_dir.is_dir() else None
+            if repo_path is not None:
+                self.entries.setdefault(student_dir.name, {
+                    'repository_url': None, 'repo_path': repo_path, 'state': ACTIVE
+                })
+        self.logger.info(f"Registry loaded {len(self.entries)} students from {self.students_dir}")
+
+    def roster_changed(self) -> bool:
+        try:
+            mtime = self.roster_path.stat().st_mtime
+        except OSError:
+            return False
+        return self._retry or mtime != self._roster_mtime
+
+    async def reconcile(self, git_manager) -> Dict[str, List[str]]:
+        """Apply roster changes; returns the ids that were added, retired and re-pointed"""
+        changes = {'added': [], 'retired': [], 'repointed': []}
+        if not self.roster_changed():
+            return changes
+
+        mtime = self.roster_path.stat().st_mtime
+        try:
+            roster = read_roster(self.roster_path)
+        except (OSError, csv.Error) as e:
+            self.logger.error(f"Failed to read roster {self.roster_path}: {e}")
+            return changes
+        self._roster_mtime = mtime
+        self._retry = False
+
+        tasks = []
+        for student_id, url in roster.items():
+            entry = self.entries.get(student_id)
+            if entry is None or entry['state'] in (RETIRED, PENDING_CLONE):
+                tasks.append(self._add(student_id, url, git_manager, changes))
+            elif entry['repository_url'] and entry['repository_url'] != url:
+                tasks.append(self._repoint(student_id, url, git_manager, changes))
+            else:
+                entry['repository_url'] = url
+        await asyncio.gather(*tasks)
+
+        for student_id, entry in self.entries.items():
+            if student_id not in roster and entry['state'] != RETIRED:
+                entry['state'] = RETIRED
+                changes['retired'].append(student_id)
+
+        if any(changes.values()):
+            self.logger.info(
+                f"Roster reconciled: {len(changes['added'])} added, {len(changes['retired'])} retired, "
+                f"{len(changes['repointed'])} re-pointed ({len(self.active_ids())} active)",
+                extra={'event': 'roster', **changes}
+            )
+        return changes
+
+    async def _add(self, student_id: str, url: str, git_manager, changes: Dict[str, List[str]]):
+        """Activate a student, cloning if needed; only new clones and returning students count as added
+
+        A clone that is already on disk for a student the registry has not seen (e.g. every
+        student after a restart) is registered silently, so it is not graded again.
+        """
+        student_dir = self.students_dir / student_id
+        repo_path = resolve_repo_path(student_dir)
+        known = student_id in self.entries
+        entry = {'repository_url': url, 'repo_path': repo_path, 'state': ACTIVE}
+
+        if repo_path is None:
+            # Same layout as bootstrap: the repository is the student directory
+            student_dir.mkdir(parents=True, exist_ok=True)
+            result = await git_manager.clone_repository(url, student_dir)
+            if not result['success']:
+                self.logger.warning(f"Clone for new student {student_id} failed, will retry: "
+                                    f"{result.get('error')}", extra={'student': student_id})
+                entry.update(state=PENDING_CLONE, repo_path=None)
+                self.entries[student_id] = entry
+                self._retry = True
+                return
+            entry['repo_path'] = student_dir
+        else:
+            previous = self.entries.get(student_id, {}).get('repository_url')
+            if previous and previous != url:
+                await git_manager.repoint_repository(repo_path, url)
+            if not known:
+                self.entries[student_id] = entry
+                return
+
+        self.entries[student_id] = entry
+        changes['added'].append(student_id)
+
+    async def _repoint(self, student_id: str, url: str, git_manager, changes: Dict[str, List[str]]):
+        entry = self.entries[student_id]
+        result = await git_manager.repoint_repository(entry['repo_path'], url)
+        if result['success']:
+            entry['repository_url'] = url
+            changes['repointed'].append(student_id)
+        else:
+            self.logger.warning(f"Re-pointing {student_id} to {url} failed, will retry: {result.get('error')}",
+                                extra={'student': student_id})
+            self._retry = True
+
+    def active_ids(self) -> List[str]:
+        return sorted(sid for sid, entry in self.entries.items() if entry['state'] == ACTIVE)
+
+    def active_repos(self) -> Dict[str, Path]:
+        return {sid: entry['repo_path'] for sid, entry in self.entries.items()
+                if entry['state'] == ACTIVE and entry['repo_path'] is not None}
+
+    def repo_path(self, student_id: str) -> Optional[Path]:
+        entry = self.entries.get(student_id)
+        return entry['repo_path'] if entry else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for entry in self.entries.values():
+            counts[entry['state']] = counts.get(entry['state'], 0) + 1
+        return {'roster': str(self.roster_path), 'students': counts}
@@ -0,0 +1,294 @@
+"""
+Per-job resource limits and accounting for grading scripts.
+
+With ``grading.isolation: cgroup`` (or ``auto`` when available) every job runs
+in its own cgroup v2 group under ``grading.cgroup.parent`` (created inside the
+grading process's own cgroup, read from /proc/self/cgroup) with ``memory.max``
+(swap disabled), ``cpu.max`` and ``pids.max``; peak memory and CPU time are read
+from the group, so they include every process the script started. Otherwise
+the job gets rlimits: RLIMIT_CPU and RLIMIT_DATA, which caps heap and anonymous
+memory without counting reserved-but-unused address space the way RLIMIT_AS
+did. In both modes the grader's direct child is reaped with ``wait4`` so CPU
+time and peak RSS are reported even without cgroups.
+
+The parent group is set up on the first job, so processes that only read
+results (the frontend, the gradebook) never touch cgroups. Jobs start through
+this module run as a launcher (``SandboxJob.command``), which joins the job's
+group and sets the rlimits in the child before exec; the grading threads never
+run code between fork and exec.
+"""
+import argparse
+import itertools
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CGROUP_CONTROLLERS = ('memory', 'pids', 'cpu')
+PROC_CGROUP = Path('/proc/self/cgroup')
+_job_ids = itertools.count(1)
+
+
+def find_cgroup2_mount() -> Optional[Path]:
+    """Mount point of the cgroup v2 hierarchy (also on hybrid v1/v2 hosts)"""
+    try:
+        with open('/proc/self/mounts', 'r') as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    return Path(fields[1])
+    except OSError:
+        pass
+    return None
+
+
+def process_cgroup(mount: Path, proc_cgroup: Path = PROC_CGROUP) -> Optional[Path]:
+    """This process's cgroup v2 group under ``mount`` (the ``0::<path>`` line of /proc/self/cgroup)"""
+    try:
+        with open(proc_cgroup, 'r') as file:
+            for line in file:
+                hierarchy, _, path = line.rstrip('\n').partition('::')
+                if hierarchy == '0' and path.startswith('/'):
+                    return mount / path.lstrip('/')
+    except OSError:
+        pass
+    return None
+
+
+def wait_with_rusage(process: subprocess.Popen, timeout: Optional[float]):
+    """Wait for ``process`` like Popen.wait, also returning its rusage (None where wait4 is unavailable)"""
+    if not hasattr(os, 'wait4'):
+        return process.wait(timeout=timeout), None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.001
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return process.returncode, rusage
+        if deadline is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(delay if deadline is None else min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, 0.02)
+
+
+def rusage_usage(rusage) -> Dict[str, Any]:
+    if rusage is None:
+        return {}
+    return {
+        'cpu_seconds': round(rusage.ru_utime + rusage.ru_stime, 3),
+        'peak_rss_mb': round(rusage.ru_maxrss / 1024, 1),  # KiB on Linux
+    }
+
+
+def apply_rlimits(cpu_seconds: int, memory_mb: int = 0):
+    if resource is None:
+        return
+    try:
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        if memory_mb:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (AttributeError, ValueError, OSError):
+        pass
+
+
+def launch(argv: List[str]):
+    """Launcher run as the job's process: join the cgroup, set the rlimits, exec the command"""
+    parser = argparse.ArgumentParser(prog='sandbox')
+    parser.add_argument('--cgroup', type=Path)
+    parser.add_argument('--cpu-seconds', type=int, default=0)
+    parser.add_argument('--memory-mb', type=int, default=0)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if args.cgroup is not None:
+        # Join before exec so every descendant is accounted
+        try:
+            (args.cgroup / 'cgroup.procs').write_text('0')
+        except OSError as e:
+            sys.stderr.write(f"sandbox: cannot join cgroup {args.cgroup}: {e}\n")
+            sys.exit(126)
+    apply_rlimits(args.cpu_seconds, args.memory_mb)
+    os.execvp(command[0], command)
+
+
+class SandboxJob:
+    """Limits for one grading run; start ``command(args)`` and call ``usage`` after it exits"""
+
+    def __init__(self, sandbox: 'Sandbox', cgroup: Optional[Path]):
+        self.sandbox = sandbox
+        self.cgroup = cgroup
+        self.mode = 'cgroup' if cgroup is not None else sandbox.fallback_mode
+
+    def command(self, args: List[str]) -> List[str]:
+        """``args`` behind the launcher that applies this job's limits (unchanged without limits)"""
+        launcher = [sys.executable, str(Path(__file__).resolve())]
+        if self.cgroup is not None:
+            launcher += ['--cgroup', str(self.cgroup)]
+        elif resource is None:
+            return list(args)
+        if resource is not None:
+            launcher += ['--cpu-seconds', str(self.sandbox.cpu_seconds)]
+            if self.cgroup is None and self.sandbox.max_memory_mb:
+                launcher += ['--memory-mb', str(self.sandbox.max_memory_mb)]
+        return launcher + ['--'] + list(args)
+
+    def usage(self, rusage, wall_seconds: float) -> Dict[str, Any]:
+        usage = dict(rusage_usage(rusage), wall_seconds=round(wall_seconds, 3), limits=self.mode)
+        if self.cgroup is not None:
+            usage.update(self._cgroup_usage())
+        return usage
+
+    def _read(self, name: str) -> Optional[str]:
+        try:
+            return (self.cgroup / name).read_text()
+        except OSError:
+            return None
+
+    def _cgroup_usage(self) -> Dict[str, Any]:
+        usage: Dict[str, Any] = {}
+        peak = self._read('memory.peak')  # Linux 5.19+
+        if peak:
+            usage['peak_rss_mb'] = round(int(peak) / (1024 * 1024), 1)
+        for line in (self._read('cpu.stat') or '').splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'usage_usec':
+                usage['cpu_seconds'] = round(int(value) / 1e6, 3)
+        for line in (self._read('memory.events') or '').splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'oom_kill':
+                usage['oom_killed'] = int(value) > 0
+        pids_peak = self._read('pids.peak')
+        if pids_peak:
+            usage['pids_peak'] = int(pids_peak)
+        return usage
+
+    def cleanup(self):
+        if self.cgroup is None:
+            return
+        # Kill anything the script left running, then remove the group
+        if (self.cgroup / 'cgroup.kill').exists():
+            try:
+                (self.cgroup / 'cgroup.kill').write_text('1')
+            except OSError:
+                pass
+        for _ in range(50):
+            try:
+                self.cgroup.rmdir()
+                return
+            except OSError:
+                time.sleep(0.02)
+        self.sandbox.logger.warning(f"Could not remove cgroup {self.cgroup}")
+
+
+class Sandbox:
+    def __init__(self, config: Dict[str, Any], max_memory_mb: int = 512):
+        self.logger = logging.getLogger(__name__)
+        self.cpu_seconds = config.get('timeout', 30)
+        self.max_memory_mb = max_memory_mb
+        self.isolation = config.get('isolation', 'auto')
+        cgroup_config = config.get('cgroup', {}) or {}
+        self.cpu_quota = cgroup_config.get('cpu_quota', 1.0)
+        self.pids_max = cgroup_config.get('pids_max', 64)
+        self.fallback_mode = 'rlimit' if resource is not None else 'none'
+        self.cgroup_name = cgroup_config.get('parent', 'txed-grading')
+        self.cgroup_parent: Optional[Path] = None
+        self.controllers: set = set()
+        self._setup_done = not (self.isolation in ('auto', 'cgroup') and os.name != 'nt')
+        self._setup_lock = threading.Lock()
+
+    def _ensure_setup(self):
+        """Set up the parent group once, on the first job of a grading process"""
+        with self._setup_lock:
+            if self._setup_done:
+                return
+            self._setup_done = True
+            reason = self._setup_cgroup(self.cgroup_name)
+            if reason:
+                log = self.logger.warning if self.isolation == 'cgroup' else self.logger.info
+                log(f"cgroup v2 isolation unavailable ({reason}); using {self.fallback_mode} limits")
+            else:
+                self.logger.info(f"Grading jobs run in cgroups under {self.cgroup_parent} "
+                                 f"({', '.join(sorted(self.controllers))})")
+
+    @property
+    def mode(self) -> str:
+        return 'cgroup' if self.cgroup_parent is not None else self.fallback_mode
+
+    def _setup_cgroup(self, parent: str, mount: Optional[Path] = None,
+                      proc_cgroup: Path = PROC_CGROUP) -> Optional[str]:
+        """Create the parent group inside this process's cgroup with memory/pids(/cpu) delegated;
+        returns why it failed, if it did"""
+        mount = mount or find_cgroup2_mount()
+        if mount is None:
+            return 'no cgroup2 mount'
+        base = process_cgroup(mount, proc_cgroup)
+        if base is None or not base.is_dir():
+            return f"own cgroup not found in {proc_cgroup}"
+        available = set((base / 'cgroup.controllers').read_text().split()) if \
+            (base / 'cgroup.controllers').exists() else set()
+        missing = {'memory', 'pids'} - available
+        if missing:
+            return f"controllers not available in {base}: {', '.join(sorted(missing))}"
+        wanted = [c for c in CGROUP_CONTROLLERS if c in available]
+        enable = ' '.join(f'+{c}' for c in wanted)
+        parent_path = base / parent
+        try:
+            # Outside the root group, controllers are only delegated from a group without
+            # processes of its own, so the grading process first moves into a leaf beside the
+            # parent; that only helps if it is alone there (not started next to a shell or the frontend)
+            procs = (base / 'cgroup.procs').read_text().split() if (base / 'cgroup.procs').exists() else []
+            if base != mount and procs:
+                others = [pid for pid in procs if pid != str(os.getpid())]
+                if others:
+                    return f"{base} also holds other processes ({len(others)}); run the scheduler in its own cgroup"
+                leaf = base / f"{parent}-supervisor"
+                leaf.mkdir(exist_ok=True)
+                (leaf / 'cgroup.procs').write_text(str(os.getpid()))
+            (base / 'cgroup.subtree_control').write_text(enable)
+            parent_path.mkdir(exist_ok=True)
+            (parent_path / 'cgroup.subtree_control').write_text(enable)
+        except OSError as e:
+            return f"cannot delegate controllers to {parent_path}: {e}"
+        self.controllers = set(wanted)
+        self.cgroup_parent = parent_path
+        return None
+
+    def job(self) -> SandboxJob:
+        """Prepare limits for one run (a fresh cgroup in cgroup mode)"""
+        self._ensure_setup()
+        if self.cgroup_parent is None:
+            return SandboxJob(self, None)
+        path = self.cgroup_parent / f"job-{os.getpid()}-{next(_job_ids)}"
+        try:
+            path.mkdir()
+            (path / 'memory.max').write_text(str(self.max_memory_mb * 1024 * 1024))
+            if (path / 'memory.swap.max').exists():
+                (path / 'memory.swap.max').write_text('0')
+            (path / 'pids.max').write_text(str(self.pids_max))
+            if 'cpu' in self.controllers and self.cpu_quota:
+                period = 100000
+                (path / 'cpu.max').write_text(f"{int(self.cpu_quota * period)} {period}")
+        except OSError as e:
+            self.logger.warning(f"Failed to create cgroup {path}, using rlimits for this job: {e}")
+            try:
+                path.rmdir()
+            except OSError:
+                pass
+            return SandboxJob(self, None)
+        return SandboxJob(self, path)
+
+
+if __name__ == '__main__':
+    launch(sys.argv[1:])
@@ -2,176 +2,596 @@ import asyncio
 import time
 import logging
 import yaml
+import os
 import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
+from .concurrency import ConcurrencyController, FairShareLimiter
+from .courses import CONFIG_FILE, Course, load_courses
 from .git_manager import GitManager
 from .grader import Grader
+from .job_queue import LocalJobQueue, check_authkey, serve_job_queue
+from .maintenance import RepoMaintenance
+from .remote_guard import RemoteGuard
+from .roster import StudentRegistry
+from .snapshot import METRICS_FILE, SNAPSHOT_FILE, load_snapshot, save_snapshot
+from .structured_logging import setup_queue_logging, stop_queue_logging
+
+
+def load_config(path: Path = CONFIG_FILE) -> Dict[str, Any]:
+    try:
+        with open(path, 'r') as file:
+            config = yaml.safe_load(file)
+            return config
+    except Exception as e:
+        print(f"Failed to load config: {e}")
+        return {
+            'scheduler': {
+                'pull_interval': 60,
+                'grade_interval': 60
+            },
+            'grading': {
+                'max_concurrent': 5
+            }
+        }
+
+
+class CourseRuntime:
+    """Scheduler state of one hosted course: its config, grader, roster and warm start state"""
+
+    def __init__(self, course: Course, pull_share, grade_share, remote_guard=None, remote_grade_share=None):
+        self.course = course
+        self.id = course.id
+        self.config = load_config(course.config_path)
+        self.git_manager = GitManager(root=course.root, limiter=pull_share, remote_guard=remote_guard)
+        self.grader = Grader(course.root)
+        self.grade_limiter = grade_share
+        # Share of the worker pool with grading.executor: distributed
+        self.remote_grade_limiter = remote_grade_share
+        self.registry = StudentRegistry(
+            course.root / self.config.get('roster', {}).get('process_list', 'class_info/process_list.csv'),
+            course.root / 'students'
+        )
+        self.student_states = {}
+        # Warm start state, persisted by GradingScheduler._save_snapshot
+        self.last_commits: Dict[str, str] = {}
+        self.next_poll: Dict[str, float] = {}
+        self.pending_grades: Dict[str, Optional[str]] = {}
+        # Students whose pull is scheduled or running in the current cycle
+        self.pulling: set = set()
+        self.snapshot_config = self.config.get('snapshot', {}) or {}
+        self.snapshot_path = course.root / self.snapshot_config.get('path', SNAPSHOT_FILE)
+        self.last_snapshot = time.monotonic()
+        # A grade finished since the last save; the frontend reads states from the snapshot
+        self.snapshot_dirty = False
+        self.metrics_path = course.root / (self.config.get('metrics') or {}).get('path', METRICS_FILE)
+        self.maintenance = RepoMaintenance(self.config, course.root, self.git_manager)
 
 
 class GradingScheduler:
+    """Polls and grades every hosted course (see courses.py) from one process
+
+    The courses share one pull limiter and one grading limiter (and the grading
+    thread pool or worker queue behind it); both hand out slots in proportion to
+    the course weights while courses compete, so a deadline rush in one course
+    cannot starve the others. They also share one remote guard, so the git rate
+    limit and circuit breaker apply to the host as a whole.
+    """
+
     def __init__(self):
-        self.config = self._load_config()
-        self.git_manager = GitManager(max_concurrent=self.config['grading']['max_concurrent'])
-        self.grader = Grader()
-        self.student_states = {}
+        self.config = load_config()
+        self.pull_limiter = FairShareLimiter(self.config['grading']['max_concurrent'], name='pull')
+        self.grade_limiter = FairShareLimiter(self.config['grading']['max_concurrent'], name='grade')
+        self.concurrency = ConcurrencyController(self.config, self.pull_limiter, self.grade_limiter)
+        # Grading runs in worker threads so subprocess waits don't block the event loop
+        self.grade_executor = ThreadPoolExecutor(
+            max_workers=self.concurrency.config['grade']['max'],
+            thread_name_prefix='grader'
+        )
+        self.remote_guard = RemoteGuard(self.config)
+        # Worker jobs get their own pool, sized to the workers connected (see _update_remote_capacity)
+        # rather than to this host, and left out of the host's concurrency control
+        distributed = self.config['grading'].get('executor', 'local') == 'distributed'
+        self.remote_grade_limiter = FairShareLimiter(1, name='remote_grade') if distributed else None
+        self.courses: Dict[str, CourseRuntime] = {}
+        for course in load_courses(self.config):
+            self.courses[course.id] = CourseRuntime(
+                course,
+                self.pull_limiter.add_share(course.id, course.weight),
+                self.grade_limiter.add_share(course.id, course.weight),
+                self.remote_guard,
+                self.remote_grade_limiter.add_share(course.id, course.weight) if distributed else None
+            )
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.running = False
         self.logger = logging.getLogger(__name__)
 
+        # With grading.executor: distributed, jobs go to worker processes (backend/worker.py)
+        self.job_queue = None
+        if distributed:
+            distributed = self.config.get('distributed', {})
+            check_authkey(self._authkey())  # fail at startup, not when the queue is served
+            self.job_queue = LocalJobQueue(
+                lease_seconds=distributed.get('lease_seconds', 60),
+                max_attempts=distributed.get('max_attempts', 3)
+            )
+
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
 
-    def _load_config(self) -> Dict[str, Any]:
-        try:
-            with open('backend/config.backend.yaml', 'r') as file:
-                config = yaml.safe_load(file)
-                return config
-        except Exception as e:
-            print(f"Failed to load config: {e}")
-            return {
-                'scheduler': {
-                    'pull_interval': 60,
-                    'grade_interval': 60
-                },
-                'grading': {
-                    'max_concurrent': 5
-                }
-            }
+    @property
+    def default_course(self) -> CourseRuntime:
+        return next(iter(self.courses.values()))
+
+    # Single-course callers (e.g. the benchmark) use the first course's parts directly
+    @property
+    def git_manager(self) -> GitManager:
+        return self.default_course.git_manager
+
+    @property
+    def grader(self) -> Grader:
+        return self.default_course.grader
+
+    @property
+    def registry(self) -> StudentRegistry:
+        return self.default_course.registry
+
+    def course(self, course_id: Optional[str] = None) -> Optional[CourseRuntime]:
+        """A hosted course by id (the first one if ``course_id`` is None)"""
+        if course_id is None:
+            return self.default_course
+        return self.courses.get(course_id)
+
+    def _serve_job_queue(self):
+        distributed = self.config.get('distributed', {})
+        address = (distributed.get('host', '127.0.0.1'), distributed.get('port', 50051))
+        serve_job_queue(self.job_queue, address, self._authkey())
+        self.logger.info(f"Serving grading job queue on {address[0]}:{address[1]}")
+
+    def _authkey(self) -> bytes:
+        distributed = self.config.get('distributed', {})
+        return os.environ.get('GRADING_AUTHKEY', str(distributed.get('authkey') or '')).encode()
 
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         self.logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        # Cut the current sleep short instead of waiting out the pull interval
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
 
     async def start_monitoring(self):
         """Start the main monitoring loop"""
         self.running = True
-        self.logger.info("Starting grading scheduler...")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.logger.info(f"Starting grading scheduler for {len(self.courses)} course(s): "
+                         f"{', '.join(self.courses)}")
+
+        # Initial load of student states: snapshot if there is a recent one, else marker files
+        for course in self.courses.values():
+            snapshot = None
+            if course.snapshot_config.get('enabled', True):
+                snapshot = load_snapshot(course.snapshot_path,
+                                         max_age=course.snapshot_config.get('max_age', 3600))
+            if snapshot:
+                self._restore_snapshot(course, snapshot)
+            else:
+                course.student_states = course.grader.get_all_student_statuses()
+                self.logger.info(f"[{course.id}] Loaded initial states for {len(course.student_states)} students")
+                # Publish them right away; the dashboard reads states from the snapshot
+                course.snapshot_dirty = True
+
+        background = [asyncio.create_task(self.concurrency.run()),
+                      asyncio.create_task(self._publish_metrics()),
+                      asyncio.create_task(self._flush_snapshots())]
+        if self.job_queue is not None:
+            self._serve_job_queue()
+            background.append(asyncio.create_task(self._expire_job_leases()))
+        if any(course.maintenance.enabled for course in self.courses.values()):
+            background.append(asyncio.create_task(self._maintenance_loop()))
+        try:
+            # One loop per course; they only meet in the shared limiters
+            await asyncio.gather(*(self._monitor_loop(course) for course in self.courses.values()))
+        finally:
+            for task in background:
+                task.cancel()
+            for course in self.courses.values():
+                self._save_snapshot(course)
+                if course.maintenance.repos:
+                    course.maintenance.save(course.registry.active_repos())
 
-        # Initial load of student states
-        self.student_states = self.grader.get_all_student_statuses()
-        self.logger.info(f"Loaded initial states for {len(self.student_states)} students")
+        self.logger.info("Scheduler stopped")
 
+    def _restore_snapshot(self, course: CourseRuntime, snapshot: Dict[str, Any]):
+        course.student_states = snapshot.get('student_states', {})
+        course.last_commits = snapshot.get('last_commits', {})
+        course.next_poll = snapshot.get('next_poll', {})
+        course.pending_grades = snapshot.get('pending_grades', {})
+        now = time.time()
+        due = sum(1 for t in course.next_poll.values() if t <= now)
+        self.logger.info(
+            f"[{course.id}] Warm start from snapshot saved {now - snapshot['saved_at']:.0f}s ago: "
+            f"{len(course.student_states)} students, {due}/{len(course.next_poll)} repos due, "
+            f"{len(course.pending_grades)} pending grades"
+        )
+
+    def _save_snapshot(self, course: CourseRuntime):
+        if not course.snapshot_config.get('enabled', True):
+            return
+        try:
+            save_snapshot({
+                'course': course.id,
+                'student_states': course.student_states,
+                'last_commits': course.last_commits,
+                'next_poll': course.next_poll,
+                'pending_grades': course.pending_grades,
+            }, course.snapshot_path)
+            course.last_snapshot = time.monotonic()
+            course.snapshot_dirty = False
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Failed to save snapshot {course.snapshot_path}: {e}")
+
+    async def _flush_snapshots(self):
+        """Save a course's snapshot soon after a grade finishes, so the dashboard shows it"""
+        while True:
+            await asyncio.sleep(min(course.snapshot_config.get('flush_interval', 1)
+                                    for course in self.courses.values()))
+            for course in self.courses.values():
+                if course.snapshot_dirty:
+                    self._save_snapshot(course)
+
+    async def _publish_metrics(self):
+        """Write each course's runtime metrics for the frontend, which runs in its own process"""
+        interval = (self.config.get('metrics') or {}).get('interval', 10)
+        while True:
+            for course in self.courses.values():
+                self._save_metrics(course)
+            await asyncio.sleep(interval)
+
+    def _save_metrics(self, course: CourseRuntime):
+        try:
+            save_snapshot(dict(self.get_metrics(course.id), remote_repos=self.get_remote_states(course.id)),
+                          course.metrics_path)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Failed to save metrics {course.metrics_path}: {e}")
+
+    def _due_repos(self, course: CourseRuntime, now: float) -> Dict[str, Path]:
+        """Active repositories whose next poll time has passed (new ones are always due)
+
+        The clone being maintained waits for the next cycle.
+        """
+        return {student_id: repo_path for student_id, repo_path in course.registry.active_repos().items()
+                if course.next_poll.get(student_id, 0) <= now and student_id != course.maintenance.in_progress}
+
+    async def _sleep(self, seconds: float):
+        """Sleep that returns early when a shutdown signal arrives"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _monitor_loop(self, course: CourseRuntime):
+        """Pull, grade and refresh states of one course until stopped"""
         while self.running:
             try:
                 loop_start = time.time()
 
-                # Update repositories
-                self.logger.info("Starting repository update cycle")
-                git_results = await self.git_manager.update_all_repositories()
+                # Apply roster changes, then poll only the registered students
+                roster_changes = await self._reconcile_roster(course)
+
+                # Update repositories that are due
+                pull_interval = course.config['scheduler']['pull_interval']
+                due = self._due_repos(course, loop_start)
+                self.logger.debug(f"[{course.id}] Starting repository update cycle for {len(due)} due repos")
+                course.pulling = set(due)
+                try:
+                    git_results = await course.git_manager.update_all_repositories(due)
+                finally:
+                    course.pulling = set()
+                for student_id in git_results:
+                    course.next_poll[student_id] = loop_start + pull_interval
 
                 # Process students whose repositories were updated successfully
                 updated_students = []
+                commits = {}
                 for student_id, result in git_results.items():
                     if result['success']:
+                        if result.get('commit'):
+                            course.last_commits[student_id] = result['commit']
                         # Only grade if there were actual changes
                         if 'Already up to date' not in result.get('message', ''):
                             updated_students.append(student_id)
+                            commits[student_id] = result.get('commit')
 
-                if updated_students:
-                    self.logger.info(f"Grading {len(updated_students)} students with updates")
-                    await self._grade_students(updated_students)
-                else:
-                    self.logger.info("No students need grading this cycle")
+                # Grading owed from before a restart
+                for student_id, commit in list(course.pending_grades.items()):
+                    if student_id not in updated_students and student_id in course.registry.active_repos():
+                        updated_students.append(student_id)
+                        commits.setdefault(student_id, commit)
 
-                # Update all student states
-                self.student_states = self.grader.get_all_student_statuses()
+                # Freshly cloned or re-pointed repositories need a first grade
+                for student_id in roster_changes['added'] + roster_changes['repointed']:
+                    if student_id not in updated_students and student_id in course.registry.active_repos():
+                        updated_students.append(student_id)
 
-                # Calculate sleep time
+                grade_statuses = []
+                if updated_students:
+                    self.logger.debug(f"[{course.id}] Grading {len(updated_students)} students with updates")
+                    course.pending_grades.update({sid: commits.get(sid) for sid in updated_students})
+                    grade_statuses = await self._grade_students(course, updated_students, commits=commits)
+
+                # Update all student states; the result files do not hold the last job's usage, so keep it
+                states = course.grader.get_all_student_statuses(student_ids=course.registry.active_ids())
+                for student_id, state in states.items():
+                    previous = course.student_states.get(student_id, {})
+                    if previous.get('usage') is not None:
+                        state.setdefault('usage', previous['usage'])
+                    # Results written by other processes (regrade, deadline tools) reach the dashboard too
+                    if (previous.get('status'), previous.get('problems')) != (state.get('status'), state.get('problems')):
+                        course.snapshot_dirty = True
+                course.student_states = states
+
+                if time.monotonic() - course.last_snapshot >= course.snapshot_config.get('interval', 60):
+                    self._save_snapshot(course)
+
+                # Sleep until the next repository is due (at most one pull interval)
                 loop_duration = time.time() - loop_start
-                sleep_time = max(0, self.config['scheduler']['pull_interval'] - loop_duration)
+                next_due = min((course.next_poll.get(sid, 0) for sid in course.registry.active_repos()),
+                               default=loop_start + pull_interval)
+                sleep_time = min(pull_interval - loop_duration, next_due - time.time())
+                sleep_time = max(sleep_time, 1.0 if course.registry.active_repos() else pull_interval)
 
-                self.logger.info(f"Cycle completed in {loop_duration:.2f}s, sleeping for {sleep_time:.2f}s")
+                self._log_cycle_summary(course, git_results, grade_statuses, loop_duration, sleep_time)
 
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
+                if self.running:
+                    await self._sleep(sleep_time)
 
             except Exception as e:
-                self.logger.error(f"Scheduler error: {e}")
-                await asyncio.sleep(10)  # Sleep on error to prevent rapid failures
+                self.logger.error(f"[{course.id}] Scheduler error: {e}")
+                await self._sleep(10)  # Sleep on error to prevent rapid failures
+
+    async def _reconcile_roster(self, course: CourseRuntime) -> Dict[str, Any]:
+        """Sync the registry with the roster file (or the students/ directory if there is none)"""
+        if not course.registry.roster_path.exists():
+            course.registry.load_from_directory()
+            return {'added': [], 'retired': [], 'repointed': []}
+
+        changes = await course.registry.reconcile(course.git_manager)
+        for student_id in changes['retired']:
+            course.student_states.pop(student_id, None)
+            course.next_poll.pop(student_id, None)
+            course.pending_grades.pop(student_id, None)
+        for student_id in changes['repointed']:
+            course.next_poll.pop(student_id, None)
+        return changes
+
+    def _log_cycle_summary(self, course: CourseRuntime, git_results, grade_statuses, duration: float,
+                           sleep_time: float):
+        """One INFO record per course and cycle instead of per-student lines"""
+        limits = self.concurrency.snapshot()['limits']
+        summary = {
+            'event': 'cycle',
+            'course': course.id,
+            'repos': len(git_results),
+            'pulled': sum(1 for r in git_results.values() if r['success']),
+            'failed': sum(1 for r in git_results.values() if not r['success'] and not r.get('skipped')),
+            'skipped': sum(1 for r in git_results.values() if r.get('skipped')),
+            'graded': len(grade_statuses),
+            'graded_pass': grade_statuses.count('pass'),
+            'graded_fail': grade_statuses.count('fail'),
+            'duration': round(duration, 3),
+            'pull_concurrency': limits['pull']['limit'],
+            'grade_concurrency': limits['grade']['limit'],
+        }
+        self.logger.info(
+            f"[{course.id}] Cycle completed in {duration:.2f}s: {summary['pulled']}/{summary['repos']} pulled, "
+            f"{summary['failed']} failed, {summary['skipped']} skipped, {summary['graded']} graded "
+            f"({summary['graded_pass']} pass); sleeping {sleep_time:.2f}s",
+            extra=summary
+        )
+
+    async def _grade_students(self, course: CourseRuntime, student_ids, week: str = 'week01', commits=None):
+        """Grade a list of students for a specific week, returning their overall statuses"""
+        commits = commits or {}
+        return await asyncio.gather(*(self._grade_student(course, student_id, week, commits.get(student_id))
+                                      for student_id in student_ids))
+
+    async def _grade_student(self, course: CourseRuntime, student_id: str, week: str, commit=None) -> str:
+        """Grade one student locally or through the worker pool"""
+        fields = {'course': course.id, 'student': student_id, 'week': week, 'commit': commit}
+        try:
+            self.logger.debug(f"Grading student: {course.id}/{student_id}/{week}", extra=fields)
+            if self.job_queue is not None:
+                problem_results, usage = await self._grade_remote(course, student_id, week, commit)
+            else:
+                problem_results, usage = await self._grade_local(course, student_id, week)
+
+            # Determine overall status from individual problems
+            if all(result == True for result in problem_results.values()):
+                overall_status = 'pass'
+            elif any(result == False for result in problem_results.values()):
+                overall_status = 'fail'
+            else:
+                overall_status = 'unknown'
+
+            course.student_states[student_id] = {
+                'status': overall_status,
+                'problems': problem_results,
+                'last_update': time.time(),
+                'usage': usage
+            }
+            course.pending_grades.pop(student_id, None)
+            course.snapshot_dirty = True
 
-        self.logger.info("Scheduler stopped")
+            self.logger.debug(f"Student {student_id}: {overall_status} (problems: {problem_results})",
+                              extra=dict(fields, status=overall_status, problems=problem_results))
+            return overall_status
 
-    async def _grade_students(self, student_ids, week: str = 'week01'):
-        """Grade a list of students for a specific week"""
-        for student_id in student_ids:
+        except Exception as e:
+            self.logger.error(f"Error grading {course.id}/{student_id}: {e}", extra=fields)
+            num_problems = course.config['grading']['num_of_problems']
+            course.student_states[student_id] = {
+                'status': 'fail',
+                'problems': {f"{i:02d}": False for i in range(1, num_problems + 1)},
+                'last_update': time.time()
+            }
+            course.pending_grades.pop(student_id, None)
+            course.snapshot_dirty = True
+            return 'fail'
+
+    async def _grade_local(self, course: CourseRuntime, student_id: str, week: str):
+        """Run the grader in a thread under the course's share of the grade limit; returns (problems, usage)"""
+        loop = asyncio.get_running_loop()
+        usage = {}
+        async with course.grade_limiter:
+            started = time.monotonic()
             try:
-                self.logger.info(f"Grading student: {student_id}/{week}")
-                problem_results = self.grader.grade_student(student_id, week)
-
-                # Determine overall status from individual problems
-                if all(result == True for result in problem_results.values()):
-                    overall_status = 'pass'
-                elif any(result == False for result in problem_results.values()):
-                    overall_status = 'fail'
-                else:
-                    overall_status = 'unknown'
-
-                self.student_states[student_id] = {
-                    'status': overall_status,
-                    'problems': problem_results,
-                    'last_update': time.time()
-                }
-
-                self.logger.info(f"Student {student_id}: {overall_status} (problems: {problem_results})")
-
-            except Exception as e:
-                self.logger.error(f"Error grading {student_id}: {e}")
-                num_problems = self.config['grading']['num_of_problems']
-                self.student_states[student_id] = {
-                    'status': 'fail',
-                    'problems': {f"{i:02d}": False for i in range(1, num_problems + 1)},
-                    'last_update': time.time()
-                }
-
-    def get_current_states(self) -> Dict[str, Any]:
+                problem_results = await loop.run_in_executor(
+                    self.grade_executor, course.grader.grade_student, student_id, week, usage
+                )
+            except Exception:
+                course.grade_limiter.record(time.monotonic() - started, False)
+                raise
+            course.grade_limiter.record(time.monotonic() - started, True)
+            return problem_results, usage
+
+    async def _grade_remote(self, course: CourseRuntime, student_id: str, week: str, commit=None):
+        """Queue a grading job for the worker pool under the course's share of the worker pool and
+        wait for its result; returns (problems, usage)"""
+        # The queue itself is FIFO, so only jobs admitted by the fair share enter it
+        self._update_remote_capacity()
+        async with course.remote_grade_limiter:
+            _, future = self.job_queue.submit({'course': course.id, 'root': str(course.course.root),
+                                               'student_id': student_id, 'week': week, 'commit': commit})
+            result = await asyncio.wrap_future(future)
+        if result.get('error'):
+            raise RuntimeError(f"worker grading failed after {result['attempts']} attempts: {result['error']}")
+        return result['problems'], result.get('usage', {})
+
+    def _update_remote_capacity(self):
+        """Size the worker pool limiter to the live worker slots, plus jobs queued ahead for each"""
+        per_worker = 1 + max(0, int(self.config.get('distributed', {}).get('queue_per_worker', 1)))
+        self.remote_grade_limiter.set_limit(max(1, self.job_queue.live_workers()) * per_worker)
+
+    def _live_work(self) -> bool:
+        """Whether any pull or grading job is running or waiting"""
+        return any(limiter.in_flight or limiter.waiting for limiter in (self.pull_limiter, self.grade_limiter))
+
+    @staticmethod
+    def _busy(course: CourseRuntime) -> set:
+        """Students of a course with a pull in the current cycle or grading owed"""
+        return course.pulling | set(course.pending_grades)
+
+    async def _wait_until_idle(self, max_load: float):
+        """Wait until there is no live work and the host load per core is below ``max_load``"""
+        cores = os.cpu_count() or 1
+        while self._live_work() or (max_load > 0 and hasattr(os, 'getloadavg')
+                                    and os.getloadavg()[0] / cores > max_load):
+            await asyncio.sleep(5)
+
+    async def _maintenance_loop(self):
+        """Repack and prune idle clones one at a time while pulls and grading leave the host idle"""
+        interval = min(course.maintenance.config['interval'] for course in self.courses.values()
+                       if course.maintenance.enabled)
+        while True:
+            await asyncio.sleep(interval)
+            for course in self.courses.values():
+                maintenance = course.maintenance
+                if not maintenance.enabled:
+                    continue
+                try:
+                    repos = course.registry.active_repos()
+                    due = await asyncio.to_thread(maintenance.due, repos, self._busy(course))
+                    for student_id, repo_path in due:
+                        await self._wait_until_idle(maintenance.config['max_load'])
+                        # The due list is stale by now: re-check with no await before maintain() marks
+                        # the clone in progress, so no pull or grade of it can start in between
+                        if maintenance.is_idle(student_id, repo_path, self._busy(course), time.time()):
+                            await maintenance.maintain(student_id, repo_path)
+                    if due:
+                        maintenance.save(repos)
+                except Exception as e:
+                    self.logger.error(f"[{course.id}] Repository maintenance error: {e}")
+
+    async def _expire_job_leases(self):
+        """Re-dispatch jobs from workers that stopped heartbeating and follow the worker count"""
+        interval = max(1.0, self.job_queue.lease_seconds / 4)
+        while True:
+            await asyncio.sleep(interval)
+            self.job_queue.expire_leases()
+            self._update_remote_capacity()
+
+    def get_courses(self) -> List[Dict[str, Any]]:
+        """Hosted courses with their stats"""
+        return [dict(course.course.describe(), stats=self.get_stats(course.id)) for course in self.courses.values()]
+
+    def get_current_states(self, course_id: Optional[str] = None) -> Dict[str, Any]:
         """Get current student states"""
-        return self.student_states.copy()
+        return self.course(course_id).student_states.copy()
 
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, course_id: Optional[str] = None) -> Dict[str, Any]:
         """Get scheduler statistics"""
-        if not self.student_states:
+        student_states = self.course(course_id).student_states
+        if not student_states:
             return {'total': 0, 'pass': 0, 'fail': 0, 'unknown': 0}
 
-        stats = {'total': len(self.student_states), 'pass': 0, 'fail': 0, 'unknown': 0}
-        for state in self.student_states.values():
+        stats = {'total': len(student_states), 'pass': 0, 'fail': 0, 'unknown': 0}
+        for state in student_states.values():
             status = state.get('status', 'unknown')
             stats[status] = stats.get(status, 0) + 1
 
         return stats
 
+    def get_metrics(self, course_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get runtime metrics (shared concurrency limits, host load, the course's remote access state)"""
+        course = self.course(course_id)
+        metrics = {
+            'course': course.id,
+            'concurrency': self.concurrency.snapshot(),
+            'remote': course.git_manager.remote_guard.snapshot(),
+            'git': course.git_manager.backend.snapshot(),
+            'roster': course.registry.snapshot(),
+            'maintenance': course.maintenance.summary(),
+        }
+        if self.job_queue is not None:
+            metrics['grading_queue'] = dict(self.job_queue.snapshot(), limit=self.remote_grade_limiter.limit,
+                                            shares=self.remote_grade_limiter.shares_snapshot())
+        return metrics
+
+    def get_remote_states(self, course_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Backoff / circuit breaker state of every active repository, by student id"""
+        course = self.course(course_id)
+        return {student_id: course.git_manager.get_remote_state(repo_path)
+                for student_id, repo_path in course.registry.active_repos().items()}
+
 
 def setup_logging():
-    """Setup logging configuration"""
+    """Setup queue-based logging (rotating JSON file + console)"""
     try:
         with open('config.yaml', 'r') as file:
-            config = yaml.safe_load(file)
-            log_level = config.get('logging', {}).get('level', 'INFO')
-            log_format = config.get('logging', {}).get('format',
-                                  '%(asctime)s - %(levelname)s - %(message)s')
+            log_config = yaml.safe_load(file).get('logging', {}) or {}
     except:
-        log_level = 'INFO'
-        log_format = '%(asctime)s - %(levelname)s - %(message)s'
-
-    # Create logs directory if it doesn't exist
-    Path('logs').mkdir(exist_ok=True)
-
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format=log_format,
-        handlers=[
-            logging.FileHandler('logs/scheduler.log'),
-            logging.StreamHandler()
-        ]
+        log_config = {}
+
+    return setup_queue_logging(
+        'logs/scheduler.log',
+        level=log_config.get('level', 'INFO'),
+        log_format=log_config.get('format', '%(asctime)s - %(levelname)s - %(message)s'),
+        json_file=log_config.get('json', True),
+        max_bytes=log_config.get('max_bytes', 10 * 1024 * 1024),
+        backup_count=log_config.get('backup_count', 5)
     )
 
 
 async def main():
     """Main entry point"""
-    setup_logging()
+    listener = setup_logging()
     logger = logging.getLogger(__name__)
 
     try:
@@ -182,6 +602,8 @@ async def main():
     except Exception as e:
         logger.error(f"Scheduler crashed: {e}")
         sys.exit(1)
+    finally:
+        stop_queue_logging(listener)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,385 @@
+"""
+Cross-submission similarity.
+
+When a submission is graded, its source files are tokenized (identifiers and
+literals normalized, comments dropped), split into k-token shingles and
+summarized by a MinHash signature. Fingerprints are written per student/week
+to ``state/similarity/<week>/<student>.json`` and are only recomputed when the
+normalized token stream changed. ``SimilarityIndex`` loads them incrementally
+into an LSH index (``bands`` x ``rows`` of the signature), so candidate pairs
+come from shared buckets instead of comparing every pair of students.
+Submissions with identical token streams are reported as duplicate groups.
+
+python -m backend.similarity build --week week03
+python -m backend.similarity pairs --week week03 --threshold 0.8
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import keyword
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from .git_manager import resolve_repo_path
+from .grading_store import read_manifest
+
+FINGERPRINT_DIR = Path('state/similarity')
+MERSENNE_PRIME = (1 << 61) - 1
+
+DEFAULTS = {
+    'enabled': True,
+    'extensions': ['.py', '.c', '.cpp', '.h', '.java'],
+    'shingle_size': 5,
+    'num_perm': 128,
+    'bands': 32,
+    'threshold': 0.8,
+    'max_bucket': 50,
+}
+
+WEEK_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Files in a week directory that belong to the grader, not the student
+IGNORED_NAMES = re.compile(r'^(pass\d*|fail\d*|grade\.py|driver\.py)$')
+
+KEYWORDS = set(keyword.kwlist) | {
+    'int', 'char', 'float', 'double', 'void', 'long', 'short', 'unsigned', 'struct', 'switch', 'case',
+    'default', 'do', 'goto', 'sizeof', 'static', 'const', 'public', 'private', 'protected', 'new', 'this',
+    'throw', 'throws', 'extends', 'implements', 'interface', 'package', 'boolean', 'include', 'define',
+    'print', 'range', 'len',
+}
+
+# Strings are matched too (and kept) so '//' or '#' inside them does not start a comment. '#' starts a
+# comment unless a preprocessor directive follows it directly, so '#include' and '#define' stay tokens
+COMMENT = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/|//[^\n]*'
+    r'|#(?!(?:include|define|undef|ifdef|ifndef|if|elif|else|endif|pragma)\b)[^\n]*', re.S)
+TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[A-Za-z_]\w*|\d+(?:\.\d+)?|\S')
+
+
+def load_similarity_config(root: Path = Path('.')) -> Dict[str, Any]:
+    try:
+        with open(root / 'backend/config.backend.yaml', 'r') as file:
+            config = yaml.safe_load(file).get('similarity', {}) or {}
+    except Exception:
+        config = {}
+    return dict(DEFAULTS, **config)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens with comments removed and identifiers/literals normalized (robust to renaming)"""
+    tokens = []
+    for token in TOKEN.findall(COMMENT.sub(lambda m: m.group(1) or ' ', text)):
+        if token[0] in '"\'':
+            tokens.append('S')
+        elif token[0].isdigit():
+            tokens.append('N')
+        elif token[0].isalpha() or token[0] == '_':
+            tokens.append(token if token in KEYWORDS else 'V')
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def shingles(tokens: List[str], size: int) -> Set[int]:
+    if not tokens:
+        return set()
+    size = min(size, len(tokens))
+    result = set()
+    for i in range(len(tokens) - size + 1):
+        digest = hashlib.blake2b(' '.join(tokens[i:i + size]).encode(), digest_size=8).digest()
+        result.add(int.from_bytes(digest, 'big'))
+    return result
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, shingle_set: Set[int]) -> List[int]:
+        values = [h % MERSENNE_PRIME for h in shingle_set]
+        return [min([(a * v + b) % MERSENNE_PRIME for v in values]) for a, b in self.params]
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a) if a else 0.0
+
+
+def submission_files(student_id: str, week: str, extensions: List[str],
+                     students_dir: Path = Path('students')) -> List[Path]:
+    """Source files of a student's week: ``<repo>/<week>/`` if the repository has it, else the repository root"""
+    student_dir = students_dir / student_id
+    repo_path = resolve_repo_path(student_dir)
+    if repo_path is None:
+        return []
+    source = repo_path / week if (repo_path / week).is_dir() else repo_path
+    # Grader files copied into the week directory are not the student's
+    grader_files = {source / name for name in read_manifest(source).get('files', [])}
+    files = []
+    for root, dirs, names in os.walk(source):
+        # At the repository root, other weeks' directories are not part of this submission
+        at_root = Path(root) == repo_path
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__'
+                   and not (at_root and d.startswith('week'))]
+        for name in names:
+            if name.startswith('.') or IGNORED_NAMES.match(name):
+                continue
+            if os.path.splitext(name)[1] in extensions and Path(root) / name not in grader_files:
+                files.append(Path(root) / name)
+    return sorted(files)
+
+
+class Fingerprinter:
+    """Computes and stores the fingerprint of one student/week (called by the grader)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, root: Path = FINGERPRINT_DIR,
+                 students_dir: Path = Path('students')):
+        self.config = dict(DEFAULTS, **(config or {}))
+        self.root = Path(root)
+        self.students_dir = Path(students_dir)
+        self.hasher = MinHasher(self.config['num_perm'])
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {'shingle_size': self.config['shingle_size'], 'num_perm': self.config['num_perm'],
+                'seed': self.hasher.seed}
+
+    def path(self, student_id: str, week: str) -> Path:
+        return self.root / week / f"{student_id}.json"
+
+    def update(self, student_id: str, week: str) -> bool:
+        """Refresh the fingerprint if the submission changed; returns True if it was rewritten"""
+        files = submission_files(student_id, week, self.config['extensions'], self.students_dir)
+        tokens = []
+        for path in files:
+            try:
+                tokens.extend(tokenize(path.read_text(encoding='utf-8', errors='replace')))
+            except OSError:
+                continue
+
+        path = self.path(student_id, week)
+        if not tokens:
+            if path.exists():
+                path.unlink()
+                return True
+            return False
+
+        digest = hashlib.sha256(' '.join(tokens).encode()).hexdigest()
+        try:
+            previous = json.loads(path.read_text(encoding='utf-8'))
+            if previous.get('digest') == digest and previous.get('params') == self.params:
+                return False
+        except (OSError, ValueError):
+            pass
+
+        fingerprint = {
+            'student_id': student_id,
+            'week': week,
+            'digest': digest,
+            'tokens': len(tokens),
+            'files': len(files),
+            'params': self.params,
+            'signature': self.hasher.signature(shingles(tokens, self.config['shingle_size'])),
+            'updated': time.time(),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(fingerprint), encoding='utf-8')
+        os.replace(tmp, path)
+        return True
+
+
+class SimilarityIndex:
+    """LSH index over stored fingerprints, refreshed incrementally from their mtimes"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, root: Path = FINGERPRINT_DIR):
+        self.config = dict(DEFAULTS, **(config or {}))
+        self.root = Path(root)
+        self.params = Fingerprinter(self.config, root).params
+        self.bands = max(1, self.config['bands'])
+        self.rows = max(1, self.config['num_perm'] // self.bands)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._weeks: Dict[str, Dict[str, Any]] = {}
+
+    def _week_state(self, week: str) -> Dict[str, Any]:
+        if not WEEK_NAME.match(week):
+            raise ValueError(f"Invalid week: {week}")
+        return self._weeks.setdefault(week, {
+            'mtimes': {},        # student -> fingerprint file mtime
+            'digest_of': {},     # student -> digest
+            'students': {},      # digest -> set of students
+            'signatures': {},    # digest -> signature
+            'buckets': [dict() for _ in range(self.bands)],  # band -> key -> set of digests
+        })
+
+    def _band_keys(self, signature: List[int]):
+        for band in range(self.bands):
+            yield band, hash(tuple(signature[band * self.rows:(band + 1) * self.rows]))
+
+    def _remove(self, state: Dict[str, Any], student_id: str):
+        digest = state['digest_of'].pop(student_id, None)
+        if digest is None:
+            return
+        members = state['students'][digest]
+        members.discard(student_id)
+        if not members:
+            del state['students'][digest]
+            for band, key in self._band_keys(state['signatures'].pop(digest)):
+                bucket = state['buckets'][band].get(key)
+                if bucket is not None:
+                    bucket.discard(digest)
+                    if not bucket:
+                        del state['buckets'][band][key]
+
+    def _add(self, state: Dict[str, Any], student_id: str, fingerprint: Dict[str, Any]):
+        digest = fingerprint['digest']
+        state['digest_of'][student_id] = digest
+        if digest not in state['students']:
+            state['students'][digest] = set()
+            state['signatures'][digest] = fingerprint['signature']
+            for band, key in self._band_keys(fingerprint['signature']):
+                state['buckets'][band].setdefault(key, set()).add(digest)
+        state['students'][digest].add(student_id)
+
+    def refresh(self, week: str) -> int:
+        """Load fingerprints written since the last refresh; returns how many changed"""
+        state = self._week_state(week)
+        week_dir = self.root / week
+        seen = {}
+        try:
+            with os.scandir(week_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        seen[entry.name[:-5]] = entry.stat().st_mtime
+        except OSError:
+            pass
+
+        changed = 0
+        for student_id in [s for s in state['mtimes'] if s not in seen]:
+            self._remove(state, student_id)
+            del state['mtimes'][student_id]
+            changed += 1
+        for student_id, mtime in seen.items():
+            if state['mtimes'].get(student_id) == mtime:
+                continue
+            try:
+                fingerprint = json.loads((week_dir / f"{student_id}.json").read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue  # being replaced; picked up next time
+            self._remove(state, student_id)
+            state['mtimes'][student_id] = mtime
+            if fingerprint.get('params') == self.params:
+                self._add(state, student_id, fingerprint)
+            changed += 1
+        return changed
+
+    def pairs(self, week: str, threshold: Optional[float] = None, limit: int = 100) -> Dict[str, Any]:
+        """Candidate pairs above ``threshold`` (estimated Jaccard), most similar first"""
+        threshold = self.config['threshold'] if threshold is None else threshold
+        with self._lock:
+            self.refresh(week)
+            state = self._week_state(week)
+            candidates: Set[Tuple[str, str]] = set()
+            oversized = 0
+            for band in state['buckets']:
+                for members in band.values():
+                    if len(members) > self.config['max_bucket']:
+                        oversized += 1
+                        continue
+                    candidates.update(itertools.combinations(sorted(members), 2))
+
+            pairs = []
+            for a, b in candidates:
+                similarity = estimate_similarity(state['signatures'][a], state['signatures'][b])
+                if similarity >= threshold:
+                    for student_a in state['students'][a]:
+                        for student_b in state['students'][b]:
+                            pairs.append({'students': sorted([student_a, student_b]),
+                                          'similarity': round(similarity, 3)})
+            pairs.sort(key=lambda p: (-p['similarity'], p['students']))
+            duplicates = sorted(sorted(s) for s in state['students'].values() if len(s) > 1)
+            return {
+                'week': week,
+                'threshold': threshold,
+                'submissions': len(state['digest_of']),
+                'duplicates': duplicates,
+                'pairs': pairs[:limit],
+                'total_pairs': len(pairs),
+                'oversized_buckets': oversized,
+            }
+
+    def matches(self, week: str, student_id: str, threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Submissions similar to one student's (None if the student has no fingerprint)"""
+        threshold = self.config['threshold'] if threshold is None else threshold
+        with self._lock:
+            self.refresh(week)
+            state = self._week_state(week)
+            digest = state['digest_of'].get(student_id)
+            if digest is None:
+                return None
+            signature = state['signatures'][digest]
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(state['buckets'][band].get(key, ()))
+
+            matches = [{'student_id': other, 'similarity': 1.0}
+                       for other in state['students'][digest] if other != student_id]
+            for other_digest in candidates - {digest}:
+                similarity = estimate_similarity(signature, state['signatures'][other_digest])
+                if similarity >= threshold:
+                    matches.extend({'student_id': other, 'similarity': round(similarity, 3)}
+                                   for other in state['students'][other_digest])
+            matches.sort(key=lambda m: (-m['similarity'], m['student_id']))
+            return {'week': week, 'student_id': student_id, 'threshold': threshold, 'matches': matches}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-submission similarity index')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Fingerprint submissions (only changed ones are recomputed)')
+    build.add_argument('--week', action='append', dest='weeks', help='Week (repeatable, default: all weeks)')
+    pairs = sub.add_parser('pairs', help='Print candidate pairs for a week')
+    pairs.add_argument('--week', required=True)
+    pairs.add_argument('--threshold', type=float)
+    pairs.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--root', type=Path, default=Path('.'),
+                        help='Course directory (default: current directory)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = load_similarity_config(args.root)
+
+    if args.command == 'build':
+        students_dir = args.root / 'students'
+        fingerprinter = Fingerprinter(config, args.root / FINGERPRINT_DIR, students_dir)
+        updated = total = 0
+        for student_dir in sorted(students_dir.iterdir()) if students_dir.exists() else []:
+            for week_dir in sorted(student_dir.glob('week*')):
+                if week_dir.is_dir() and (not args.weeks or week_dir.name in args.weeks):
+                    total += 1
+                    updated += fingerprinter.update(student_dir.name, week_dir.name)
+        logging.info(f"Fingerprinted {updated} changed of {total} submissions")
+        return 0
+
+    print(json.dumps(SimilarityIndex(config, args.root / FINGERPRINT_DIR).pairs(args.week, args.threshold, args.limit), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Scheduler state snapshot.
+
+The scheduler periodically writes its in-memory state (student states, last
+seen commits, per-repository poll schedule and grading still owed) to
+``state/scheduler.json`` and once more on graceful shutdown. On startup it is
+loaded instead of rescanning every result directory, and the frontend reads it
+to serve a populated dashboard when it runs without the scheduler.
+
+Runtime metrics (limiters, remote access, queues) are published the same way
+to ``state/metrics.json`` every few seconds, since the frontend runs in its
+own process.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SNAPSHOT_FILE = Path('state/scheduler.json')
+METRICS_FILE = Path('state/metrics.json')
+SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def save_snapshot(state: Dict[str, Any], path: Path = SNAPSHOT_FILE):
+    """Write ``state`` atomically so readers never see a torn file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = dict(state, version=SNAPSHOT_VERSION, saved_at=time.time())
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: Path = SNAPSHOT_FILE, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Load a snapshot; None if it is missing, unreadable, from another version or older than ``max_age``"""
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring snapshot {path} with version {data.get('version')}")
+        return None
+    age = time.time() - data.get('saved_at', 0)
+    if max_age is not None and age > max_age:
+        logger.info(f"Ignoring snapshot {path} saved {age:.0f}s ago (max_age {max_age}s)")
+        return None
+    return data
+
+
+class SnapshotReader:
+    """Cached reader for processes that only consume the snapshot (e.g. the frontend)"""
+
+    def __init__(self, path: Path = SNAPSHOT_FILE, max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.max_age = max_age
+        self._mtime: Optional[float] = None
+        self._data: Optional[Dict[str, Any]] = None
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return None
+        if mtime != self._mtime:
+            self._data = load_snapshot(self.path)
+            self._mtime = mtime
+        if self._data is None:
+            return None
+        if self.max_age is not None and time.time() - self._data.get('saved_at', 0) > self.max_age:
+            return None
+        return self._data
@@ -0,0 +1,70 @@
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                    + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_queue_logging(log_file: str, level: str = 'INFO',
+                        log_format: str = '%(asctime)s - %(levelname)s - %(message)s',
+                        json_file: bool = True, max_bytes: int = 10 * 1024 * 1024,
+                        backup_count: int = 5) -> logging.handlers.QueueListener:
+    """Route all logging through a queue so handlers never run on the event loop
+
+    The file handler rotates by size and (optionally) writes JSON Lines; the
+    console keeps the plain text format. Returns the started listener, which
+    must be stopped on shutdown to flush pending records.
+    """
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter() if json_file else logging.Formatter(log_format))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(log_format))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    listener.start()
+    return listener
+
+
+def stop_queue_logging(listener: Optional[logging.handlers.QueueListener]):
+    """Flush and stop the listener started by setup_queue_logging"""
+    if listener is not None:
+        listener.stop()
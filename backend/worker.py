@@ -0,0 +1,166 @@
+"""
+Grading worker.
+
+Leases grading jobs from the scheduler's job queue, runs them with the local
+Grader and returns structured results, heartbeating while a job runs. Workers
+can run on any node that sees the same ``students/`` tree (e.g. over a shared
+filesystem), at the same paths for courses hosted outside the current
+directory; start several on one machine to test locally:
+
+GRADING_AUTHKEY=<secret> python -m backend.worker --connect 127.0.0.1:50051 --slots 2
+"""
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+
+from .git_manager import read_head_commit, resolve_repo_path
+from .grader import Grader
+from .job_queue import connect_job_queue
+
+
+class GradingWorker:
+    def __init__(self, job_queue, worker_id: str, heartbeat_interval: float = 10, poll_interval: float = 1.0):
+        self.queue = job_queue
+        self.worker_id = worker_id
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        # One grader per course directory, created on first use
+        self.graders: Dict[str, Grader] = {}
+        self.running = True
+        self.logger = logging.getLogger(__name__)
+        # Manager proxies are not safe to share between threads
+        self._queue_lock = threading.Lock()
+
+    def _call(self, method: str, *args):
+        with self._queue_lock:
+            return getattr(self.queue, method)(*args)
+
+    def run(self):
+        self.logger.info(f"Worker {self.worker_id} started")
+        while self.running:
+            try:
+                job = self._call('lease', self.worker_id)
+            except (EOFError, ConnectionError, OSError) as e:
+                self.logger.error(f"Lost connection to job queue: {e}")
+                return
+            if job is None:
+                time.sleep(self.poll_interval)
+                continue
+            self._run_job(job)
+        self.logger.info(f"Worker {self.worker_id} stopped")
+
+    def _run_job(self, job: Dict[str, Any]):
+        job_id = job['job_id']
+        payload = job['payload']
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, stop_heartbeat), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = self.grade(payload)
+            self._call('complete', self.worker_id, job_id, result)
+        except Exception as e:
+            self.logger.error(f"Job {job_id} failed on {self.worker_id}: {e}")
+            try:
+                self._call('fail', self.worker_id, job_id, str(e))
+            except Exception:
+                pass
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if not self._call('heartbeat', self.worker_id, job_id):
+                    self.logger.warning(f"Lease on {job_id} was lost; its result may be discarded")
+                    return
+            except Exception as e:
+                self.logger.warning(f"Heartbeat for {job_id} failed: {e}")
+
+    def grade(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Grade one student/week and return a structured result"""
+        student_id = payload['student_id']
+        week = payload.get('week', 'week01')
+        root = payload.get('root', '.')
+        if root not in self.graders:
+            self.graders[root] = Grader(Path(root))
+        grader = self.graders[root]
+        started = time.time()
+        usage = {}
+        problems = grader.grade_student(student_id, week, usage)
+        repo_path = resolve_repo_path(grader.students_dir / student_id)
+        commit = read_head_commit(repo_path) if repo_path else None
+        if payload.get('commit') and commit and commit != payload['commit']:
+            self.logger.info(f"{student_id} moved from {payload['commit'][:8]} to {commit[:8]} before grading")
+        return {
+            'student_id': student_id,
+            'course': payload.get('course'),
+            'week': week,
+            'problems': problems,
+            'usage': usage,
+            'commit': commit,
+            'started': started,
+            'duration': time.time() - started,
+        }
+
+
+def load_distributed_config() -> Dict[str, Any]:
+    try:
+        with open('backend/config.backend.yaml', 'r') as file:
+            return yaml.safe_load(file).get('distributed', {}) or {}
+    except Exception:
+        return {}
+
+
+def parse_address(value: str):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv=None):
+    config = load_distributed_config()
+    parser = argparse.ArgumentParser(description='Distributed grading worker')
+    parser.add_argument('--connect', default=f"127.0.0.1:{config.get('port', 50051)}",
+                        help='host:port of the scheduler job queue')
+    parser.add_argument('--authkey', default=os.environ.get('GRADING_AUTHKEY', config.get('authkey', '')),
+                        help='Shared secret (or GRADING_AUTHKEY env var)')
+    parser.add_argument('--slots', type=int, default=1, help='Jobs to run in parallel on this node')
+    parser.add_argument('--heartbeat', type=float, default=config.get('heartbeat_interval', 10))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    address = parse_address(args.connect)
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    workers = []
+    for slot in range(args.slots):
+        try:
+            job_queue = connect_job_queue(address, args.authkey.encode())
+        except Exception as e:
+            logging.error(f"Cannot connect to job queue at {args.connect}: {e}")
+            return 1
+        workers.append(GradingWorker(job_queue, f"{base_id}:{slot}", args.heartbeat))
+
+    threads = [threading.Thread(target=w.run, name=w.worker_id, daemon=True) for w in workers]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.running = False
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Git backend benchmark.
+
+Pulls a synthetic fleet of local bare repositories (see fleet.py) with each
+git backend: a few idle cycles where nothing changed, then cycles where a
+fraction of the students pushed before the cycle. Reports cycle and per-pull
+latency, CPU time (including children) and the number of processes forked per
+cycle (from /proc/stat, so keep the machine otherwise quiet).
+
+사용법:
+python benchmark/bench_git_backend.py --students 200 --cycles 5 --changed 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path to import backend modules
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import psutil
+
+from fleet import cleanup_workspace, create_fleet, run_git, write_backend_config
+from metrics import latency_summary
+
+
+def forks_since_boot() -> Optional[int]:
+    try:
+        with open('/proc/stat', 'r') as file:
+            for line in file:
+                if line.startswith('processes '):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def cpu_seconds() -> float:
+    times = psutil.Process().cpu_times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def push(workspace: Path, student_id: str):
+    pusher = workspace / 'pushers' / student_id
+    with open(pusher / 'problem01.py', 'a') as file:
+        file.write(f"# edit {time.time()}\n")
+    run_git(['add', '-A'], cwd=pusher)
+    run_git(['commit', '-q', '-m', 'edit'], cwd=pusher)
+    run_git(['push', '-q', 'origin', 'HEAD:main'], cwd=pusher)
+
+
+async def run_cycles(manager, repos: Dict[str, Path], workspace: Path, cycles: int,
+                     changed: float, rng: random.Random) -> Dict[str, Any]:
+    cycle_seconds: List[float] = []
+    pull_seconds: List[float] = []
+    forks: List[int] = []
+    cpu: List[float] = []
+    updated = failures = 0
+
+    pull = manager.pull_repository
+
+    async def timed_pull(repo_path, *args, **kwargs):
+        started = time.perf_counter()
+        result = await pull(repo_path, *args, **kwargs)
+        pull_seconds.append(time.perf_counter() - started)
+        return result
+
+    manager.pull_repository = timed_pull
+    try:
+        for _ in range(cycles):
+            for student_id in rng.sample(sorted(repos), int(len(repos) * changed)):
+                push(workspace, student_id)
+            forks_before, cpu_before = forks_since_boot(), cpu_seconds()
+            started = time.perf_counter()
+            results = await manager.update_all_repositories(repos)
+            cycle_seconds.append(time.perf_counter() - started)
+            cpu.append(cpu_seconds() - cpu_before)
+            if forks_before is not None:
+                forks.append(forks_since_boot() - forks_before)
+            updated += sum(1 for r in results.values()
+                           if r['success'] and 'Already up to date' not in r.get('message', ''))
+            failures += sum(1 for r in results.values() if not r['success'])
+    finally:
+        manager.pull_repository = pull
+
+    return {
+        'cycles': cycles,
+        'updated_repos': updated,
+        'failures': failures,
+        'cycle_latency': latency_summary(cycle_seconds),
+        'pull_latency': latency_summary(pull_seconds),
+        'cpu_seconds_per_cycle': round(sum(cpu) / len(cpu), 3) if cpu else 0.0,
+        'forks_per_cycle': round(sum(forks) / len(forks), 1) if forks else None,
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    from backend.git_backend import GitPythonBackend, SubprocessGitBackend
+    from backend.git_manager import GitManager
+
+    ids = create_fleet(Path('.'), args.students)
+    manager = GitManager(max_concurrent=args.concurrency)
+    repos = {student_id: Path('students') / student_id / 'repo' for student_id in ids}
+    backends = {'subprocess': SubprocessGitBackend(), 'gitpython': GitPythonBackend(args.concurrency)}
+
+    report: Dict[str, Any] = {
+        'config': {'students': args.students, 'cycles': args.cycles, 'changed': args.changed,
+                   'concurrency': args.concurrency, 'cores': psutil.cpu_count()},
+        'backends': {},
+    }
+    for name in args.backends:
+        manager.backend = backends[name]
+        rng = random.Random(args.seed)
+        await manager.update_all_repositories(repos)  # warm up the page cache
+        report['backends'][name] = {
+            'idle': await run_cycles(manager, repos, Path('.'), args.cycles, 0.0, rng),
+            'changed': await run_cycles(manager, repos, Path('.'), args.cycles, args.changed, rng),
+            'counts': manager.backend.snapshot(),
+        }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the subprocess and GitPython git backends')
+    parser.add_argument('--students', type=int, default=100, help='Number of synthetic students')
+    parser.add_argument('--cycles', type=int, default=5, help='Measured cycles per scenario')
+    parser.add_argument('--changed', type=float, default=0.1,
+                        help='Fraction of students that push before each cycle of the changed scenario')
+    parser.add_argument('--concurrency', type=int, default=5, help='Concurrent pulls')
+    parser.add_argument('--backends', nargs='+', default=['subprocess', 'gitpython'],
+                        choices=['subprocess', 'gitpython'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='Workspace directory (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the workspace after the run')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    workspace = Path(args.workdir or tempfile.mkdtemp(prefix='txed-bench-git-')).resolve()
+    workspace.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output).resolve() if args.output else None
+    # No remote rate limit: this measures the backends, not the throttle
+    write_backend_config(workspace, {'git': {'timeout': 30, 'rate_limit': {'rate': 0}}})
+
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        report = asyncio.run(run_benchmark(args))
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            cleanup_workspace(workspace)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        output.write_text(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
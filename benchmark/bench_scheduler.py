@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Scheduler / grader throughput benchmark.
+
+Runs the real GradingScheduler against a synthetic fleet of local bare
+repositories (see fleet.py) while a push driver commits at a steady or
+deadline-rush rate. Everything is offline and runs on a single machine.
+
+사용법:
+python benchmark/bench_scheduler.py --students 200 --duration 60 --profile rush --peak-rate 40
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add parent directory to path to import backend modules
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import psutil
+
+from fleet import (PushDriver, cleanup_workspace, create_fleet, deadline_rush_profile,
+                   run_git, steady_profile, write_backend_config)
+from metrics import latency_summary
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of this process and all of its children"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.root = psutil.Process()
+        self.cpu_samples: List[float] = []
+        self.peak_rss = 0
+        self._processes: Dict[int, psutil.Process] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+        self._cpu_times_start = None
+
+    def start(self):
+        self._cpu_times_start = self._total_cpu_times()
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._elapsed = time.monotonic() - self._started
+        self._cpu_times_end = self._total_cpu_times()
+
+    def _total_cpu_times(self) -> float:
+        times = self.root.cpu_times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                processes = [self.root] + self.root.children(recursive=True)
+            except psutil.Error:
+                continue
+            total_cpu = 0.0
+            total_rss = 0
+            alive = {}
+            for process in processes:
+                tracked = self._processes.get(process.pid, process)
+                try:
+                    total_cpu += tracked.cpu_percent(None)
+                    total_rss += tracked.memory_info().rss
+                    alive[process.pid] = tracked
+                except psutil.Error:
+                    pass
+            self._processes = alive
+            self.cpu_samples.append(total_cpu)
+            self.peak_rss = max(self.peak_rss, total_rss)
+
+    def summary(self) -> Dict[str, Any]:
+        cpu_seconds = self._cpu_times_end - self._cpu_times_start
+        return {
+            'cpu_seconds': round(cpu_seconds, 2),
+            'cpu_percent_avg': round(100.0 * cpu_seconds / self._elapsed, 1) if self._elapsed else 0.0,
+            'cpu_percent_peak': round(max(self.cpu_samples), 1) if self.cpu_samples else 0.0,
+            'peak_rss_mb': round(self.peak_rss / (1024 * 1024), 1),
+            'cores': psutil.cpu_count(),
+        }
+
+
+class SchedulerProbe:
+    """Wraps the scheduler's git manager and grader to count work and measure latency"""
+
+    def __init__(self, scheduler, driver: PushDriver):
+        self.scheduler = scheduler
+        self.driver = driver
+        self.pulls = 0
+        self.pull_failures = 0
+        self.pull_seconds: List[float] = []
+        self.grades = 0
+        self.grade_seconds: List[float] = []
+        self.commit_to_result: List[float] = []
+        self._resolved: Dict[str, int] = {}
+
+        self._pull = scheduler.git_manager.pull_repository
+        self._grade = scheduler.grader.grade_student
+        scheduler.git_manager.pull_repository = self.pull_repository
+        scheduler.grader.grade_student = self.grade_student
+
+    async def pull_repository(self, repo_path, *args, **kwargs):
+        started = time.perf_counter()
+        result = await self._pull(repo_path, *args, **kwargs)
+        self.pull_seconds.append(time.perf_counter() - started)
+        self.pulls += 1
+        if not result.get('success'):
+            self.pull_failures += 1
+        return result
+
+    def grade_student(self, student_id, *args, **kwargs):
+        head = run_git(['rev-parse', 'HEAD'], cwd=Path('students') / student_id / 'repo')
+        started = time.perf_counter()
+        result = self._grade(student_id, *args, **kwargs)
+        finished = time.time()
+        self.grade_seconds.append(time.perf_counter() - started)
+        self.grades += 1
+        self._resolve(student_id, head, finished)
+        return result
+
+    def _resolve(self, student_id: str, head: str, finished: float):
+        """Every push up to and including the graded HEAD now has a result"""
+        pushes = list(self.driver.pushes.get(student_id, []))
+        start = self._resolved.get(student_id, 0)
+        for index in range(start, len(pushes)):
+            if pushes[index][0] == head:
+                for _, pushed_at in pushes[start:index + 1]:
+                    self.commit_to_result.append(finished - pushed_at)
+                self._resolved[student_id] = index + 1
+                return
+
+    def unresolved(self) -> int:
+        return sum(len(p) - self._resolved.get(sid, 0) for sid, p in self.driver.pushes.items())
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    from backend.scheduler import GradingScheduler
+
+    profile = (deadline_rush_profile(args.rate, args.peak_rate, args.rush_fraction)
+               if args.profile == 'rush' else steady_profile(args.rate))
+
+    ids = create_fleet(Path('.'), args.students, args.problems, args.grade_work_ms)
+    scheduler = GradingScheduler()
+    driver = PushDriver(Path('.'), ids, profile, args.duration, args.problems, args.seed)
+    probe = SchedulerProbe(scheduler, driver)
+    sampler = ResourceSampler()
+
+    sampler.start()
+    started = time.monotonic()
+    driver.start()
+    monitor = asyncio.create_task(scheduler.start_monitoring())
+
+    await asyncio.sleep(args.duration)
+    driver.stop()
+    # Give the scheduler time to pick up the last pushes
+    drain_deadline = time.monotonic() + args.drain
+    while probe.unresolved() and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.5)
+
+    scheduler.running = False
+    monitor.cancel()
+    try:
+        await monitor
+    except asyncio.CancelledError:
+        pass
+    elapsed = time.monotonic() - started
+    sampler.stop()
+
+    return {
+        'config': {
+            'students': args.students,
+            'duration': args.duration,
+            'profile': args.profile,
+            'rate': args.rate,
+            'peak_rate': args.peak_rate if args.profile == 'rush' else None,
+            'pull_interval': args.pull_interval,
+            'max_concurrent': args.max_concurrent,
+            'grade_work_ms': args.grade_work_ms,
+        },
+        'elapsed_seconds': round(elapsed, 2),
+        'pushes': driver.push_count,
+        'push_errors': driver.push_errors,
+        'pulls': probe.pulls,
+        'pull_failures': probe.pull_failures,
+        'pulls_per_sec': round(probe.pulls / elapsed, 2),
+        'grades': probe.grades,
+        'grades_per_sec': round(probe.grades / elapsed, 2),
+        'pull_latency': latency_summary(probe.pull_seconds),
+        'grade_latency': latency_summary(probe.grade_seconds),
+        'commit_to_result_latency': latency_summary(probe.commit_to_result),
+        'unresolved_pushes': probe.unresolved(),
+        'final_concurrency': {kind: limits['limit'] for kind, limits
+                              in scheduler.get_metrics()['concurrency']['limits'].items()},
+        'resources': sampler.summary(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline scheduler/grader throughput benchmark')
+    parser.add_argument('--students', type=int, default=50, help='Number of synthetic students')
+    parser.add_argument('--duration', type=float, default=30.0, help='Push phase length (seconds)')
+    parser.add_argument('--drain', type=float, default=30.0,
+                        help='Max seconds to wait for outstanding pushes to be graded')
+    parser.add_argument('--profile', choices=['steady', 'rush'], default='steady')
+    parser.add_argument('--rate', type=float, default=2.0, help='(Base) pushes per second')
+    parser.add_argument('--peak-rate', type=float, default=20.0, help='Peak pushes/sec for the rush profile')
+    parser.add_argument('--rush-fraction', type=float, default=0.3,
+                        help='Fraction of the run spent ramping to the peak rate')
+    parser.add_argument('--problems', type=int, default=3, help='Problems per week')
+    parser.add_argument('--grade-work-ms', type=int, default=50, help='Synthetic CPU work per grading run')
+    parser.add_argument('--pull-interval', type=float, default=5.0, help='scheduler.pull_interval override')
+    parser.add_argument('--max-concurrent', type=int, default=5, help='grading.max_concurrent override')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='Workspace directory (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the workspace after the run')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show scheduler logs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    workspace = Path(args.workdir or tempfile.mkdtemp(prefix='txed-bench-')).resolve()
+    workspace.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output).resolve() if args.output else None
+    write_backend_config(workspace, {
+        'scheduler': {'pull_interval': args.pull_interval},
+        'grading': {'max_concurrent': args.max_concurrent, 'num_of_problems': args.problems},
+    })
+
+    cwd = os.getcwd()
+    os.chdir(workspace)  # the backend resolves students/ and backend/ relative to cwd
+    try:
+        report = asyncio.run(run_benchmark(args))
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            cleanup_workspace(workspace)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        output.write_text(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
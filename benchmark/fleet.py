@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Synthetic student fleet for offline benchmarks.
+
+Creates N local bare repositories that stand in for the students' GitHub
+remotes, a scheduler-side clone of each one under ``students/<id>/repo`` and a
+separate "student" working clone used to push new commits at a configurable rate.
+"""
+import os
+import random
+import shutil
+import subprocess
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+GIT_ENV = {
+    'GIT_AUTHOR_NAME': 'bench',
+    'GIT_AUTHOR_EMAIL': 'bench@localhost',
+    'GIT_COMMITTER_NAME': 'bench',
+    'GIT_COMMITTER_EMAIL': 'bench@localhost',
+    'GIT_TERMINAL_PROMPT': '0',
+}
+
+GRADE_SCRIPT_TEMPLATE = '''#!/usr/bin/env python3
+"""Synthetic grading script generated by benchmark/fleet.py"""
+import time
+from pathlib import Path
+
+WORK_MS = {work_ms}
+NUM_PROBLEMS = {num_problems}
+
+
+def main():
+    # Simulate the CPU cost of running a real test suite
+    deadline = time.perf_counter() + WORK_MS / 1000.0
+    while time.perf_counter() < deadline:
+        pass
+
+    repo_dir = Path('..') / 'repo'
+    for i in range(1, NUM_PROBLEMS + 1):
+        problem_id = f"{{i:02d}}"
+        if (repo_dir / f'problem{{problem_id}}.py').exists():
+            Path(f'pass{{problem_id}}').write_text('ok')
+        else:
+            Path(f'fail{{problem_id}}').write_text('missing')
+
+
+if __name__ == '__main__':
+    main()
+'''
+
+
+def run_git(args: List[str], cwd: Optional[Path] = None) -> str:
+    """Run a git command synchronously and return its stdout"""
+    env = dict(os.environ)
+    env.update(GIT_ENV)
+    result = subprocess.run(
+        ['git'] + args,
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+def student_ids(count: int) -> List[str]:
+    """Deterministic synthetic student ids"""
+    return [f"S{i:05d}" for i in range(1, count + 1)]
+
+
+def write_backend_config(workspace: Path, overrides: Dict[str, Dict]) -> Path:
+    """Write backend/config.backend.yaml into the workspace, based on the repo config"""
+    import yaml
+
+    source = Path(__file__).parent.parent / 'backend' / 'config.backend.yaml'
+    try:
+        with open(source, 'r') as file:
+            config = yaml.safe_load(file) or {}
+    except Exception:
+        config = {}
+
+    for section, values in overrides.items():
+        config.setdefault(section, {}).update(values)
+
+    target = workspace / 'backend' / 'config.backend.yaml'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, 'w') as file:
+        yaml.safe_dump(config, file, sort_keys=False)
+    return target
+
+
+def create_fleet(workspace: Path, count: int, num_problems: int = 3,
+                 grade_work_ms: int = 0, week: str = 'week01') -> List[str]:
+    """Create remotes, scheduler clones and pusher clones for ``count`` students"""
+    remotes_dir = workspace / 'remotes'
+    pushers_dir = workspace / 'pushers'
+    students_dir = workspace / 'students'
+    for directory in (remotes_dir, pushers_dir, students_dir):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    grade_script = GRADE_SCRIPT_TEMPLATE.format(work_ms=grade_work_ms, num_problems=num_problems)
+    ids = student_ids(count)
+
+    def setup(student_id: str):
+        remote = remotes_dir / f"{student_id}.git"
+        pusher = pushers_dir / student_id
+        student_dir = students_dir / student_id
+
+        run_git(['init', '--bare', '-q', '-b', 'main', str(remote)])
+        run_git(['clone', '-q', str(remote), str(pusher)])
+        (pusher / 'README.md').write_text(f"# {student_id}\n")
+        run_git(['add', '-A'], cwd=pusher)
+        run_git(['commit', '-q', '-m', 'initial'], cwd=pusher)
+        run_git(['push', '-q', 'origin', 'HEAD:main'], cwd=pusher)
+
+        student_dir.mkdir(parents=True, exist_ok=True)
+        run_git(['clone', '-q', str(remote), str(student_dir / 'repo')])
+        week_dir = student_dir / week
+        week_dir.mkdir(exist_ok=True)
+        (week_dir / 'grade.py').write_text(grade_script)
+
+    with ThreadPoolExecutor(max_workers=min(16, max(1, count))) as executor:
+        list(executor.map(setup, ids))
+
+    logging.info(f"Created synthetic fleet of {count} students in {workspace}")
+    return ids
+
+
+def create_status_tree(workspace: Path, count: int, num_problems: int = 3,
+                       week: str = 'week01', seed: int = 0) -> List[str]:
+    """Create a graded ``students/`` tree (pass/fail marker files only, no git)"""
+    rng = random.Random(seed)
+    ids = student_ids(count)
+    for student_id in ids:
+        week_dir = workspace / 'students' / student_id / week
+        week_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(1, num_problems + 1):
+            marker = 'pass' if rng.random() < 0.6 else 'fail'
+            (week_dir / f"{marker}{i:02d}").write_text('')
+    return ids
+
+
+def steady_profile(rate: float) -> Callable[[float, float], float]:
+    """Constant push rate (pushes/sec)"""
+    def profile(elapsed: float, duration: float) -> float:
+        return rate
+    return profile
+
+
+def deadline_rush_profile(base_rate: float, peak_rate: float,
+                          rush_fraction: float = 0.3) -> Callable[[float, float], float]:
+    """Base rate until the last ``rush_fraction`` of the run, then a linear ramp to ``peak_rate``"""
+    def profile(elapsed: float, duration: float) -> float:
+        rush_start = duration * (1.0 - rush_fraction)
+        if elapsed < rush_start or rush_fraction <= 0:
+            return base_rate
+        progress = min(1.0, (elapsed - rush_start) / (duration - rush_start))
+        return base_rate + (peak_rate - base_rate) * progress
+    return profile
+
+
+class PushDriver:
+    """Pushes commits to the synthetic remotes following a rate profile"""
+
+    def __init__(self, workspace: Path, ids: List[str], profile: Callable[[float, float], float],
+                 duration: float, num_problems: int = 3, seed: int = 0, max_workers: int = 8):
+        self.pushers_dir = workspace / 'pushers'
+        self.ids = ids
+        self.profile = profile
+        self.duration = duration
+        self.num_problems = num_problems
+        self.random = random.Random(seed)
+        self.max_workers = max_workers
+        self.logger = logging.getLogger(__name__)
+
+        # student_id -> [(sha, push_time)] in push order
+        self.pushes: Dict[str, List[Tuple[str, float]]] = {sid: [] for sid in ids}
+        self.push_errors = 0
+        self._student_locks = {sid: threading.Lock() for sid in ids}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='push-driver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def push_count(self) -> int:
+        with self._lock:
+            return sum(len(p) for p in self.pushes.values())
+
+    def _run(self):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self._stop.is_set():
+                elapsed = time.monotonic() - start
+                if elapsed >= self.duration:
+                    break
+                rate = self.profile(elapsed, self.duration)
+                if rate <= 0:
+                    self._stop.wait(0.1)
+                    continue
+                # Poisson arrivals at the current rate
+                self._stop.wait(self.random.expovariate(rate))
+                student_id = self.random.choice(self.ids)
+                problem = self.random.randint(1, self.num_problems)
+                executor.submit(self._push, student_id, problem)
+
+    def _push(self, student_id: str, problem: int):
+        pusher = self.pushers_dir / student_id
+        with self._student_locks[student_id]:
+            try:
+                target = pusher / f"problem{problem:02d}.py"
+                with open(target, 'a') as file:
+                    file.write(f"# edit {time.time()}\n")
+                run_git(['add', '-A'], cwd=pusher)
+                run_git(['commit', '-q', '-m', f'problem {problem:02d}'], cwd=pusher)
+                sha = run_git(['rev-parse', 'HEAD'], cwd=pusher)
+                run_git(['push', '-q', 'origin', 'HEAD:main'], cwd=pusher)
+                pushed_at = time.time()
+                with self._lock:
+                    self.pushes[student_id].append((sha, pushed_at))
+            except subprocess.CalledProcessError as e:
+                with self._lock:
+                    self.push_errors += 1
+                self.logger.warning(f"Push failed for {student_id}: {e.stderr}")
+
+
+def cleanup_workspace(workspace: Path):
+    shutil.rmtree(workspace, ignore_errors=True)
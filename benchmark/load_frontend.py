@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+WebSocket / REST load test for the dashboard server (frontend/main.py).
+
+Builds a synthetic graded ``students/`` tree, starts the FastAPI app with
+uvicorn against it (or targets an already running server with --url), then
+opens many concurrent ``/ws`` clients while hammering the REST endpoints.
+
+Reports connection setup time, broadcast fan-out latency, REST throughput and
+latency per endpoint, and server memory.
+
+사용법:
+python benchmark/load_frontend.py --students 300 --clients 2000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.append(str(Path(__file__).parent))
+
+import psutil
+import websockets
+
+from fleet import cleanup_workspace, create_status_tree, write_backend_config
+from metrics import latency_summary
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# REST endpoints by name; a student is picked per request only for the per-student one
+ENDPOINTS = {
+    'status': '/api/status',
+    'stats': '/api/stats',
+    'student': '/api/students/{id}',
+}
+
+
+def raise_fd_limit(needed: int):
+    """Raise the soft open-file limit so thousands of sockets can be opened"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, needed)
+    if soft < needed and target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    if soft < needed:
+        logging.warning(f"Open file limit {soft} is lower than the {needed} sockets requested")
+
+
+class HttpClient:
+    """Minimal keep-alive HTTP/1.1 GET client on asyncio streams"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def get(self, path: str) -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            request = (f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                       f"Connection: keep-alive\r\n\r\n")
+            self.writer.write(request.encode())
+            await self.writer.drain()
+
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError('connection closed')
+            status = int(status_line.split()[1])
+            length = 0
+            chunked = False
+            while True:
+                line = await self.reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                name = name.strip().lower()
+                if name == 'content-length':
+                    length = int(value.strip())
+                elif name == 'transfer-encoding' and 'chunked' in value.lower():
+                    chunked = True
+
+            body = b''
+            if chunked:
+                while True:
+                    size = int((await self.reader.readline()).strip(), 16)
+                    body += (await self.reader.readexactly(size + 2))[:-2]
+                    if size == 0:
+                        break
+            elif length:
+                body = await self.reader.readexactly(length)
+            return status, body
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+
+class LoadStats:
+    def __init__(self):
+        self.connect_seconds: List[float] = []
+        self.connect_failures = 0
+        self.connected = 0
+        self.dropped = 0
+        self.messages = 0
+        self.message_bytes = 0
+        self.fanout_seconds: List[float] = []
+        self.rest_seconds: Dict[str, List[float]] = {}
+        self.rest_errors: Dict[str, int] = {}
+
+
+async def ws_client(url: str, stats: LoadStats, stop: asyncio.Event, open_timeout: float):
+    started = time.perf_counter()
+    established = False
+    try:
+        async with websockets.connect(url, open_timeout=open_timeout, max_size=None,
+                                      ping_interval=None, close_timeout=1) as socket:
+            # Setup is complete once the initial status message arrives
+            await asyncio.wait_for(socket.recv(), timeout=open_timeout)
+            stats.connect_seconds.append(time.perf_counter() - started)
+            stats.connected += 1
+            established = True
+
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(socket.recv(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.time()
+                stats.messages += 1
+                stats.message_bytes += len(raw)
+                try:
+                    payload = json.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(payload, dict) and 'timestamp' in payload:
+                    stats.fanout_seconds.append(received - payload['timestamp'])
+    except (asyncio.TimeoutError, OSError, websockets.exceptions.WebSocketException):
+        if stop.is_set():
+            return
+        if established:
+            stats.dropped += 1
+        else:
+            stats.connect_failures += 1
+
+
+async def rest_worker(host: str, port: int, weights: Dict[str, float], ids: List[str], stats: LoadStats,
+                      stop: asyncio.Event, seed: int):
+    rng = random.Random(seed)
+    client = HttpClient(host, port)
+    names, shares = list(weights), list(weights.values())
+    while not stop.is_set():
+        # Endpoint first, by weight, so the mix does not depend on the number of students
+        key = ENDPOINTS[rng.choices(names, shares)[0]]
+        path = key.format(id=rng.choice(ids)) if '{id}' in key else key
+        started = time.perf_counter()
+        try:
+            await client.get(path)
+            stats.rest_seconds.setdefault(key, []).append(time.perf_counter() - started)
+        except Exception:
+            stats.rest_errors[key] = stats.rest_errors.get(key, 0) + 1
+            await asyncio.sleep(0.1)
+    await client.close()
+
+
+class MemorySampler:
+    """Samples RSS of the server process tree"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+
+    def start(self):
+        if self.process:
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.process:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                processes = [self.process] + self.process.children(recursive=True)
+                self.samples.append(sum(p.memory_info().rss for p in processes))
+            except psutil.Error:
+                pass
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {}
+        return {
+            'start_rss_mb': round(self.samples[0] / (1024 * 1024), 1),
+            'peak_rss_mb': round(max(self.samples) / (1024 * 1024), 1),
+            'end_rss_mb': round(self.samples[-1] / (1024 * 1024), 1),
+        }
+
+
+def start_server(workspace: Path, port: int) -> subprocess.Popen:
+    """Run uvicorn against the synthetic workspace"""
+    (workspace / 'frontend').mkdir(exist_ok=True)
+    templates = workspace / 'frontend' / 'templates'
+    if not templates.exists():
+        templates.symlink_to(REPO_ROOT / 'frontend' / 'templates')
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get('PYTHONPATH')]))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'frontend.main:app',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=workspace,
+        env=env
+    )
+
+
+async def wait_for_server(host: str, port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = HttpClient(host, port)
+        try:
+            status, _ = await client.get('/health')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {host}:{port} did not become ready")
+
+
+async def run_load(args, base_url: str, ids: List[str], server_pid: Optional[int]) -> Dict[str, Any]:
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    ws_url = f"ws://{host}:{port}/ws"
+    await wait_for_server(host, port)
+    if not ids:
+        # Targeting an existing server: take the student ids from its current status
+        client = HttpClient(host, port)
+        _, body = await client.get('/api/status')
+        await client.close()
+        try:
+            ids = sorted(json.loads(body))
+        except (ValueError, TypeError):
+            ids = []
+
+    ids = ids or ['missing']
+    stats = LoadStats()
+    stop = asyncio.Event()
+    sampler = MemorySampler(server_pid)
+    sampler.start()
+
+    started = time.monotonic()
+    tasks = []
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(ws_client(ws_url, stats, stop, args.open_timeout)))
+        if args.ramp_rate > 0:
+            await asyncio.sleep(1.0 / args.ramp_rate)
+    ramp_seconds = time.monotonic() - started
+
+    rest_started = time.monotonic()
+    tasks += [asyncio.create_task(rest_worker(host, port, args.weights, ids, stats, stop, args.seed + i))
+              for i in range(args.rest_workers)]
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    rest_elapsed = time.monotonic() - rest_started
+    await asyncio.wait(tasks, timeout=10)
+    sampler.stop()
+
+    rest = {}
+    for key, values in sorted(stats.rest_seconds.items()):
+        rest[key] = dict(latency_summary(values),
+                         requests_per_sec=round(len(values) / rest_elapsed, 1),
+                         errors=stats.rest_errors.get(key, 0))
+    total_requests = sum(len(v) for v in stats.rest_seconds.values())
+
+    return {
+        'config': {
+            'students': args.students,
+            'clients': args.clients,
+            'rest_workers': args.rest_workers,
+            'weights': args.weights,
+            'duration': args.duration,
+            'ramp_rate': args.ramp_rate,
+        },
+        'websocket': {
+            'connected': stats.connected,
+            'connect_failures': stats.connect_failures,
+            'dropped': stats.dropped,
+            'ramp_seconds': round(ramp_seconds, 2),
+            'setup_latency': latency_summary(stats.connect_seconds),
+            'messages': stats.messages,
+            'message_mb': round(stats.message_bytes / (1024 * 1024), 2),
+            'fanout_latency': latency_summary(stats.fanout_seconds),
+        },
+        'rest': {
+            'requests': total_requests,
+            'requests_per_sec': round(total_requests / rest_elapsed, 1),
+            'endpoints': rest,
+        },
+        'server_memory': sampler.summary(),
+    }
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """'status=1,stats=1,student=2' -> endpoint weights; unnamed endpoints get 0"""
+    weights = dict.fromkeys(ENDPOINTS, 0.0)
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (expected {', '.join(ENDPOINTS)})")
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for {name}: {value!r}")
+    if sum(weights.values()) <= 0 or min(weights.values()) < 0:
+        raise argparse.ArgumentTypeError('weights must be non-negative with a positive total')
+    return weights
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Dashboard WebSocket/REST load test')
+    parser.add_argument('--students', type=int, default=300, help='Size of the synthetic students/ tree')
+    parser.add_argument('--problems', type=int, default=3, help='Problems per week')
+    parser.add_argument('--clients', type=int, default=500, help='Concurrent /ws connections')
+    parser.add_argument('--ramp-rate', type=float, default=200.0,
+                        help='New WebSocket connections per second (0 = all at once)')
+    parser.add_argument('--rest-workers', type=int, default=20, help='Concurrent REST request loops')
+    parser.add_argument('--weights', type=parse_weights, default='status=1,stats=1,student=1',
+                        help='Share of REST requests per endpoint (status, stats, student)')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='Seconds to hold the load after the ramp (>5 to see broadcasts)')
+    parser.add_argument('--open-timeout', type=float, default=30.0)
+    parser.add_argument('--port', type=int, default=8765, help='Port for the spawned server')
+    parser.add_argument('--url', help='Target an already running server instead, e.g. http://host:8000')
+    parser.add_argument('--server-pid', type=int, help='PID of the --url server for memory sampling')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='Workspace directory (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the workspace after the run')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise_fd_limit(args.clients + args.rest_workers + 256)
+
+    workspace = None
+    server = None
+    ids: List[str] = []
+    if args.url:
+        base_url = args.url
+        server_pid = args.server_pid
+    else:
+        workspace = Path(args.workdir or tempfile.mkdtemp(prefix='txed-load-')).resolve()
+        workspace.mkdir(parents=True, exist_ok=True)
+        write_backend_config(workspace, {'grading': {'num_of_problems': args.problems}})
+        ids = create_status_tree(workspace, args.students, args.problems, seed=args.seed)
+        server = start_server(workspace, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+        server_pid = server.pid
+
+    try:
+        report = asyncio.run(run_load(args, base_url, ids, server_pid))
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if workspace and not args.keep:
+            cleanup_workspace(workspace)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
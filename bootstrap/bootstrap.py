@@ -10,6 +10,7 @@ from pathlib import Path
 # Add parent directory to path to import backend modules
 sys.path.append(str(Path(__file__).parent.parent))
 from backend.git_manager import GitManager
+from backend.grading_store import GradingScriptStore
 
 
 def setup_logging():
@@ -161,21 +162,6 @@ async def setup_student(student: dict, git_manager: GitManager):
             logging.error(f"Failed to clone repository for {student_id}: {clone_result.get('error', 'Unknown error')}")
             return False
 
-        # Copy grading scripts to cloned repository
-        source_grading = Path('../grading')
-        if source_grading.exists():
-            try:
-                for week_dir in source_grading.iterdir():
-                    if week_dir.is_dir():
-                        target_dir = student_dir / week_dir.name
-                        if not target_dir.exists():
-                            shutil.copytree(week_dir, target_dir)
-                            logging.info(f"Copied grading scripts {week_dir.name} for {student_id}")
-            except Exception as e:
-                logging.warning(f"Failed to copy grading scripts for {student_id}: {e}")
-        else:
-            logging.warning("No grading directory found to copy")
-
         logging.info(f"Successfully set up {student_id}")
         return True
 
@@ -200,6 +186,14 @@ async def main():
     # Create grading template if needed
     create_grading_template()
 
+    # Publish grading scripts once to the shared store instead of copying them
+    # into every student's repository
+    published = GradingScriptStore(Path('../grading_store')).publish_all(Path('../grading'))
+    if published:
+        logger.info(f"Published grading scripts: {published}")
+    else:
+        logger.warning("No grading scripts found to publish")
+
     # Read student process list
     students = read_process_list()
     if not students:
@@ -1,18 +1,29 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import json
 import asyncio
+import hmac
+import os
+import subprocess
 import time
 import logging
 import sys
 from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
 
 # Add parent directory to path to import backend modules
 sys.path.append(str(Path(__file__).parent.parent))
 
+from backend.courses import Course, load_courses, read_host_config
 from backend.grader import Grader
+from backend.maintenance import DEFAULTS as MAINTENANCE_DEFAULTS, load_report
+from backend import deadline, gradebook, regrade
+from backend.similarity import FINGERPRINT_DIR, SimilarityIndex, load_similarity_config
+from backend.snapshot import METRICS_FILE, SNAPSHOT_FILE, SnapshotReader
 
 app = FastAPI(title="학생 실습 모니터링 시스템")
 templates = Jinja2Templates(directory="frontend/templates")
@@ -20,15 +31,15 @@ templates = Jinja2Templates(directory="frontend/templates")
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        # websocket -> id of the course it follows
+        self.active_connections: dict[WebSocket, str] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, course_id: str):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[websocket] = course_id
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         try:
@@ -36,9 +47,11 @@ class ConnectionManager:
         except:
             self.disconnect(websocket)
 
-    async def broadcast(self, message: str):
+    async def broadcast(self, message: str, course_id: str):
         disconnected = []
-        for connection in self.active_connections:
+        for connection, followed in list(self.active_connections.items()):
+            if followed != course_id:
+                continue
             try:
                 await connection.send_text(message)
             except:
@@ -48,76 +61,167 @@ class ConnectionManager:
         for connection in disconnected:
             self.disconnect(connection)
 
+class CourseView:
+    """Per-course readers of the state the scheduler process publishes
+
+    The scheduler runs in its own process (run.sh) and no longer registers itself
+    here (the old set_scheduler_instance hook); student states come from its
+    snapshot, which it saves within ``snapshot.flush_interval`` of every finished grade.
+    """
+
+    def __init__(self, course: Course):
+        self.course = course
+        self.grader = Grader(course.root)
+        self.similarity_index = SimilarityIndex(load_similarity_config(course.root), course.root / FINGERPRINT_DIR)
+        # Scheduler snapshot, served while the scheduler keeps saving it; otherwise results are read from disk
+        snapshot_config = self.grader.config.get('snapshot') or {}
+        self.snapshot_reader = SnapshotReader(course.root / snapshot_config.get('path', SNAPSHOT_FILE),
+                                              max_age=max(30, 3 * snapshot_config.get('interval', 60)))
+        # Runtime metrics published by the scheduler process; ignored once it stops updating them
+        metrics_config = self.grader.config.get('metrics') or {}
+        self.metrics_reader = SnapshotReader(course.root / metrics_config.get('path', METRICS_FILE),
+                                             max_age=max(30, 3 * metrics_config.get('interval', 10)))
+
+
 manager = ConnectionManager()
-grader = Grader()
+host_config = read_host_config()
+course_views = {course.id: CourseView(course) for course in load_courses(host_config)}
+# Admin routes need this token; without one they only answer clients on this machine
+admin_token = os.environ.get('GRADING_ADMIN_TOKEN', str((host_config.get('server') or {}).get('admin_token') or ''))
+LOCAL_CLIENTS = ('127.0.0.1', '::1')
+
+
+async def require_admin(request: Request):
+    """``Authorization: Bearer <server.admin_token>``, or a local client when no token is configured"""
+    if admin_token:
+        if not hmac.compare_digest(request.headers.get('authorization', ''), f"Bearer {admin_token}"):
+            raise HTTPException(status_code=401, detail="Admin token required")
+    elif request.client is None or request.client.host not in LOCAL_CLIENTS:
+        raise HTTPException(status_code=403, detail="Admin API is only available from localhost "
+                                                    "unless server.admin_token is set")
+
+
+def _course_view(course_id: Optional[str]) -> Optional[CourseView]:
+    """The requested course (the first hosted course if none was given)"""
+    if course_id is None:
+        return next(iter(course_views.values()))
+    return course_views.get(course_id)
 
-# Global variable to store scheduler instance (will be set when scheduler starts)
-scheduler_instance = None
 
-def set_scheduler_instance(scheduler):
-    """Called by scheduler to register itself"""
-    global scheduler_instance
-    scheduler_instance = scheduler
+def _course_not_found(course_id: Optional[str]) -> JSONResponse:
+    return JSONResponse({"error": f"Course not found: {course_id}"}, status_code=404)
 
 
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
-    """Main dashboard page"""
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+    """Main dashboard page (first hosted course)"""
+    view = _course_view(None)
+    return templates.TemplateResponse("dashboard.html", {"request": request, "course": view.course.describe()})
+
+
+@app.get("/courses/{course_id}", response_class=HTMLResponse)
+async def course_dashboard(request: Request, course_id: str):
+    """Dashboard page of one hosted course"""
+    view = _course_view(course_id)
+    if view is None:
+        return _course_not_found(course_id)
+    return templates.TemplateResponse("dashboard.html", {"request": request, "course": view.course.describe()})
+
+
+@app.get("/api/courses")
+async def list_courses():
+    """Courses hosted by this server, with their stats"""
+    courses = []
+    for course_id, view in course_views.items():
+        courses.append(dict(view.course.describe(), stats=await get_stats(course_id)))
+    return courses
 
 
 @app.get("/api/status")
-async def get_status():
+async def get_status(course: Optional[str] = None):
     """Get current status of all students"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
     try:
-        if scheduler_instance:
-            return scheduler_instance.get_current_states()
-        else:
-            # Fallback to grader if scheduler is not available
-            return grader.get_all_student_statuses()
+        return _current_states(view)
     except Exception as e:
         logging.error(f"Error getting status: {e}")
         return {}
 
 
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(course: Optional[str] = None):
     """Get statistics about student status"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
     try:
-        if scheduler_instance:
-            return scheduler_instance.get_stats()
-        else:
-            statuses = grader.get_all_student_statuses()
-            stats = {'total': len(statuses), 'pass': 0, 'fail': 0, 'unknown': 0}
-            for status in statuses.values():
-                status_type = status.get('status', 'unknown')
-                stats[status_type] = stats.get(status_type, 0) + 1
-            return stats
+        statuses = _current_states(view)
+        stats = {'total': len(statuses), 'pass': 0, 'fail': 0, 'unknown': 0}
+        for status in statuses.values():
+            status_type = status.get('status', 'unknown')
+            stats[status_type] = stats.get(status_type, 0) + 1
+        return stats
     except Exception as e:
         logging.error(f"Error getting stats: {e}")
         return {'total': 0, 'pass': 0, 'fail': 0, 'unknown': 0}
 
 
+def _current_states(view: CourseView):
+    """Student states from the scheduler's snapshot, or from the result files if the scheduler stopped saving it"""
+    snapshot = view.snapshot_reader.read()
+    if snapshot is not None:
+        return snapshot['student_states']
+    return view.grader.get_all_student_statuses()
+
+
+@app.get("/api/metrics")
+async def get_metrics(course: Optional[str] = None):
+    """Get scheduler runtime metrics (concurrency limits, host load), as the scheduler last published them"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    return view.metrics_reader.read() or {}
+
+
+@app.get("/api/maintenance")
+async def get_maintenance_report(course: Optional[str] = None):
+    """Per-repository maintenance results: disk usage and pull latency before/after"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    path = (view.grader.config.get('maintenance') or {}).get('path', MAINTENANCE_DEFAULTS['path'])
+    return load_report(view.course.root / path) or {'summary': None, 'repos': {}}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": time.time(),
-        "scheduler_running": scheduler_instance is not None
+        # The scheduler is a separate process; it is running while it keeps publishing metrics
+        "scheduler_running": any(view.metrics_reader.read() is not None for view in course_views.values()),
+        "courses": list(course_views)
     }
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, course: Optional[str] = None):
+    """WebSocket endpoint for real-time updates of one course"""
+    view = _course_view(course)
+    if view is None:
+        await websocket.close(code=1008)
+        return
+    course_id = view.course.id
+    await manager.connect(websocket, course_id)
 
     try:
         # Send initial data
-        initial_data = await get_status()
+        initial_data = await get_status(course_id)
         await manager.send_personal_message(
-            json.dumps({"type": "status_update", "data": initial_data}),
+            json.dumps({"type": "status_update", "course": course_id, "data": initial_data}),
             websocket
         )
 
@@ -132,9 +236,9 @@ async def websocket_endpoint(websocket: WebSocket):
                     await manager.send_personal_message("pong", websocket)
             except asyncio.TimeoutError:
                 # Send periodic updates every 30 seconds if no messages
-                current_status = await get_status()
+                current_status = await get_status(course_id)
                 await manager.send_personal_message(
-                    json.dumps({"type": "status_update", "data": current_status}),
+                    json.dumps({"type": "status_update", "course": course_id, "data": current_status}),
                     websocket
                 )
     except WebSocketDisconnect:
@@ -148,18 +252,20 @@ async def broadcast_updates():
     """Background task to broadcast updates to all connected clients"""
     while True:
         try:
-            if manager.active_connections:
-                current_status = await get_status()
-                stats = await get_stats()
+            # Only courses someone is watching
+            for course_id in set(manager.active_connections.values()):
+                current_status = await get_status(course_id)
+                stats = await get_stats(course_id)
 
                 message = json.dumps({
                     "type": "status_update",
+                    "course": course_id,
                     "data": current_status,
                     "stats": stats,
                     "timestamp": time.time()
                 })
 
-                await manager.broadcast(message)
+                await manager.broadcast(message, course_id)
         except Exception as e:
             logging.error(f"Error broadcasting updates: {e}")
 
@@ -177,22 +283,262 @@ async def startup_event():
 
 # Simple API endpoints for external monitoring
 @app.get("/api/students/{student_id}")
-async def get_student_status(student_id: str):
+async def get_student_status(student_id: str, course: Optional[str] = None):
     """Get status of a specific student"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
     try:
-        if scheduler_instance:
-            all_states = scheduler_instance.get_current_states()
-            if student_id in all_states:
-                return all_states[student_id]
-        else:
-            status = grader.get_student_status(student_id)
-            if status:
-                return status
-
-        return {"error": "Student not found"}, 404
+        status = _current_states(view).get(student_id) or view.grader.get_student_status(student_id)
+        if not status:
+            return JSONResponse({"error": "Student not found"}, status_code=404)
+        # Backoff / circuit state as last published by the scheduler (None while it is not running)
+        metrics = view.metrics_reader.read() or {}
+        return dict(status, remote=(metrics.get('remote_repos') or {}).get(student_id))
     except Exception as e:
         logging.error(f"Error getting student {student_id} status: {e}")
-        return {"error": "Internal server error"}, 500
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+
+@app.get("/api/students/{student_id}/outputs", dependencies=[Depends(require_admin)])
+async def list_grading_outputs(student_id: str, week: str = 'week01', course: Optional[str] = None):
+    """List the stored grading outputs of a student/week, newest first"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    output_store = view.grader.output_store
+    if output_store is None:
+        return JSONResponse({"error": "Grading output store is disabled"}, status_code=404)
+    try:
+        outputs = await asyncio.to_thread(output_store.list, student_id, week)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"student_id": student_id, "week": week, "outputs": outputs}
+
+
+@app.get("/api/students/{student_id}/outputs/{output_id}", dependencies=[Depends(require_admin)])
+async def get_grading_output(student_id: str, output_id: str, request: Request, week: str = 'week01',
+                             course: Optional[str] = None):
+    """Stream one stored grading output (gzip as-is when the client accepts it)"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    output_store = view.grader.output_store
+    if output_store is None:
+        return JSONResponse({"error": "Grading output store is disabled"}, status_code=404)
+    try:
+        path = output_store.path(student_id, week, output_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if path is None:
+        return JSONResponse({"error": "Output not found"}, status_code=404)
+
+    media_type = 'text/plain; charset=utf-8'
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        return FileResponse(path, media_type=media_type, headers={'Content-Encoding': 'gzip'})
+    return StreamingResponse(output_store.iter_text(path), media_type=media_type)
+
+
+@app.get("/api/export/gradebook")
+async def export_gradebook(format: str = 'csv', history: bool = False,
+                           week: Optional[List[str]] = Query(None), students: Optional[str] = None,
+                           course: Optional[str] = None):
+    """Stream the gradebook (students x weeks x problems) as CSV or JSON Lines"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    if format not in gradebook.FORMATS:
+        return JSONResponse({"error": f"format must be one of {', '.join(gradebook.FORMATS)}"}, status_code=400)
+    student_ids = [s.strip() for s in students.split(',')] if students else None
+    rows = gradebook.iter_rows(week, student_ids, history,
+                               num_problems=view.grader.config['grading']['num_of_problems'],
+                               students_dir=view.grader.students_dir)
+    # A sync iterator is consumed in the threadpool, so the export never blocks the event loop
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    filename = f"gradebook-{view.course.id}{'-history' if history else ''}-{time.strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(gradebook.iter_export(rows, format), media_type=media_type,
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@app.get("/api/similarity/{week}", dependencies=[Depends(require_admin)])
+async def get_similar_pairs(week: str, threshold: Optional[float] = None, limit: int = 100,
+                            course: Optional[str] = None):
+    """Candidate near-duplicate submission pairs for a week, most similar first"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    try:
+        return await asyncio.to_thread(view.similarity_index.pairs, week, threshold, limit)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@app.get("/api/similarity/{week}/{student_id}", dependencies=[Depends(require_admin)])
+async def get_similar_submissions(week: str, student_id: str, threshold: Optional[float] = None,
+                                  course: Optional[str] = None):
+    """Submissions similar to one student's submission for a week"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    try:
+        result = await asyncio.to_thread(view.similarity_index.matches, week, student_id, threshold)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if result is None:
+        return JSONResponse({"error": "No fingerprint for this submission"}, status_code=404)
+    return result
+
+
+class RegradeRequest(BaseModel):
+    weeks: Optional[List[str]] = None
+    students: Optional[List[str]] = None
+    parallel: int = 2
+
+
+# Regrade runs started from this server, by (course id, run id)
+regrade_processes = {}
+
+
+def _start_regrade_process(view: CourseView, args: List[str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, '-m', 'backend.regrade', '--root', str(view.course.root)] + args)
+
+
+@app.post("/api/admin/regrade", dependencies=[Depends(require_admin)])
+async def start_regrade(request: RegradeRequest, course: Optional[str] = None):
+    """Start a bulk regrade in a background process"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    run_id = regrade.new_run_id()
+    key = (view.course.id, run_id)
+    args = ['--run-id', run_id, '--parallel', str(max(1, request.parallel))]
+    for week in request.weeks or []:
+        args += ['--week', week]
+    if request.students:
+        args += ['--students', ','.join(request.students)]
+    regrade_processes[key] = _start_regrade_process(view, args)
+    return {"run_id": run_id, "course": view.course.id}
+
+
+@app.get("/api/admin/regrade", dependencies=[Depends(require_admin)])
+async def list_regrades(course: Optional[str] = None):
+    """List bulk regrade runs with their progress"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    return regrade.list_checkpoints(view.course.root)
+
+
+@app.get("/api/admin/regrade/{run_id}", dependencies=[Depends(require_admin)])
+async def get_regrade(run_id: str, course: Optional[str] = None):
+    """Progress and ETA of a bulk regrade run"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    checkpoint = regrade.load_checkpoint(run_id, view.course.root)
+    if checkpoint is None:
+        return JSONResponse({"error": "Regrade run not found"}, status_code=404)
+    state = regrade.progress(checkpoint)
+    process = regrade_processes.get((view.course.id, run_id))
+    if state['state'] == 'running' and process is not None and process.poll() is not None:
+        state['state'] = 'interrupted'  # process died without writing its final state
+    return state
+
+
+@app.post("/api/admin/regrade/{run_id}/resume", dependencies=[Depends(require_admin)])
+async def resume_regrade(run_id: str, parallel: int = 2, course: Optional[str] = None):
+    """Resume an interrupted bulk regrade from its checkpoint"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    if regrade.load_checkpoint(run_id, view.course.root) is None:
+        return JSONResponse({"error": "Regrade run not found"}, status_code=404)
+    key = (view.course.id, run_id)
+    process = regrade_processes.get(key)
+    if process is not None and process.poll() is None:
+        return JSONResponse({"error": "Regrade run is still running"}, status_code=409)
+    regrade_processes[key] = _start_regrade_process(
+        view, ['--resume', run_id, '--parallel', str(max(1, parallel))]
+    )
+    return {"run_id": run_id, "course": view.course.id}
+
+
+@app.delete("/api/admin/regrade/{run_id}", dependencies=[Depends(require_admin)])
+async def stop_regrade(run_id: str, course: Optional[str] = None):
+    """Stop a running regrade after its in-flight jobs (it can be resumed later)"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    process = regrade_processes.get((view.course.id, run_id))
+    if process is None or process.poll() is not None:
+        return JSONResponse({"error": "Regrade run is not running"}, status_code=404)
+    process.terminate()
+    return {"run_id": run_id, "stopping": True}
+
+
+class DeadlineRequest(BaseModel):
+    week: str
+    cutoff: str
+    students: Optional[List[str]] = None
+    parallel: int = 4
+    grace: Optional[float] = None
+
+
+# Deadline gradings started from this server, by (course id, snapshot id)
+deadline_processes = {}
+
+
+@app.post("/api/admin/deadline", dependencies=[Depends(require_admin)])
+async def start_deadline_grading(request: DeadlineRequest, course: Optional[str] = None):
+    """Grade a week as it stood at the cutoff in a background process"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    try:
+        cutoff = deadline.parse_cutoff(request.cutoff)
+    except ValueError:
+        return JSONResponse({"error": f"Invalid cutoff: {request.cutoff}"}, status_code=400)
+    snapshot_id = deadline.snapshot_id(request.week, cutoff)
+    key = (view.course.id, snapshot_id)
+    process = deadline_processes.get(key)
+    if process is not None and process.poll() is None:
+        return JSONResponse({"error": "Deadline grading is still running"}, status_code=409)
+    if deadline.snapshot_path(snapshot_id, view.course.root).exists():
+        return JSONResponse({"error": f"Deadline snapshot {snapshot_id} already exists"}, status_code=409)
+
+    args = ['--week', request.week, '--cutoff', str(cutoff), '--parallel', str(max(1, request.parallel))]
+    if request.students:
+        args += ['--students', ','.join(request.students)]
+    if request.grace is not None:
+        args += ['--grace', str(request.grace)]
+    deadline_processes[key] = subprocess.Popen(
+        [sys.executable, '-m', 'backend.deadline', '--root', str(view.course.root)] + args
+    )
+    return {"snapshot_id": snapshot_id, "course": view.course.id}
+
+
+@app.get("/api/deadline")
+async def list_deadline_snapshots(course: Optional[str] = None):
+    """Deadline snapshots with their pass/fail summary"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    return deadline.list_snapshots(view.course.root)
+
+
+@app.get("/api/deadline/{snapshot_id}")
+async def get_deadline_snapshot(snapshot_id: str, course: Optional[str] = None):
+    """Per-student commit and results of a deadline snapshot"""
+    view = _course_view(course)
+    if view is None:
+        return _course_not_found(course)
+    snapshot = deadline.load_deadline_snapshot(snapshot_id, view.course.root)
+    if snapshot is None:
+        process = deadline_processes.get((view.course.id, snapshot_id))
+        if process is not None and process.poll() is None:
+            return JSONResponse({"snapshot_id": snapshot_id, "state": "running"}, status_code=202)
+        return JSONResponse({"error": "Deadline snapshot not found"}, status_code=404)
+    return snapshot
 
 
 if __name__ == "__main__":
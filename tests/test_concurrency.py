@@ -0,0 +1,65 @@
+"""Weighted fair sharing of one limiter between courses"""
+import asyncio
+
+from backend.concurrency import FairShareLimiter
+
+
+async def grant_order(limiter, shares, queued):
+    """Hold every slot, queue ``queued`` (share names) in that order, then record the order slots are granted"""
+    blocker = limiter.add_share('blocker')
+    for _ in range(limiter.limit):
+        await blocker.__aenter__()
+    order = []
+
+    async def job(name):
+        async with shares[name]:
+            order.append(name)
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(job(name)) for name in queued]
+    await asyncio.sleep(0)
+    for _ in range(limiter.limit):
+        await blocker.__aexit__(None, None, None)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_competing_courses_get_slots_in_proportion_to_their_weight():
+    async def run():
+        limiter = FairShareLimiter(1)
+        shares = {'big': limiter.add_share('big', weight=2), 'small': limiter.add_share('small', weight=1)}
+        order = await grant_order(limiter, shares, ['small'] * 10 + ['big'] * 10)
+        return order, limiter.shares_snapshot()
+
+    order, snapshot = asyncio.run(run())
+    # Queued last, the heavier course still gets two of every three slots while both wait
+    assert order[:9].count('big') == 6
+    assert order[:9].count('small') == 3
+    assert snapshot['big']['granted'] == snapshot['small']['granted'] == 10
+
+
+def test_course_alone_gets_the_whole_pool():
+    async def run():
+        limiter = FairShareLimiter(3)
+        limiter.add_share('other', weight=10)
+        share = limiter.add_share('alone', weight=1)
+        for _ in range(3):
+            await asyncio.wait_for(share.__aenter__(), timeout=1)
+        return limiter.in_flight, limiter.waiting
+
+    assert asyncio.run(run()) == (3, 0)
+
+
+def test_idle_course_does_not_bank_credit():
+    async def run():
+        limiter = FairShareLimiter(1)
+        shares = {'busy': limiter.add_share('busy'), 'idle': limiter.add_share('idle')}
+        # 'busy' runs alone for a while; 'idle' then joins the queue
+        for _ in range(10):
+            async with shares['busy']:
+                pass
+        return await grant_order(limiter, shares, ['idle'] * 5 + ['busy'] * 5)
+
+    order = asyncio.run(run())
+    # Without the reset 'idle' would take its 10 slots of banked credit first
+    assert order[:4].count('busy') == 2
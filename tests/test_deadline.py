@@ -0,0 +1,70 @@
+"""The deadline commit comes from when the clone received it, not from the date in the commit"""
+import os
+import subprocess
+import time
+
+from backend.deadline import DeadlineGrading
+
+
+def git(repo, *args, date=None):
+    env = dict(os.environ, GIT_AUTHOR_NAME='student', GIT_AUTHOR_EMAIL='student@example.com',
+               GIT_COMMITTER_NAME='student', GIT_COMMITTER_EMAIL='student@example.com')
+    if date is not None:
+        env.update(GIT_AUTHOR_DATE=f'{date} +0000', GIT_COMMITTER_DATE=f'{date} +0000')
+    return subprocess.run(['git'] + list(args), cwd=repo, env=env, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def test_backdated_commit_received_after_cutoff_is_ignored(tmp_path):
+    remote = tmp_path / 'remote'
+    remote.mkdir()
+    git(remote, 'init', '-q')
+    git(remote, 'commit', '-q', '--allow-empty', '-m', 'on time')
+    on_time = git(remote, 'rev-parse', 'HEAD')
+
+    clone = tmp_path / 'students' / 'S00001'
+    clone.parent.mkdir()
+    git(tmp_path, 'clone', '-q', str(remote), str(clone))
+    time.sleep(1.1)
+    cutoff = time.time()
+    time.sleep(1.1)
+
+    # Pushed after the deadline with a commit date a day before it
+    git(remote, 'commit', '-q', '--allow-empty', '-m', 'late', date=int(cutoff) - 86400)
+    git(clone, 'pull', '-q')
+
+    grading = DeadlineGrading('week01', cutoff, root=tmp_path, grace=0)
+    commit, received_at = grading.resolve_commit(clone)
+    assert commit == on_time
+    assert received_at <= cutoff
+
+    # Cloned only after the cutoff: nothing was received in time
+    assert DeadlineGrading('week01', cutoff - 60, root=tmp_path, grace=0).resolve_commit(clone) is None
+
+    # Within the grace period the backdated commit counts: dates are only trusted that close to the cutoff
+    commit, _ = DeadlineGrading('week01', cutoff, root=tmp_path, grace=60).resolve_commit(clone)
+    assert commit == git(clone, 'rev-parse', 'HEAD')
+
+
+def test_push_before_cutoff_pulled_after_it_counts_within_the_grace_period(tmp_path):
+    remote = tmp_path / 'remote'
+    remote.mkdir()
+    git(remote, 'init', '-q')
+    git(remote, 'commit', '-q', '--allow-empty', '-m', 'first')
+    clone = tmp_path / 'students' / 'S00001'
+    clone.parent.mkdir()
+    git(tmp_path, 'clone', '-q', str(remote), str(clone))
+    first = git(clone, 'rev-parse', 'HEAD')
+
+    time.sleep(1.1)
+    git(remote, 'commit', '-q', '--allow-empty', '-m', 'just in time')
+    cutoff = time.time()
+    time.sleep(1.1)
+    git(clone, 'pull', '-q')  # the scheduler's next pull, after the cutoff
+    time.sleep(1.1)
+    git(remote, 'commit', '-q', '--allow-empty', '-m', 'too late')
+    git(clone, 'pull', '-q')
+
+    just_in_time = git(clone, 'rev-parse', 'HEAD~1')
+    assert DeadlineGrading('week01', cutoff, root=tmp_path, grace=60).resolve_commit(clone)[0] == just_in_time
+    assert DeadlineGrading('week01', cutoff, root=tmp_path, grace=0).resolve_commit(clone)[0] == first
@@ -0,0 +1,48 @@
+"""GitPython backend: fast-forwards are reported only when the branch moved"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet, run_git
+
+pytest.importorskip('git')
+from backend.git_backend import GitPythonBackend
+
+
+def commit(repo, name):
+    (repo / name).write_text(f'{name}\n')
+    run_git(['add', '-A'], cwd=repo)
+    run_git(['commit', '-q', '-m', name], cwd=repo)
+    return run_git(['rev-parse', 'HEAD'], cwd=repo)
+
+
+def test_pull_reports_fast_forward_only_when_the_branch_moves(tmp_path):
+    create_fleet(tmp_path, 1)
+    pusher = tmp_path / 'pushers' / 'S00001'
+    clone = tmp_path / 'students' / 'S00001' / 'repo'
+    backend = GitPythonBackend(max_workers=1)
+
+    def pull():
+        return asyncio.run(backend.pull(clone, timeout=30))
+
+    pushed = commit(pusher, 'problem01.py')
+    run_git(['push', '-q', 'origin', 'HEAD:main'], cwd=pusher)
+    result = pull()
+    assert result['success'] and 'Fast-forward' in result['message']
+    assert result['commit'] == pushed == run_git(['rev-parse', 'HEAD'], cwd=clone)
+
+    result = pull()
+    assert result['message'] == 'Already up to date.'
+    assert backend.counts['up_to_date_in_process'] == 1
+
+    # A commit only in the clone: nothing to merge, so nothing new to grade
+    local = commit(clone, 'local.txt')
+    result = pull()
+    assert result == {'success': True, 'message': 'Already up to date.', 'commit': local}
+    assert backend.counts['fast_forwarded'] == 1
+    assert backend.counts['fallback'] == 0
@@ -0,0 +1,56 @@
+"""Published graders run from the week directory with their data files"""
+import json
+import sys
+from pathlib import Path
+
+from backend.grader import Grader
+from backend.grading_store import MANIFEST, GradingScriptStore
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import write_backend_config
+
+GRADE_SCRIPT = '''
+import json
+from pathlib import Path
+
+# Data next to the script and relative to the working directory, the way graders were written
+expected = json.loads((Path(__file__).parent / 'expected.json').read_text())
+answer = Path('../repo/answer.txt')
+for problem_id, value in expected.items():
+    ok = answer.exists() and answer.read_text().strip() == value and Path('inputs/case1.txt').exists()
+    Path(('pass' if ok else 'fail') + problem_id).write_text('')
+'''
+
+
+def publish(tmp_path, name, expected, extra=()):
+    source = tmp_path / name
+    (source / 'inputs').mkdir(parents=True)
+    (source / 'grade.py').write_text(GRADE_SCRIPT)
+    (source / 'expected.json').write_text(json.dumps(expected))
+    (source / 'inputs' / 'case1.txt').write_text('1 2\n')
+    for extra_name in extra:
+        (source / extra_name).write_text('')
+    return GradingScriptStore(tmp_path / 'grading_store').publish('week01', source)[0]
+
+
+def test_grader_data_files_are_available(tmp_path):
+    write_backend_config(tmp_path, {'grading': {'num_of_problems': 1, 'isolation': 'rlimit'},
+                                    'similarity': {'enabled': False}})
+    repo = tmp_path / 'students' / 'S00001' / 'repo'
+    repo.mkdir(parents=True)
+    (repo / 'answer.txt').write_text('3\n')
+    week_dir = tmp_path / 'students' / 'S00001' / 'week01'
+
+    first = publish(tmp_path, 'v1', {'01': '3'}, extra=['notes.txt'])
+    assert Grader(tmp_path).grade_student('S00001', 'week01') == {'01': True}
+    assert json.loads((week_dir / MANIFEST).read_text())['version'] == first
+    assert (week_dir / 'notes.txt').exists()
+
+    # A new version replaces the copied files and drops the ones it no longer has
+    second = publish(tmp_path, 'v2', {'01': '4'})
+    assert Grader(tmp_path).grade_student('S00001', 'week01') == {'01': False}
+    assert json.loads((week_dir / MANIFEST).read_text())['version'] == second
+    assert json.loads((week_dir / 'expected.json').read_text()) == {'01': '4'}
+    assert not (week_dir / 'notes.txt').exists()
@@ -0,0 +1,47 @@
+"""Worker leases: expired leases are requeued to another worker, up to max_attempts"""
+import time
+
+from backend.job_queue import LocalJobQueue
+
+
+def test_expired_lease_is_requeued_to_another_worker():
+    queue = LocalJobQueue(lease_seconds=0.05, max_attempts=3)
+    job_id, future = queue.submit({'student_id': 'S00001', 'week': 'week01'})
+    first = queue.lease('worker-a')
+    assert first['job_id'] == job_id and first['attempt'] == 1
+
+    time.sleep(0.06)  # worker-a died without heartbeating
+    second = queue.lease('worker-b')
+    assert second['job_id'] == job_id and second['attempt'] == 2
+    assert queue.redispatched == 1
+    assert queue.heartbeat('worker-a', job_id) is False
+
+    assert queue.complete('worker-b', job_id, {'problems': {'01': True}})
+    assert future.result(timeout=1) == {'problems': {'01': True}, 'job_id': job_id,
+                                        'worker': 'worker-b', 'attempts': 2}
+    # A late result from the first worker is ignored
+    assert queue.complete('worker-a', job_id, {'problems': {'01': False}}) is False
+
+
+def test_heartbeat_keeps_the_lease():
+    queue = LocalJobQueue(lease_seconds=0.1)
+    job_id, _ = queue.submit({})
+    queue.lease('worker-a')
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.heartbeat('worker-a', job_id)
+    queue.expire_leases()
+    assert queue.redispatched == 0
+    assert queue.lease('worker-b') is None
+
+
+def test_job_fails_after_max_attempts():
+    queue = LocalJobQueue(lease_seconds=0.05, max_attempts=2)
+    job_id, future = queue.submit({})
+    for worker in ('worker-a', 'worker-b'):
+        assert queue.lease(worker)['job_id'] == job_id
+        time.sleep(0.06)
+    queue.expire_leases()
+    assert future.result(timeout=1) == {'job_id': job_id, 'error': 'lease expired', 'attempts': 2}
+    assert queue.snapshot()['pending'] == 0
+    assert queue.lease('worker-c') is None
@@ -0,0 +1,26 @@
+"""git gc runs at a lower priority through a nice/ionice prefix, not preexec_fn"""
+import asyncio
+import shutil
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet
+
+from backend.maintenance import RepoMaintenance, object_counts
+
+
+def test_gc_runs_niced(tmp_path):
+    create_fleet(tmp_path, 1)
+    clone = tmp_path / 'students' / 'S00001' / 'repo'
+    maintenance = RepoMaintenance({'maintenance': {'nice': 10}}, tmp_path)
+
+    prefix = maintenance._priority_prefix()
+    if shutil.which('nice'):
+        assert prefix[:3] == ['nice', '-n', '10']
+    assert asyncio.run(maintenance._gc(clone)) is None
+    assert object_counts(clone / '.git')['loose_objects'] == 0
+
+    assert 'nice' not in RepoMaintenance({'maintenance': {'nice': 0}}, tmp_path)._priority_prefix()
@@ -0,0 +1,90 @@
+"""The frontend serves the metrics and remote state a separately running scheduler publishes"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet, run_git, write_backend_config
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.load(response)
+
+
+def test_state_from_separate_scheduler_process(tmp_path):
+    create_fleet(tmp_path, 2)
+    write_backend_config(tmp_path, {'metrics': {'interval': 1}, 'maintenance': {'enabled': False},
+                                    'scheduler': {'pull_interval': 1}, 'snapshot': {'interval': 60}})
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    port = free_port()
+
+    scheduler = subprocess.Popen([sys.executable, '-m', 'backend.scheduler'], cwd=tmp_path, env=env,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    frontend = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'frontend.main:app', '--app-dir', str(REPO),
+                                 '--host', '127.0.0.1', '--port', str(port)],
+                                cwd=tmp_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        metrics = {}
+        deadline = time.monotonic() + 60
+        while not metrics and time.monotonic() < deadline:
+            try:
+                metrics = get_json(f'http://127.0.0.1:{port}/api/metrics')
+            except OSError:
+                pass
+            if not metrics:
+                time.sleep(0.5)
+
+        assert metrics, 'frontend never served the scheduler metrics'
+        assert metrics['course'] == 'default'
+        assert metrics['concurrency']['limits']['pull']['limit'] >= 1
+        assert metrics['remote']['circuit']['state'] == 'closed'
+
+        # Per-repository state appears once the scheduler has loaded the roster
+        student = {}
+        while not student.get('remote') and time.monotonic() < deadline:
+            student = get_json(f'http://127.0.0.1:{port}/api/students/S00001')
+            time.sleep(0.5)
+        assert student['remote']['circuit'] == 'closed'
+        assert student['remote']['failures'] == 0
+        assert get_json(f'http://127.0.0.1:{port}/health')['scheduler_running'] is True
+
+        assert student.get('status') != 'pass'
+
+        # The first grades are saved without waiting for the periodic snapshot, so the
+        # dashboard serves the snapshot from here on and a new grade must reach it too
+        snapshot = tmp_path / 'state' / 'scheduler.json'
+        saved = time.monotonic()
+        while not snapshot.exists() and time.monotonic() - saved < 20:
+            time.sleep(0.5)
+        assert snapshot.exists()
+
+        # A finished grade reaches the dashboard well before the next periodic snapshot
+        pusher = tmp_path / 'pushers' / 'S00001'
+        for i in range(1, 4):
+            (pusher / f'problem{i:02d}.py').write_text('print(1)\n')
+        run_git(['add', '-A'], cwd=pusher)
+        run_git(['commit', '-q', '-m', 'solve'], cwd=pusher)
+        run_git(['push', '-q', 'origin', 'HEAD:main'], cwd=pusher)
+        pushed = time.monotonic()
+        while student.get('status') != 'pass' and time.monotonic() - pushed < 20:
+            time.sleep(0.5)
+            student = get_json(f'http://127.0.0.1:{port}/api/students/S00001')
+        assert student.get('status') == 'pass'
+    finally:
+        for process in (frontend, scheduler):
+            process.terminate()
+            process.wait(timeout=30)
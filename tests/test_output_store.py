@@ -0,0 +1,67 @@
+"""Stored grading outputs: names that stay inside the store, per-week trimming and store-wide eviction"""
+import os
+import time
+
+import pytest
+
+from backend.output_store import GradingOutputStore
+
+
+@pytest.mark.parametrize('student_id, week', [('..', 'week01'), ('.', 'week01'), ('S00001', '..'),
+                                              ('S00001', '.'), ('../S00002', 'week01'), ('.hidden', 'week01')])
+def test_path_traversal_is_rejected(tmp_path, student_id, week):
+    store = GradingOutputStore(tmp_path / 'grading_output')
+    with pytest.raises(ValueError):
+        store.week_dir(student_id, week)
+    with pytest.raises(ValueError):
+        store.list(student_id, week)
+    with pytest.raises(ValueError):
+        store.record(student_id, week, 'out', 'err')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_output_ids_cannot_escape_the_week(tmp_path):
+    store = GradingOutputStore(tmp_path / 'grading_output')
+    path = store.record('S00001', 'week01', 'out', 'err')
+    output_id = path.name[:-len('.log.gz')]
+    assert store.path('S00001', 'week01', output_id) == path
+    assert store.path('S00001', 'week01', '..') is None
+    assert store.path('S00001', 'week01', '.') is None
+
+
+def record_outputs(store, student_id, count):
+    paths = []
+    for _ in range(count):
+        paths.append(store.record(student_id, 'week01', os.urandom(4096).hex(), ''))
+        time.sleep(0.002)  # names start with a millisecond timestamp
+    return paths
+
+
+def test_each_week_keeps_its_newest_outputs(tmp_path):
+    store = GradingOutputStore(tmp_path / 'grading_output', keep_per_week=2)
+    paths = record_outputs(store, 'S00001', 4)
+    assert [output['id'] + '.log.gz' for output in store.list('S00001', 'week01')] == [p.name for p in paths[:1:-1]]
+
+
+def test_oldest_outputs_are_evicted_across_the_store(tmp_path):
+    store = GradingOutputStore(tmp_path / 'grading_output', keep_per_week=10, max_total_mb=0.03)
+    size = record_outputs(store, 'S00001', 1)[0].stat().st_size
+    kept = int(store.max_total_bytes // size)
+    old = record_outputs(store, 'S00001', kept)
+    new = record_outputs(store, 'S00002', 2)
+
+    remaining = sorted(tmp_path.glob('grading_output/*/*/*.log.gz'), key=lambda p: p.name)
+    assert sum(p.stat().st_size for p in remaining) <= store.max_total_bytes
+    assert remaining[-2:] == new  # the newest survive, the oldest (of any student) go first
+    assert not (tmp_path / 'grading_output' / 'S00001' / 'week01' / old[0].name).exists()
+    assert len(remaining) < kept + 3
+
+
+def test_outputs_of_other_processes_count_after_a_rescan(tmp_path):
+    other = GradingOutputStore(tmp_path / 'grading_output', keep_per_week=10)
+    old = record_outputs(other, 'S00001', 3)
+    size = old[0].stat().st_size
+    store = GradingOutputStore(tmp_path / 'grading_output', keep_per_week=10,
+                               max_total_mb=(3.5 * size) / (1024 * 1024))
+    new = record_outputs(store, 'S00002', 1)
+    assert not old[0].exists() and old[1].exists() and new[0].exists()
@@ -0,0 +1,79 @@
+"""Bulk regrade: checkpoint/resume, the roster and the scheduler's published grade limit"""
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet, write_backend_config
+
+from backend.regrade import BulkRegrade, load_checkpoint
+from backend.snapshot import save_snapshot
+
+
+def write_roster(root, student_ids):
+    roster = root / 'class_info' / 'process_list.csv'
+    roster.parent.mkdir(parents=True, exist_ok=True)
+    roster.write_text('id,repository_url\n' + ''.join(f'{sid},{root}/remotes/{sid}.git\n' for sid in student_ids))
+
+
+def count_grades(regrade):
+    graded = []
+    grade_student = regrade.grader.grade_student
+
+    def counting(student_id, week):
+        graded.append(f'{student_id}/{week}')
+        return grade_student(student_id, week)
+    regrade.grader.grade_student = counting
+    return graded
+
+
+def test_interrupted_run_resumes_where_it_stopped(tmp_path):
+    ids = create_fleet(tmp_path, 3)
+    write_backend_config(tmp_path, {})
+
+    regrade = BulkRegrade.create(run_id='run1', parallel=1, max_load=0, root=tmp_path)
+    first = count_grades(regrade)
+    # Stop after the first job, as SIGTERM from the admin API would
+    state = regrade.run(on_progress=lambda state: regrade.stop_requested.set())
+    assert state['state'] == 'interrupted'
+    assert first == [f'{ids[0]}/week01']
+    assert list(load_checkpoint('run1', tmp_path)['done']) == first
+
+    resumed = BulkRegrade.resume('run1', parallel=2, max_load=0, root=tmp_path)
+    second = count_grades(resumed)
+    state = resumed.run()
+    assert state['state'] == 'completed'
+    assert state['done'] == state['total'] == 3
+    assert sorted(second) == [f'{sid}/week01' for sid in ids[1:]]
+
+
+def test_retired_students_are_not_regraded(tmp_path):
+    ids = create_fleet(tmp_path, 3)
+    write_backend_config(tmp_path, {})
+    write_roster(tmp_path, ids[:2])
+
+    regrade = BulkRegrade.create(run_id='run1', max_load=0, root=tmp_path)
+    assert regrade.checkpoint['jobs'] == [f'{sid}/week01' for sid in ids[:2]]
+
+    # Retired between create and resume
+    write_roster(tmp_path, ids[:1])
+    resumed = BulkRegrade.resume('run1', max_load=0, root=tmp_path)
+    graded = count_grades(resumed)
+    state = resumed.run()
+    assert state['state'] == 'completed'
+    assert graded == [f'{ids[0]}/week01']
+    assert resumed.checkpoint['done'][f'{ids[1]}/week01'] == 'retired'
+
+
+def test_regrade_uses_only_the_grade_slots_the_scheduler_leaves_free(tmp_path):
+    create_fleet(tmp_path, 1)
+    write_backend_config(tmp_path, {})
+    regrade = BulkRegrade.create(run_id='run1', parallel=4, max_load=0, root=tmp_path)
+    assert regrade._grade_slots() == 4  # no scheduler publishing metrics
+
+    metrics = tmp_path / 'state' / 'metrics.json'
+    save_snapshot({'concurrency': {'limits': {'grade': {'limit': 5, 'in_flight': 3}}}}, metrics)
+    assert regrade._grade_slots() == 2
+    save_snapshot({'concurrency': {'limits': {'grade': {'limit': 5, 'in_flight': 5}}}}, metrics)
+    assert regrade._grade_slots() == 0
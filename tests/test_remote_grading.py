@@ -0,0 +1,43 @@
+"""Worker jobs are limited by the connected workers, not by the scheduler host's grade pool"""
+import asyncio
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet, write_backend_config
+
+
+def test_remote_leases_exceed_the_host_grade_limit(tmp_path, monkeypatch):
+    create_fleet(tmp_path, 1)
+    write_backend_config(tmp_path, {'grading': {'executor': 'distributed', 'max_concurrent': 2},
+                                    'concurrency': {'grade': {'min': 1, 'max': 3}},
+                                    'maintenance': {'enabled': False}})
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GRADING_AUTHKEY', 'test-secret')
+
+    from backend.scheduler import GradingScheduler
+    scheduler = GradingScheduler()
+    course = scheduler.default_course
+    queue = scheduler.job_queue
+    workers = [f'worker-{i}' for i in range(12)]
+
+    async def run():
+        for worker in workers:
+            assert queue.lease(worker) is None  # connect with nothing to do yet
+        tasks = [asyncio.create_task(scheduler._grade_remote(course, f'S{i:05d}', 'week01'))
+                 for i in range(len(workers))]
+        await asyncio.sleep(0.1)
+        leases = [queue.lease(worker) for worker in workers]
+        assert all(leases)
+        assert queue.snapshot()['leased'] == len(workers) > scheduler.concurrency.config['grade']['max']
+        assert scheduler.grade_limiter.in_flight == 0
+
+        for worker, lease in zip(workers, leases):
+            queue.complete(worker, lease['job_id'], {'problems': {'01': True}, 'usage': {}})
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run())
+    assert results == [({'01': True}, {})] * len(workers)
+    assert scheduler.remote_grade_limiter.limit == len(workers) * 2
@@ -0,0 +1,71 @@
+"""Circuit breaker: open after repeated remote failures, one half-open probe, close on success"""
+import asyncio
+import time
+
+import pytest
+
+from backend.git_manager import GitManager
+from backend.remote_guard import CircuitBreaker, RemoteGuard
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure(remote=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure(remote=False)  # local errors do not count
+    breaker.record_failure(remote=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_remote_failures_and_stays_open_until_the_timeout():
+    breaker = open_breaker(reset_timeout=60)
+    assert breaker.allow() is False
+    assert breaker.snapshot()['retry_in'] > 0
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() is True
+
+
+def test_failed_probe_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    breaker.record_failure(remote=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is False
+
+
+def test_cancelled_probe_gives_the_probe_slot_back(tmp_path):
+    guard = RemoteGuard({'git': {'circuit_breaker': {'failure_threshold': 1, 'reset_timeout': 0.05}}})
+    guard.record_failure('other', 'Connection timed out')
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+
+    manager = GitManager(root=tmp_path, remote_guard=guard)
+    pulling = asyncio.Event()
+
+    async def hang(repo_path):
+        pulling.set()
+        await asyncio.sleep(60)
+    manager._pull = hang
+
+    async def run():
+        probe = asyncio.create_task(manager.pull_repository(tmp_path / 'repo'))
+        await pulling.wait()
+        assert guard.check('repo2') is not None  # the probe is in flight
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(run())
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert guard.check('repo2') is None  # the next pull probes instead of waiting forever
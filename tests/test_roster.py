@@ -0,0 +1,81 @@
+"""Roster reconcile: which students are cloned, retired and graded"""
+import asyncio
+import sys
+from pathlib import Path
+
+from backend.roster import ACTIVE, RETIRED, StudentRegistry
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / 'benchmark'))
+
+from fleet import create_fleet, write_backend_config
+
+
+class FakeGitManager:
+    def __init__(self):
+        self.cloned = []
+
+    async def clone_repository(self, url, target):
+        (target / '.git').mkdir(parents=True)
+        self.cloned.append(url)
+        return {'success': True}
+
+    async def repoint_repository(self, repo_path, url):
+        return {'success': True}
+
+
+def write_roster(path: Path, students):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('id,repository_url\n' + ''.join(f'{sid},{url}\n' for sid, url in students.items()))
+
+
+def test_existing_clones_are_registered_without_being_added(tmp_path):
+    for student_id in ('S1', 'S2'):
+        (tmp_path / 'students' / student_id / '.git').mkdir(parents=True)
+    roster = tmp_path / 'process_list.csv'
+    write_roster(roster, {'S1': 'url1', 'S2': 'url2', 'S3': 'url3'})
+    registry = StudentRegistry(roster, tmp_path / 'students')
+    git = FakeGitManager()
+
+    changes = asyncio.run(registry.reconcile(git))
+    assert changes == {'added': ['S3'], 'retired': [], 'repointed': []}
+    assert git.cloned == ['url3']
+    assert registry.active_ids() == ['S1', 'S2', 'S3']
+
+    # Retired, then back on the roster: that one needs a first grade again
+    write_roster(roster, {'S1': 'url1', 'S3': 'url3'})
+    registry._roster_mtime = None
+    assert asyncio.run(registry.reconcile(git))['retired'] == ['S2']
+    assert registry.entries['S2']['state'] == RETIRED
+    write_roster(roster, {'S1': 'url1', 'S2': 'url2', 'S3': 'url3'})
+    registry._roster_mtime = None
+    assert asyncio.run(registry.reconcile(git))['added'] == ['S2']
+    assert registry.entries['S2']['state'] == ACTIVE
+    assert git.cloned == ['url3']
+
+
+def test_restart_with_existing_clones_grades_nobody(tmp_path, monkeypatch):
+    ids = create_fleet(tmp_path, 3)
+    write_backend_config(tmp_path, {'maintenance': {'enabled': False}})
+    write_roster(tmp_path / 'class_info' / 'process_list.csv',
+                 {sid: str(tmp_path / 'remotes' / f'{sid}.git') for sid in ids})
+    monkeypatch.chdir(tmp_path)
+
+    from backend.scheduler import GradingScheduler
+    scheduler = GradingScheduler()
+    course = scheduler.default_course
+    graded = []
+    monkeypatch.setattr(course.grader, 'grade_student', lambda *args: graded.append(args[0]) or {})
+
+    async def one_cycle():
+        scheduler.running = True
+        scheduler._wakeup = asyncio.Event()
+
+        async def stop(seconds):
+            scheduler.running = False
+        monkeypatch.setattr(scheduler, '_sleep', stop)
+        await scheduler._monitor_loop(course)
+
+    asyncio.run(one_cycle())
+    assert course.registry.active_ids() == ids
+    assert graded == []
@@ -0,0 +1,83 @@
+"""Where the grading cgroups go, and when the sandbox falls back to rlimits"""
+import os
+import subprocess
+import sys
+
+from backend.sandbox import Sandbox, process_cgroup
+
+
+def write_proc_cgroup(tmp_path, text):
+    path = tmp_path / 'proc-cgroup'
+    path.write_text(text)
+    return path
+
+
+def fake_cgroup(path, controllers='cpuset cpu io memory pids'):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'cgroup.controllers').write_text(controllers)
+    return path
+
+
+def test_process_cgroup_reads_the_v2_line(tmp_path):
+    mount = tmp_path / 'cgroup'
+    proc = write_proc_cgroup(tmp_path, '4:memory:/legacy\n0::/system.slice/grading.service\n')
+    assert process_cgroup(mount, proc) == mount / 'system.slice' / 'grading.service'
+    assert process_cgroup(mount, write_proc_cgroup(tmp_path, '0::/\n')) == mount
+    assert process_cgroup(mount, write_proc_cgroup(tmp_path, '4:memory:/legacy\n')) is None
+    assert process_cgroup(mount, tmp_path / 'missing') is None
+
+
+def test_parent_is_created_inside_the_process_cgroup(tmp_path):
+    mount = fake_cgroup(tmp_path / 'cgroup')
+    service = fake_cgroup(mount / 'system.slice' / 'grading.service')
+    proc = write_proc_cgroup(tmp_path, '0::/system.slice/grading.service\n')
+
+    sandbox = Sandbox({'isolation': 'rlimit'})
+    assert sandbox._setup_cgroup('txed-grading', mount, proc) is None
+    assert sandbox.cgroup_parent == service / 'txed-grading'
+    assert sandbox.mode == 'cgroup'
+    assert (service / 'cgroup.subtree_control').read_text() == '+memory +pids +cpu'
+    assert not (mount / 'txed-grading').exists()
+
+
+def test_falls_back_without_usable_controllers(tmp_path):
+    mount = fake_cgroup(tmp_path / 'cgroup')
+    fake_cgroup(mount / 'user.slice', controllers='cpu io')
+    sandbox = Sandbox({'isolation': 'rlimit'})
+
+    reason = sandbox._setup_cgroup('txed-grading', mount, write_proc_cgroup(tmp_path, '0::/user.slice\n'))
+    assert 'memory' in reason and 'pids' in reason
+    reason = sandbox._setup_cgroup('txed-grading', mount, write_proc_cgroup(tmp_path, '0::/gone.scope\n'))
+    assert reason.startswith('own cgroup not found')
+    assert sandbox.cgroup_parent is None
+    assert sandbox.mode in ('rlimit', 'none')
+
+
+def test_setup_waits_for_the_first_job(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Sandbox, '_setup_cgroup', lambda self, parent: calls.append(parent) or 'no cgroup2 mount')
+    sandbox = Sandbox({'isolation': 'auto'})
+    assert calls == []  # constructing a Grader (frontend, gradebook) leaves cgroups alone
+    sandbox.job()
+    sandbox.job()
+    assert calls == ['txed-grading']
+
+
+def test_shared_cgroup_is_not_taken_over(tmp_path):
+    mount = fake_cgroup(tmp_path / 'cgroup')
+    session = fake_cgroup(mount / 'user.slice' / 'session.scope')
+    (session / 'cgroup.procs').write_text(f'1234\n{os.getpid()}\n')
+    sandbox = Sandbox({'isolation': 'rlimit'})
+
+    reason = sandbox._setup_cgroup('txed-grading', mount, write_proc_cgroup(tmp_path, '0::/user.slice/session.scope\n'))
+    assert 'other processes' in reason
+    assert not (session / 'txed-grading-supervisor').exists()
+    assert not (session / 'cgroup.subtree_control').exists()
+
+
+def test_launcher_applies_rlimits_before_exec():
+    sandbox = Sandbox({'isolation': 'rlimit', 'timeout': 7}, max_memory_mb=256)
+    probe = 'import resource; print(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_DATA)[0])'
+    result = subprocess.run(sandbox.job().command([sys.executable, '-c', probe]),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['7', str(256 * 1024 * 1024)]
@@ -0,0 +1,17 @@
+"""Comment stripping keeps string contents and preprocessor directives"""
+from backend.similarity import tokenize
+
+
+def test_directives_are_tokens_and_comments_are_not():
+    source = '#include <stdio.h>\n#define N 3\nint a; // count\n/* block */ int b;\n'
+    tokens = tokenize(source)
+    assert tokens[:2] == ['#', 'include']
+    assert ['#', 'define'] == tokens[7:9]
+    assert 'count' not in tokens and 'block' not in tokens
+    assert tokens.count('int') == 2
+
+
+def test_comment_markers_inside_strings_are_kept():
+    assert tokenize('char *url = "http://example.com/#top"; int x;') == \
+        ['char', '*', 'V', '=', 'S', ';', 'int', 'V', ';']
+    assert tokenize("x = '#not a comment'  # a comment\ny = 1") == ['V', '=', 'S', 'V', '=', 'N']